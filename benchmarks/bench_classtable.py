@@ -0,0 +1,129 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Compares how long a new Python process takes to import the API classes as
+``class`` statements and as a `typepad.classtable.ClassTable`, which makes
+each class when it's first used. The times don't include importing the
+`typepad` package itself (see ``benchmarks/bench_import.py``).
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_classtable.py
+
+The table is made from ``typepad/api.py`` the same way ``generate.py
+--table`` makes it, by putting each ``class`` statement in the table.
+
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import typepad.api
+from generate import TABLE_PREAMBLE, TABLE_POSTAMBLE, required_names
+
+
+SCRIPTS = (
+    ('module', "import typepad.api; typepad.api.User"),
+    ('table, one class', "import table_api; table_api.User"),
+    ('table, decoding', "import table_api; "
+        "table_api.Asset.from_dict({'objectType': 'Post', 'author': {'objectType': 'User'}}).author"),
+    ('table, all', "import table_api; table_api.table.load_all()"),
+)
+
+
+def table_source():
+    """Returns the source of a module holding the classes of
+    ``typepad/api.py`` in a `ClassTable`."""
+    source = open(os.path.join(os.path.dirname(typepad.__file__), 'api.py')).read()
+    preamble, classes, postamble = [], {}, []
+    current = None
+    for line in source.splitlines(True):
+        if line.startswith('class '):
+            current = line[6:].split('(', 1)[0]
+            classes[current] = [line]
+        elif current is not None and (line.startswith((' ', '\n')) or not line.strip()):
+            classes[current].append(line)
+        elif classes:
+            current = None
+            postamble.append(line)
+        else:
+            preamble.append(line)
+
+    table = ['table = ClassTable({\n']
+    for name in sorted(classes):
+        body = ''.join(classes[name])
+        requires = sorted(required_names(body, classes) - set((name,)))
+        table.append('    %r: (%r,\n        %r),\n' % (name, tuple(requires), body))
+    table.append('}, object_types=%r)\n' % dict((name, name)
+        for name in typepad.tpobject.classes_by_object_type.values() if name in classes))
+
+    return ''.join(preamble + [TABLE_PREAMBLE.lstrip('\n')] + table + ['\n'] + postamble
+        + [TABLE_POSTAMBLE])
+
+
+def bench(code, path, number):
+    """Returns the fastest time in milliseconds a new process took to run
+    `code` after importing `typepad`, as timed from inside the process."""
+    script = ("import typepad\nimport time; start = time.time()\n%s\n"
+        "import sys; sys.stdout.write(repr(time.time() - start))" % code)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path))
+    times = []
+    for i in range(number):
+        proc = subprocess.Popen([sys.executable, '-c', script], env=env,
+            stdout=subprocess.PIPE)
+        out, err = proc.communicate()
+        times.append(float(out))
+    return min(times) * 1000
+
+
+def main():
+    tempdir = tempfile.mkdtemp()
+    try:
+        open(os.path.join(tempdir, 'table_api.py'), 'w').write(table_source())
+        path = [os.path.join(os.path.dirname(__file__), '..'), tempdir]
+
+        # Compile both modules before timing them.
+        bench("import typepad.api, table_api", path, 1)
+
+        print '%-18s %12s' % ('script', 'time')
+        for name, code in SCRIPTS:
+            print '%-18s %9.2f ms' % (name, bench(code, path, 20))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
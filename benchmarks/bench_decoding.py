@@ -0,0 +1,93 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Compares decoding lists of events field by field as they're used with
+decoding them all at once through the compiled decoders used when
+`TypePadObject.eager_decoding` is set.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_decoding.py
+
+"""
+
+import os
+import sys
+from timeit import Timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import typepad
+from typepad.tpobject import ListOf, TypePadObject
+
+import payloads
+
+
+def use(obj):
+    """Uses the fields of `obj` that have data, and those of the objects in
+    them, as a template showing the objects would."""
+    data = obj.api_data
+    for attrname, field in obj.fields.iteritems():
+        if field.api_name not in data:
+            continue
+        value = getattr(obj, attrname)
+        if isinstance(value, TypePadObject):
+            use(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, TypePadObject):
+                    use(item)
+
+
+def decode(data):
+    pages = [ListOf(typepad.Event).from_dict(page) for page in data]
+    for page in pages:
+        use(page)
+    return pages
+
+
+def main():
+    data = [payloads.group_events(count=50, seed=seed) for seed in range(10)]
+    count = sum(len(page['entries']) for page in data)
+
+    print 'Decoding %d events' % count
+    results = []
+    for eager in (False, True):
+        TypePadObject.eager_decoding = eager
+        results.append([page.to_dict() for page in decode(data)])
+        best = min(Timer(lambda: decode(data)).repeat(5, 5)) / 5
+        print '  %-10s %8.1f ms' % ('eager' if eager else 'lazy', best * 1000)
+    TypePadObject.eager_decoding = False
+    assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Compares encoding objects for API requests through the generic
+`remoteobjects` path with the compiled encoders behind
+`TypePadObject.to_dict()` and `TypePadObject.to_json()`.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_encoding.py
+
+"""
+
+import os
+import sys
+from timeit import Timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import remoteobjects
+import simplejson as json
+
+import typepad
+
+import payloads
+
+
+def generic_to_dict(obj):
+    """Encodes `obj` as `TypePadObject.to_dict()` did before it used
+    compiled encoders."""
+    ret = remoteobjects.RemoteObject.to_dict(obj)
+    if 'objectType' not in ret and hasattr(obj, 'object_type'):
+        ret['objectType'] = obj._class_object_type
+    return ret
+
+
+def generic_body(obj):
+    return json.dumps(generic_to_dict(obj), default=remoteobjects.http.omit_nulls)
+
+
+def bench(label, func, objs):
+    number = 5
+    best = min(Timer(lambda: [func(obj) for obj in objs]).repeat(5, number)) / number
+    print '  %-24s %8.2f ms' % (label, best * 1000)
+
+
+def main():
+    # Posts as fetched from the API and changed, for saving with put().
+    posts = [typepad.Asset.from_dict(payloads.asset(i, payloads.user(i % 8))) for i in range(500)]
+    for post in posts:
+        post.title = post.title.upper()
+    # Action bodies, as for Group.add_member.post_all().
+    actions = [typepad.Group._AddMemberPost(user_id='6p%014d' % i) for i in range(500)]
+
+    for label, objs in (('500 changed posts', posts), ('500 add-member actions', actions)):
+        assert [generic_to_dict(obj) for obj in objs] == [obj.to_dict() for obj in objs]
+        print label
+        bench('generic to_dict()', generic_to_dict, objs)
+        bench('compiled to_dict()', lambda obj: obj.to_dict(), objs)
+        bench('generic JSON body', generic_body, objs)
+        bench('compiled to_json()', lambda obj: obj.to_json(), objs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Measures checking the signatures of many feed subscription pushes with a
+`typepad.feedsub.SignatureVerifier`, against starting a new HMAC for each
+push, and on several threads at once; and the memory a
+`typepad.feedsub.SeenEntries` set uses against a set of the entry IDs.
+
+Checking signatures on several threads only helps on a machine with several
+CPUs, as the HMACs of large pushes are computed without holding the global
+interpreter lock.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_feedsub.py
+
+"""
+
+import hashlib
+import hmac
+import os
+import subprocess
+import sys
+from timeit import Timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from typepad.feedsub import SignatureVerifier, signature_matches
+
+
+def bench(label, func):
+    number = 3
+    best = min(Timer(func).repeat(3, number)) / number
+    print '  %-24s %8.2f ms' % (label, best * 1000)
+
+
+def sign(body, secret):
+    return 'sha1=' + hmac.new(secret, body, hashlib.sha1).hexdigest()
+
+
+def unkeyed_verify(body, signature, secret):
+    return signature_matches(signature, hmac.new(secret, body, hashlib.sha1))
+
+
+def memory(setup, count):
+    """Returns how many KB a new process's peak RSS grows by adding `count`
+    entry IDs to the set made by `setup`."""
+    script = (
+        "import resource, sys\n"
+        "from typepad.feedsub import SeenEntries\n"
+        "before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "%s\n"
+        "for i in xrange(%d):\n"
+        "    add('tag:feeds.example.com,2010:site.%%d' %% i)\n"
+        "sys.stdout.write(str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before))\n"
+        % (setup, count))
+    env = dict(os.environ, PYTHONPATH=os.path.join(os.path.dirname(__file__), '..'))
+    proc = subprocess.Popen([sys.executable, '-c', script], env=env,
+        stdout=subprocess.PIPE)
+    out, err = proc.communicate()
+    return int(out)
+
+
+def main():
+    secrets = ['secret-%d' % i for i in range(300)]
+    verifier = SignatureVerifier()
+
+    for count, size in ((20000, 2 * 1024), (200, 1024 * 1024)):
+        body = os.urandom(size)
+        pushes = [(body, sign(body, secrets[i % len(secrets)]), secrets[i % len(secrets)])
+            for i in range(count)]
+        print 'verifying %d pushes of %d KB' % (count, size // 1024)
+        bench('new HMAC per push', lambda: [unkeyed_verify(*push) for push in pushes])
+        bench('SignatureVerifier', lambda: [verifier.verify(*push) for push in pushes])
+        bench('verify_all(), 4 threads', lambda: verifier.verify_all(pushes, max_workers=4))
+
+    count = 1000000
+    print 'remembering %d entry IDs' % count
+    for label, code in (
+        ('SeenEntries', 'seen = SeenEntries(max_size=%d); add = seen.add' % (count * 2)),
+        ('set of IDs', 'seen = set(); add = seen.add'),
+    ):
+        print '  %-24s %8.1f MB' % (label, memory(code, count) / 1024.0)
+
+if __name__ == '__main__':
+    main()
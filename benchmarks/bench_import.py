@@ -0,0 +1,78 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Measures how long a new Python process takes to import `typepad`, and how
+much of that is spent building the API classes in `typepad.api`, which the
+package imports only when one of them is first used.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_import.py
+
+"""
+
+import os
+import subprocess
+import sys
+
+
+SCRIPTS = (
+    ('python only', "pass"),
+    ('dependencies', "import httplib2, remoteobjects, batchhttp.client, oauth.oauth"),
+    ('import typepad', "import typepad"),
+    ('first class', "import typepad; typepad.User"),
+    ('typepad.api', "import typepad.api"),
+)
+
+
+def bench(code, number):
+    """Returns the fastest time in milliseconds a new process took to run
+    `code`, as timed from inside the process."""
+    script = ("import time; start = time.time()\n%s\n"
+        "import sys; sys.stdout.write(repr(time.time() - start))" % code)
+    env = dict(os.environ, PYTHONPATH=os.path.join(os.path.dirname(__file__), '..'))
+    times = []
+    for i in range(number):
+        proc = subprocess.Popen([sys.executable, '-c', script], env=env,
+            stdout=subprocess.PIPE)
+        out, err = proc.communicate()
+        times.append(float(out))
+    return min(times) * 1000
+
+
+def main():
+    print '%-16s %12s' % ('script', 'time')
+    for name, code in SCRIPTS:
+        print '%-16s %9.2f ms' % (name, bench(code, 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Compares decoding lists of events with and without sharing their embedded
+objects through `typepad.tpobject.Interner`.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_interning.py
+
+"""
+
+import os
+import sys
+from timeit import Timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import typepad
+from typepad.tpobject import Interner, ListOf
+
+from bench_memory import reachable, touch
+import payloads
+
+
+def decode(data):
+    pages = [ListOf(typepad.Event).from_dict(page) for page in data]
+    for page in pages:
+        touch(page)
+    return pages
+
+
+def decode_interned(data):
+    with Interner():
+        return decode(data)
+
+
+def main():
+    data = [payloads.group_events(count=50, seed=seed) for seed in range(10)]
+    count = sum(len(page['entries']) for page in data)
+
+    print 'Decoding %d events' % count
+    for label, func in (('normal', decode), ('interned', decode_interned)):
+        size = reachable(func(data), exclude=[data])
+        best = min(Timer(lambda: func(data)).repeat(3, 5)) / 5
+        print '  %-10s %8.1f ms %10d bytes' % (label, best * 1000, size)
+
+
+if __name__ == '__main__':
+    main()
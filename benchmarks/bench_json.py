@@ -0,0 +1,77 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Compares the JSON libraries `typepad.jsonlib` can use, decoding a page of
+group events as the API returns it and encoding request bodies.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_json.py
+
+Only the libraries that are installed are compared.
+
+"""
+
+import os
+import sys
+from timeit import Timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import remoteobjects
+
+import typepad
+from typepad import jsonlib
+
+import payloads
+
+
+def bench(func, number):
+    return min(Timer(func).repeat(5, number)) / number * 1000
+
+
+def main():
+    content = jsonlib.backends['json'].dumps(payloads.group_events(count=50))
+    bodies = [typepad.Asset.from_dict(payloads.asset(i, payloads.user(i % 8))).to_dict()
+        for i in range(50)]
+    omit_nulls = remoteobjects.http.omit_nulls
+
+    print '%-12s %18s %18s %18s' % ('library', 'decode events', 'encode bodies', 'with default')
+    for name in sorted(jsonlib.backends):
+        jsonlib.use(name)
+        decode = bench(lambda: jsonlib.loads(content), 20)
+        encode = bench(lambda: [jsonlib.dumps(body) for body in bodies], 20)
+        default = bench(lambda: [jsonlib.dumps(body, default=omit_nulls) for body in bodies], 20)
+        print '%-12s %15.2f ms %15.2f ms %15.2f ms' % (name, decode, encode, default)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Compares the memory used by decoded API objects with and without the
+compact field storage of `typepad.tpobject.CompactTypePadObject`.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_memory.py
+
+The compact classes are made from ``typepad/api.py`` the same way
+``generate.py --compact`` makes them, by using `CompactTypePadObject` as the
+base of the API classes.
+
+"""
+
+import gc
+import os
+import re
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import typepad
+from typepad.tpobject import ListOf, TypePadObject
+
+import payloads
+
+
+def reachable(roots, exclude=()):
+    """Returns the total size of the objects reachable from `roots`, not
+    counting classes, functions and the objects reachable from `exclude`."""
+    skip = set()
+    stack = list(exclude)
+    while stack:
+        obj = stack.pop()
+        if id(obj) not in skip:
+            skip.add(id(obj))
+            stack.extend(gc.get_referents(obj))
+
+    seen = set()
+    total = 0
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or id(obj) in skip:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, (type, types.ClassType, types.ModuleType, types.FunctionType)):
+            continue
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def touch(obj):
+    """Decodes all the fields of `obj` and the objects in them, as a
+    template showing the objects would."""
+    for attrname in obj.fields:
+        value = getattr(obj, attrname)
+        if isinstance(value, TypePadObject):
+            touch(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, TypePadObject):
+                    touch(item)
+
+
+def measure(module, data):
+    listcls = ListOf(module.Event)
+    pages = [listcls.from_dict(page) for page in data]
+    for page in pages:
+        touch(page)
+    return reachable(pages, exclude=[data])
+
+
+def compact_api():
+    """Returns a module of the API classes with `CompactTypePadObject` as
+    their base."""
+    source = open(os.path.join(os.path.dirname(typepad.__file__), 'api.py')).read()
+    source = re.sub(r'(?m)^(class \w+\()TypePadObject\b', r'\1CompactTypePadObject', source)
+    module = types.ModuleType('compact_api')
+    exec compile(source, 'compact_api.py', 'exec') in module.__dict__
+    return module
+
+
+def main():
+    # Ten pages of fifty events, as an application's cache might hold.
+    data = [payloads.group_events(count=50, seed=seed) for seed in range(10)]
+    count = sum(len(page['entries']) for page in data)
+    raw = reachable([data])
+
+    print 'Decoding %d events (%d bytes of data)' % (count, raw)
+    normal = measure(typepad.api, data)
+    print '  %-10s %10d bytes  %6d bytes/event' % ('normal', normal, normal / count)
+    # Making the compact classes replaces the normal ones by name and object
+    # type, so measure them second.
+    compact = measure(compact_api(), data)
+    print '  %-10s %10d bytes  %6d bytes/event' % ('compact', compact, compact / count)
+    print '  compact objects use %.0f%% of the memory' % (100.0 * compact / normal)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Compares building and reading a browser upload request body by flattening a
+`BrowserUploadEndpoint.NetworkMessage`, with the file content in the message,
+against `BrowserUploadEndpoint.MultipartForm`, which leaves the content in
+the file until the body is read.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_multipart.py
+
+"""
+
+import os
+import sys
+import tempfile
+from timeit import Timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import typepad
+
+
+Endpoint = typepad.BrowserUploadEndpoint
+
+FIELDS = {
+    'asset': '{"objectType": "Photo", "title": "A photo"}',
+    'post_type': 'photo',
+    'target_url': 'http://api.typepad.com/groups/6p0000000000000001/photo-assets.json',
+}
+
+
+def message_body(fileobj):
+    fileobj.seek(0)
+    bodyobj = Endpoint.NetworkMessage()
+    bodyobj.set_type('multipart/form-data')
+    bodyobj.preamble = "multipart snowform for you"
+    for key, value in FIELDS.iteritems():
+        msg = Endpoint.NetworkMessage()
+        msg.add_header('Content-Disposition', 'form-data', name=key)
+        msg.set_payload(value)
+        bodyobj.attach(msg)
+    filemsg = Endpoint.NetworkMessage()
+    filemsg.set_type('image/png')
+    filemsg.add_header('Content-Disposition', 'form-data', name="file", filename="file")
+    filemsg.add_header('Content-Transfer-Encoding', 'identity')
+    content = fileobj.read()
+    filemsg.set_payload(content)
+    filemsg.add_header('Content-Length', str(len(content)))
+    bodyobj.attach(filemsg)
+    return bodyobj.as_string(write_headers=False)
+
+
+def form_body(fileobj):
+    fileobj.seek(0)
+    form = Endpoint.MultipartForm()
+    for key, value in FIELDS.iteritems():
+        form.add_field(key, value)
+    form.add_file('file', fileobj, 'image/png')
+    body = form.body()
+    # Read the body as httplib sends it.
+    read = body.read
+    while read(8192):
+        pass
+
+
+def main():
+    print '%-10s %14s %14s' % ('size', 'NetworkMessage', 'MultipartForm')
+    for size in (10 * 1024, 1024 * 1024, 20 * 1024 * 1024):
+        fileobj = tempfile.TemporaryFile()
+        fileobj.write(os.urandom(size))
+        fileobj.flush()
+        number = max(1, 2 * 1024 * 1024 // size)
+        times = [min(Timer(lambda: func(fileobj)).repeat(3, number)) / number
+            for func in (message_body, form_body)]
+        print '%-10s %11.2f ms %11.2f ms' % ('%d KB' % (size // 1024),
+            times[0] * 1000, times[1] * 1000)
+        fileobj.close()
+
+
+if __name__ == '__main__':
+    main()
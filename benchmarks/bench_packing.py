@@ -0,0 +1,93 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Compares the size and speed of `typepad.packing` against encoding objects
+as JSON with `to_dict()`.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_packing.py
+
+"""
+
+import os
+import sys
+from timeit import Timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import simplejson as json
+
+import typepad
+from typepad import packing
+from typepad.cache import find_class
+
+import payloads
+
+
+def json_dumps(objs):
+    return json.dumps([(type(obj).__name__, obj._location, obj.to_dict()) for obj in objs])
+
+
+def json_loads(data):
+    return [find_class(name).from_dict(objdata)
+        for name, location, objdata in json.loads(data)]
+
+
+def bench(label, func, number):
+    best = min(Timer(func).repeat(3, number)) / number
+    print '  %-26s %8.3f ms' % (label, best * 1000)
+
+
+def main():
+    data = payloads.group_events(count=500)
+    events = [typepad.Event.from_dict(entry) for entry in data['entries']]
+    # Decode the objects' fields, as an application would have.
+    for event in events:
+        event.actor.avatar_link, event.object.author
+
+    print 'Packing %d events' % len(events)
+
+    encoded = json_dumps(events)
+    print '  %-26s %8d bytes' % ('json size', len(encoded))
+    bench('json encode', lambda: json_dumps(events), 10)
+    bench('json decode', lambda: json_loads(encoded), 10)
+
+    for codec in sorted(packing.codecs):
+        packed = packing.pack_all(events, codec=codec)
+        assert [obj.to_dict() for obj in packing.unpack_all(packed)] == [obj.to_dict() for obj in events]
+        print '  %-26s %8d bytes' % (codec + ' size', len(packed))
+        bench(codec + ' encode', lambda: packing.pack_all(events, codec=codec), 10)
+        bench(codec + ' decode', lambda: packing.unpack_all(packed), 10)
+
+
+if __name__ == '__main__':
+    main()
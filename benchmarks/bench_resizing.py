@@ -0,0 +1,151 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Compares resizing many `ImageLink` instances one by one, as the resizing
+methods did before they chose sizes by bisection and copied links directly,
+with the current methods and with the `ImageLink.sizes()` batch method.
+Also compares computing just the sizes of many images with
+`ImageLink.size_arrays()` with and without NumPy, and resizing many
+`VideoLink` instances by rewriting their embed code with regular expressions
+against `VideoLink.by_width()` and `VideoLink.sizes()`.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_resizing.py
+
+"""
+
+from copy import copy
+import os
+import re
+import sys
+from timeit import Timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import typepad
+from typepad import tpobject
+
+
+def linear_square(link, size):
+    """Resizes `link` as `ImageLink.square()` did before it used bisection
+    and `_resized()`."""
+    if size == 0 or size is None: size = max(link.width, link.height)
+    if link.width > link.height:
+        if size > link.width:
+            size = link.width
+    else:
+        if size > link.height:
+            size = link.height
+
+    si = size
+    if si not in link._SI:
+        si = link._SI[-1]
+        if size > si:
+            size = si
+        else:
+            for x in link._SI:
+                if x > size:
+                    si = x
+                    break
+
+    url = copy(link)
+    url.width = size
+    url.height = size
+    url.url = link.at_size('%dsi' % si)
+    return url
+
+
+def regex_embed(embed_code, width, height):
+    embed_code = re.sub('(\\swidth=)"\\d+"', '\\1"%d"' % width, embed_code)
+    return re.sub('(\\sheight=)"\\d+"', '\\1"%d"' % height, embed_code)
+
+
+def regex_video_by_width(video, size):
+    """Resizes `video` as `VideoLink.by_width()` did before it parsed the
+    embed code into a template."""
+    width = int(re.search('\\swidth="(\\d+)"', video.embed_code).group(1))
+    height = int(re.search('\\sheight="(\\d+)"', video.embed_code).group(1))
+    new_height = int(height * (size / float(width)))
+    vid = copy(video)
+    # Setting the width and then the height each rewrote the embed code.
+    vid.embed_code = regex_embed(vid.embed_code, size, height)
+    vid.embed_code = regex_embed(vid.embed_code, size, new_height)
+    return vid
+
+
+def bench(label, func):
+    number = 5
+    best = min(Timer(func).repeat(5, number)) / number
+    print '  %-24s %8.2f ms' % (label, best * 1000)
+
+
+def main():
+    links = [typepad.ImageLink(
+        url='http://a%d.typepad.com/6a00d83451b36c69e2%014dc-pi' % (i % 4, i),
+        url_template='http://a%d.typepad.com/6a00d83451b36c69e2%014dc-{spec}' % (i % 4, i),
+        width=400 + i % 1200, height=300 + i % 900) for i in range(5000)]
+
+    for size in (75, 500):
+        print 'square(%d) of %d images' % (size, len(links))
+        bench('linear scan and copy()', lambda: [linear_square(link, size) for link in links])
+        bench('square()', lambda: [link.square(size) for link in links])
+        bench('ImageLink.sizes()', lambda: typepad.ImageLink.sizes(links, 'square', size))
+
+    embed_code = ('<object width="500" height="395"><param name="movie" value="http://www.youtube.com/v/%s" />'
+        '<embed type="application/x-shockwave-flash" width="500" height="395" src="http://www.youtube.com/v/%s" /></object>')
+    videos = [typepad.VideoLink(embed_code=embed_code % (i, i)) for i in range(5000)]
+    print 'by_width(400) of %d videos' % len(videos)
+    bench('regular expressions', lambda: [regex_video_by_width(video, 400) for video in videos])
+    bench('by_width()', lambda: [video.by_width(400) for video in videos])
+    bench('VideoLink.sizes()', lambda: typepad.VideoLink.sizes(videos, 400))
+
+    count = 200000
+    widths = [400 + i % 1200 for i in range(count)]
+    heights = [300 + i % 900 for i in range(count)]
+    size_arrays = lambda: typepad.ImageLink.size_arrays(widths, heights, 'inscribe', 320)
+    print 'size_arrays() of %d images' % count
+    import_numpy = tpobject._import_numpy
+    tpobject._import_numpy = lambda: None
+    try:
+        bench('without NumPy', size_arrays)
+    finally:
+        tpobject._import_numpy = import_numpy
+    numpy = import_numpy()
+    if numpy is None:
+        print '  (NumPy is not installed)'
+    else:
+        widths, heights = numpy.array(widths), numpy.array(heights)
+        bench('with NumPy', size_arrays)
+
+
+if __name__ == '__main__':
+    main()
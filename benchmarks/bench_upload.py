@@ -0,0 +1,175 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Measures `BrowserUploadEndpoint.upload()` sending files of several sizes to a
+stand-in browser upload endpoint on the local machine, reporting the
+throughput, the peak memory use and the CPU time of each upload.
+
+Each upload runs in a new process, so its peak RSS isn't hidden by an earlier,
+larger upload's. The server runs in this process, so its work isn't counted.
+
+Run from the top of the source tree:
+
+    python benchmarks/bench_upload.py [--max-size MB] [--max-rss-growth MB]
+
+With ``--max-rss-growth``, the benchmark exits with an error if any upload
+grows its process's peak RSS by more than that, as a check that uploads are
+still streamed from disk.
+
+"""
+
+import argparse
+import BaseHTTPServer
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+SIZES = (
+    10 * 1024,
+    1024 * 1024,
+    10 * 1024 * 1024,
+    100 * 1024 * 1024,
+    500 * 1024 * 1024,
+)
+
+
+class UploadHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    """A stand-in for the browser upload endpoint, which reads and discards
+    the uploaded body, and serves the new asset."""
+
+    def do_POST(self):
+        left = int(self.headers['content-length'])
+        while left:
+            chunk = self.rfile.read(min(left, 1024 * 1024))
+            if not chunk:
+                break
+            left -= len(chunk)
+        self.send_response(302)
+        self.send_header('Location', 'http://%s/?status=201&asset_url=/assets/1.json'
+            % self.headers['host'])
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        content = '{"objectType": "Photo", "urlId": "1", "title": "Benchmark"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def upload(port, size):
+    """Uploads a file of `size` bytes to the server on `port`, returning the
+    seconds taken, the peak RSS and its growth in KB, and the CPU seconds
+    used."""
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from oauth.oauth import OAuthConsumer, OAuthToken
+    import typepad
+
+    http = typepad.TypePadClient()
+    http.add_credentials(OAuthConsumer('consumer', 'secret'),
+        OAuthToken('token', 'secret'), domain='127.0.0.1:%d' % port)
+    http.endpoint = 'http://127.0.0.1:%d' % port
+    http.follow_redirects = False
+    typepad.client = http
+
+    fileobj = tempfile.TemporaryFile()
+    block = os.urandom(1024 * 1024)
+    for offset in range(0, size, len(block)):
+        fileobj.write(block[:size - offset])
+    fileobj.seek(0)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.time()
+    photo = typepad.Photo()
+    typepad.BrowserUploadEndpoint().upload(photo, fileobj, 'image/png',
+        post_type='photo')
+    elapsed = time.time() - started
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    assert photo.title == 'Benchmark'
+
+    cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    return elapsed, after.ru_maxrss, after.ru_maxrss - usage.ru_maxrss, cpu
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark browser uploads.')
+    parser.add_argument('--max-size', type=float, default=None,
+        help='only upload files up to this many MB')
+    parser.add_argument('--max-rss-growth', type=float, default=None,
+        help='fail if an upload grows peak RSS by more than this many MB')
+    parser.add_argument('--child', nargs=2, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print ' '.join(str(value) for value in upload(*args.child))
+        return
+
+    server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), UploadHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.setDaemon(True)
+    thread.start()
+
+    failed = False
+    print '%-10s %10s %12s %12s %10s' % ('size', 'MB/s', 'peak RSS', 'RSS growth', 'CPU')
+    for size in SIZES:
+        if args.max_size is not None and size > args.max_size * 1024 * 1024:
+            continue
+        proc = subprocess.Popen([sys.executable, __file__, '--child',
+            str(server.server_port), str(size)], stdout=subprocess.PIPE)
+        out, err = proc.communicate()
+        if proc.returncode:
+            sys.exit('Upload of %d bytes failed' % size)
+        elapsed, peak, growth, cpu = [float(value) for value in out.split()]
+
+        label = size >= 1024 * 1024 and '%d MB' % (size // (1024 * 1024)) or '%d KB' % (size // 1024)
+        print '%-10s %10.1f %9.1f MB %9.1f MB %8.2f s' % (label,
+            size / (1024.0 * 1024) / elapsed, peak / 1024.0, growth / 1024.0, cpu)
+        if args.max_rss_growth is not None and growth / 1024.0 > args.max_rss_growth:
+            failed = True
+
+    server.shutdown()
+    if failed:
+        sys.exit('An upload grew peak RSS by more than %s MB' % args.max_rss_growth)
+
+
+if __name__ == '__main__':
+    main()
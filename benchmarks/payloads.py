@@ -0,0 +1,105 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+Sample TypePad API payloads for the benchmarks.
+
+The payloads are built to resemble real API responses, such as a page of a
+group's ``events`` list, where the same few users author many assets.
+
+"""
+
+import random
+
+
+def user(i):
+    return {
+        'objectType': 'User',
+        'id': 'tag:api.typepad.com,2009:6p00000000000000%02d' % i,
+        'urlId': '6p00000000000000%02d' % i,
+        'displayName': 'Member %d' % i,
+        'preferredUsername': 'member%d' % i,
+        'profilePageUrl': 'http://profile.typepad.com/member%d' % i,
+        'avatarLink': {
+            'url': 'http://up1.typepad.com/6a00000000000000%02d-50si' % i,
+            'urlTemplate': 'http://up1.typepad.com/6a00000000000000%02d-{spec}' % i,
+            'width': 50,
+            'height': 50,
+        },
+    }
+
+
+def asset(i, author):
+    return {
+        'objectType': 'Post',
+        'objectTypes': ['tag:api.typepad.com,2009:Post'],
+        'id': 'tag:api.typepad.com,2009:6a00000000000001%04d' % i,
+        'urlId': '6a00000000000001%04d' % i,
+        'title': 'Post number %d' % i,
+        'content': '<p>%s</p>' % ' '.join(['Lorem ipsum dolor sit amet.'] * 8),
+        'textFormat': 'html',
+        'published': '2010-07-%02dT12:00:00Z' % (i % 28 + 1),
+        'permalinkUrl': 'http://example.typepad.com/blog/2010/07/post-%d.html' % i,
+        'categories': ['news', 'python'],
+        'author': author,
+        'commentCount': i % 7,
+        'favoriteCount': i % 3,
+        'isFavoriteForCurrentUser': False,
+        'isConversationsAnswer': False,
+        'container': {
+            'objectType': 'Group',
+            'urlId': '6p0000000000000001',
+            'displayName': 'Augue Tempor',
+        },
+    }
+
+
+def event(i, actor):
+    return {
+        'objectType': 'Event',
+        'id': 'tag:api.typepad.com,2009:6e00000000000001%04d' % i,
+        'urlId': '6e00000000000001%04d' % i,
+        'verb': 'NewAsset',
+        'verbs': ['tag:api.typepad.com,2009:NewAsset'],
+        'published': '2010-07-%02dT12:00:00Z' % (i % 28 + 1),
+        'actor': actor,
+        'object': asset(i, actor),
+    }
+
+
+def group_events(count=50, users=8, seed=0):
+    """Returns a ``Group.events`` list response with `count` events by
+    `users` different users."""
+    rand = random.Random(seed)
+    authors = [user(i) for i in range(users)]
+    return {
+        'totalResults': count,
+        'entries': [event(i, dict(rand.choice(authors))) for i in range(count)],
+    }
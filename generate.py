@@ -2,17 +2,27 @@
 
 import codecs
 from cStringIO import StringIO
+import hashlib
 import json
 import logging
-from os.path import join
+import os
+from os.path import exists, isdir, join
 import re
 import sys
 import textwrap
+import tokenize
 import urllib2
 
 import argparse
 
 
+SCHEMA_URLS = (
+    ('object-types.json', 'http://api.typepad.com/object-types.json'),
+    ('nouns.json', 'http://api.typepad.com/nouns.json'),
+)
+
+STAMP_LINE = '# Generated by generate.py (stamp %s). Do not edit.\n'
+
 PREAMBLE = '''
 # Copyright (c) 2009-2010 Six Apart Ltd.
 # All rights reserved.
@@ -56,7 +66,7 @@ from remoteobjects.dataobject import find_by_name
 
 from typepad.tpobject import *
 from typepad.tpobject import _ImageResizer, _VideoResizer
-from typepad import fields
+from typepad import bulk, fields
 import typepad
 
 
@@ -66,6 +76,16 @@ POSTAMBLE = """
 browser_upload = BrowserUploadEndpoint()
 """
 
+TABLE_PREAMBLE = """
+from typepad.classtable import ClassTable
+
+
+"""
+
+TABLE_POSTAMBLE = """
+table.install(__name__)
+"""
+
 CLASS_HAS_OBJECT_TYPE = ('User', 'Group', 'Application', 'Asset', 'Comment', 'Favorite', 'Post', 'Photo', 'Audio', 'Video', 'Link', 'Document', )
 
 CLASS_SUPERCLASSES = {
@@ -330,6 +350,48 @@ CLASS_EXTRAS = {
     unblock = _rel_type_updater(None)
     leave = _rel_type_updater(None)
 
+    def _rel_type_bulk_updater(uri):
+        def update_all(cls, relationships, max_workers=4):
+            """Updates all the given relationships at once, returning a
+            `typepad.bulk.BulkResult` for each one."""
+            types = [uri] if uri else []
+            return cls._set_all_rel_types(relationships, types, max_workers)
+        return classmethod(update_all)
+
+    @classmethod
+    def _set_all_rel_types(cls, relationships, types, max_workers):
+        """Sets the types of all the given relationships to `types`.
+
+        The relationships' statuses are all fetched through batch requests,
+        then saved on up to `max_workers` threads at once. Returns a
+        `typepad.bulk.BulkResult` for each relationship, in order, whose value
+        is its saved `RelationshipStatus`.
+
+        """
+        relationships = list(relationships)
+        # Get the status links unbatched, so we can batch them ourselves.
+        statuses = [cls.status_obj.__get__(rel, batch=False) for rel in relationships]
+        fetched = bulk.deliver(statuses)
+
+        def save(rel_status):
+            rel_status.types = list(types)
+            rel_status.put()
+            return rel_status
+
+        saved = iter(bulk.run(save, [result.value for result in fetched if result.ok],
+            max_workers=max_workers))
+
+        results = list()
+        for rel, result in zip(relationships, fetched):
+            if result.ok:
+                result = saved.next()
+            results.append(bulk.BulkResult(rel, result.value, result.error))
+        return results
+
+    block_all = _rel_type_bulk_updater("tag:api.typepad.com,2009:Blocked")
+    unblock_all = _rel_type_bulk_updater(None)
+    leave_all = _rel_type_bulk_updater(None)
+
     def _rel_type_checker(uri):
         def has_edge_with_uri(self):
             return uri in self.status.types
@@ -672,6 +734,7 @@ class ActionEndpoint(Property):
 class ObjectType(lazy):
 
     types_by_name = dict()
+    base_class = 'TypePadObject'
 
     @property
     def name(self):
@@ -724,10 +787,26 @@ class ObjectType(lazy):
     @property
     def parents(self):
         parents = [self.parentType]
+        if parents[0] == 'TypePadObject':
+            parents[0] = self.base_class
         if self.name in CLASS_SUPERCLASSES:
             parents.extend(CLASS_SUPERCLASSES[self.name])
         return ', '.join(parents)
 
+    @property
+    def content_hash(self):
+        """A hash of everything this type's class and docs are generated
+        from: its schema, its endpoint's, its parent type's, and generate.py
+        itself."""
+        digest = hashlib.sha1(generator_digest())
+        digest.update(self.base_class)
+        digest.update(self.schema_json)
+        if 'endpoint' in self.__dict__:
+            digest.update(json.dumps(self.endpoint, sort_keys=True))
+        if self.parentType != 'TypePadObject':
+            digest.update(self.types_by_name[self.parentType].content_hash)
+        return digest.hexdigest()
+
     @property
     def has_get_by_url_id(self):
         if 'url_id' in self.properties:
@@ -898,19 +977,168 @@ class ObjectType(lazy):
             body, '' if squash else '\n')
 
 
-def generate_types(types_fn=None, nouns_fn=None):
-    if types_fn is None:
-        types = json.load(urllib2.urlopen('http://api.typepad.com/object-types.json'))
-    else:
-        with open(types_fn) as f:
-            types = json.load(f)
+def load_schema(types_fn=None, nouns_fn=None):
+    """Returns the object types and nouns schema documents, read from the
+    given files or, for those not given, requested from the TypePad API."""
+    docs = list()
+    for filename, (name, url) in zip((types_fn, nouns_fn), SCHEMA_URLS):
+        if filename is None:
+            logging.info('Requesting %s from %s', name, url)
+            docs.append(json.load(urllib2.urlopen(url)))
+        else:
+            with open(filename) as f:
+                docs.append(json.load(f))
+    return tuple(docs)
+
+
+def schema_hash(types, nouns):
+    """Returns a hash of the content of the given schema documents, which is
+    the same however the documents' JSON was formatted."""
+    digest = hashlib.sha1()
+    for doc in (types, nouns):
+        digest.update(json.dumps(doc, sort_keys=True, separators=(',', ':')))
+    return digest.hexdigest()
+
+
+def save_snapshot(types, nouns, snapshots_dir):
+    """Saves the schema documents as a snapshot in `snapshots_dir`, returning
+    the path of the snapshot.
+
+    Each snapshot is a directory named for the hash of its content, so saving
+    the same schema again reuses its snapshot. The ``LATEST`` file in
+    `snapshots_dir` names the snapshot saved most recently.
+
+    """
+    version = schema_hash(types, nouns)[:12]
+    path = join(snapshots_dir, version)
+    if not exists(path):
+        os.makedirs(path)
+        for doc, (name, url) in zip((types, nouns), SCHEMA_URLS):
+            with open(join(path, name), 'w') as f:
+                json.dump(doc, f, indent=2, sort_keys=True)
+        logging.info('Saved schema snapshot %s', path)
+    with open(join(snapshots_dir, 'LATEST'), 'w') as f:
+        f.write(version + '\n')
+    return path
+
+
+def snapshot_files(path):
+    """Returns the object types and nouns files of the snapshot at `path`.
+
+    The `path` can be a snapshot directory, or a directory of snapshots made
+    with `save_snapshot()`, in which case the snapshot named in its ``LATEST``
+    file is used.
+
+    """
+    if not exists(join(path, SCHEMA_URLS[0][0])):
+        try:
+            with open(join(path, 'LATEST')) as f:
+                path = join(path, f.read().strip())
+        except IOError:
+            raise ValueError('%s is not a schema snapshot' % path)
+    return tuple(join(path, name) for name, url in SCHEMA_URLS)
+
+
+def generator_digest(_digests=[]):
+    """Returns a hash of this version of generate.py."""
+    if not _digests:
+        with open(os.path.splitext(__file__)[0] + '.py') as f:
+            _digests.append(hashlib.sha1(f.read()).hexdigest())
+    return _digests[0]
+
+
+def build_stamp(schema_digest, options):
+    """Returns the stamp identifying output generated from the schema with
+    hash `schema_digest` with the given options by this version of
+    generate.py."""
+    digest = hashlib.sha1(schema_digest)
+    digest.update(generator_digest())
+    digest.update(repr(sorted(options)))
+    return digest.hexdigest()
+
+
+class RenderCache(object):
+
+    """A cache of the text generated for each object type, so types that
+    haven't changed since the last run needn't be rendered or written again.
+
+    Each type's text is kept with the type's `ObjectType.content_hash`, and
+    reused while the hash is the same. The cache is kept in a JSON file, in a
+    separate section for each kind of output. The file also keeps the stamps
+    of outputs (such as doc directories) that can't hold their own.
+
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.sections = dict()
+        self.rendered = set()
+        if filename is not None and exists(filename):
+            with open(filename) as f:
+                self.sections = json.load(f)
+
+    def render(self, section, objtype, render):
+        """Returns the text for `objtype` in the given section of the cache,
+        calling `render` with `objtype` to make it if the cached text is out
+        of date."""
+        entries = self.sections.setdefault(section, dict())
+        content_hash = objtype.content_hash
+        try:
+            cached_hash, text = entries[objtype.name]
+        except KeyError:
+            pass
+        else:
+            if cached_hash == content_hash:
+                return text
+
+        logging.debug('Rendering %s for %s', section, objtype.name)
+        text = render(objtype)
+        entries[objtype.name] = [content_hash, text]
+        self.rendered.add((section, objtype.name))
+        return text
+
+    def render_source(self, objtype):
+        """Returns the Python source of the class for `objtype`."""
+        source = self.render('source', objtype, lambda t: str(t).decode('utf-8'))
+        return source.encode('utf-8')
+
+    def stamp(self, out_fn):
+        """Returns the stamp recorded for the output at `out_fn`, or ``None``
+        if there isn't one."""
+        return self.sections.get('stamps', {}).get(os.path.abspath(out_fn))
+
+    def set_stamp(self, out_fn, stamp):
+        """Records `stamp` as the stamp of the output at `out_fn`."""
+        self.sections.setdefault('stamps', dict())[os.path.abspath(out_fn)] = stamp
+
+    def save(self):
+        if self.filename is None:
+            return
+        logging.info('Rendered %d sections, %s', len(self.rendered),
+            ', '.join(sorted('%s %s' % (name, section) for section, name in self.rendered)) or 'none')
+        with open(self.filename, 'w') as f:
+            json.dump(self.sections, f, sort_keys=True)
 
-    if nouns_fn is None:
-        nouns = json.load(urllib2.urlopen('http://api.typepad.com/nouns.json'))
-    else:
-        with open(nouns_fn) as f:
-            nouns = json.load(f)
 
+def read_stamp(out_fn, cache):
+    """Returns the stamp of the output previously generated at `out_fn`, or
+    ``None`` if there isn't one.
+
+    Python modules carry their stamp in their first line. The stamps of other
+    output are kept in the `RenderCache`, if it's saved to a file.
+
+    """
+    if not exists(out_fn):
+        return None
+    if not isdir(out_fn):
+        with open(out_fn) as f:
+            mo = re.match(r'# Generated by generate\.py \(stamp (\w+)\)', f.readline())
+        if mo is not None:
+            return mo.group(1)
+    return cache.stamp(out_fn)
+
+
+def generate_types(types, nouns):
     objtypes = set()
     objtypes_by_name = dict()
     typedata = dict((d['name'], d) for d in types['entries'])
@@ -941,6 +1169,7 @@ def generate_types(types_fn=None, nouns_fn=None):
 
             del typedata[name]
             objtype = ObjectType(info)
+            objtype.schema_json = json.dumps(info, sort_keys=True)
             objtypes.add(objtype)
             objtypes_by_name[objtype.name] = objtype
 
@@ -970,10 +1199,14 @@ def generate_types(types_fn=None, nouns_fn=None):
     return objtypes
 
 
-def write_module(objtypes, out_fn):
+def write_module(objtypes, out_fn, stamp=None, cache=None):
+    if cache is None:
+        cache = RenderCache()
     wrote = set(('TypePadObject',))
     wrote_one = True
     with open(out_fn, 'w') as outfile:
+        if stamp is not None:
+            outfile.write(STAMP_LINE % stamp)
         outfile.write(PREAMBLE.replace('\n', '', 1))
 
         while objtypes and wrote_one:
@@ -990,7 +1223,7 @@ def write_module(objtypes, out_fn):
                 break
 
             for objtype in sorted(eligible_types, key=lambda x: x.name):
-                outfile.write(str(objtype))
+                outfile.write(cache.render_source(objtype))
                 wrote.add(objtype.name)
                 objtypes.remove(objtype)
 
@@ -1001,37 +1234,97 @@ def write_module(objtypes, out_fn):
         outfile.write(POSTAMBLE.replace('\n', '', 1))
 
 
-def write_docstrings(objtypes, out_fn):
+def required_names(source, names):
+    """Returns the names in `names` that the Python code `source` refers to,
+    not counting attributes (such as `fields.Link`) or names only in strings
+    (such as the class names given to `fields.Object`, which are looked up
+    when they're used)."""
+    required = set()
+    previous = None
+    for token in tokenize.generate_tokens(StringIO(source).readline):
+        if token[0] == tokenize.NAME and token[1] in names and previous != '.':
+            required.add(token[1])
+        previous = token[1]
+    return required
+
+
+def write_table(objtypes, out_fn, stamp=None, cache=None):
+    if cache is None:
+        cache = RenderCache()
+    names = set(objtype.name for objtype in objtypes)
+    with open(out_fn, 'w') as outfile:
+        if stamp is not None:
+            outfile.write(STAMP_LINE % stamp)
+        outfile.write(PREAMBLE.replace('\n', '', 1))
+        outfile.write(TABLE_PREAMBLE.replace('\n', '', 1))
+
+        outfile.write('table = ClassTable({\n')
+        for objtype in sorted(objtypes, key=lambda x: x.name):
+            source = cache.render_source(objtype)
+            requires = sorted(required_names(source, names) - set((objtype.name,)))
+            outfile.write('    %r: (%r,\n        %r),\n' % (objtype.name, tuple(requires), source))
+        outfile.write('}, object_types={\n')
+        for name in (name for name in CLASS_HAS_OBJECT_TYPE if name in names):
+            outfile.write('    %r: %r,\n' % (name, name))
+        outfile.write('})\n')
+        outfile.write('"""The `ClassTable` of the API classes, which are made when they\'re first\nused."""\n\n')
+
+        outfile.write(POSTAMBLE)
+        outfile.write(TABLE_POSTAMBLE)
+
+
+def render_docstrings(objtype):
+    return dict((name, [getattr(prop, 'docString', None)]) for name, prop in objtype.properties.items())
 
-    docstrings = dict((objtype.name,
-        dict((name, [getattr(prop, 'docString', None)]) for name, prop in objtype.properties.items()))
+
+def write_docstrings(objtypes, out_fn, stamp=None, cache=None):
+    if cache is None:
+        cache = RenderCache()
+
+    docstrings = dict((objtype.name, cache.render('docstrings', objtype, render_docstrings))
         for objtype in objtypes)
 
     with open(out_fn, 'w') as outfile:
         json.dump(docstrings, outfile, indent=4, sort_keys=True)
 
+    if stamp is not None:
+        cache.set_stamp(out_fn, stamp)
 
-def write_docs(objtypes, out_dir):
-    for objtype in objtypes:
 
-        data = {
-            'name': objtype.name,
-            'synopsis': getattr(objtype, 'synopsis', None)
-        }
-        data['header'] = ('`%(name)s`' if data['synopsis'] is None else u'`%(name)s` \u2013 %(synopsis)s') % data
-        data['line'] = '=' * len(data['header'])
+def render_doc(objtype):
+    data = {
+        'name': objtype.name,
+        'synopsis': getattr(objtype, 'synopsis', None)
+    }
+    data['header'] = ('`%(name)s`' if data['synopsis'] is None else u'`%(name)s` \u2013 %(synopsis)s') % data
+    data['line'] = '=' * len(data['header'])
 
-        doc = """
+    doc = """
 %(header)s
 %(line)s
 
 .. autoclass:: typepad.api.%(name)s
    :members:
 """ % data
+    return doc.lstrip()
+
+
+def write_docs(objtypes, out_dir, stamp=None, cache=None):
+    if cache is None:
+        cache = RenderCache()
+
+    written = 0
+    for objtype in objtypes:
+        doc = cache.render('docs', objtype, render_doc)
+        filename = join(out_dir, '%s.rst' % objtype.name.lower())
+        if ('docs', objtype.name) in cache.rendered or not exists(filename):
+            with codecs.open(filename, 'w', 'utf-8') as outfile:
+                outfile.write(doc)
+            written += 1
+    logging.info('Wrote %d of %d docs', written, len(objtypes))
 
-        filename = '%s.rst' % objtype.name.lower()
-        with codecs.open(join(out_dir, filename), 'w', 'utf-8') as outfile:
-            outfile.write(doc.lstrip())
+    if stamp is not None:
+        cache.set_stamp(out_dir, stamp)
 
 
 def main(argv=None):
@@ -1054,12 +1347,21 @@ def main(argv=None):
     parser.add_argument('--nouns', metavar='file', help='parse file for noun endpoint info', default=None)
     parser.add_argument('-v', action=Add, nargs=0, dest='verbose', default=2, help='be more verbose')
     parser.add_argument('-q', action=Subt, nargs=0, dest='verbose', help='be less verbose')
-    parser.add_argument('outfile', help='file to write library to')
+    parser.add_argument('outfile', nargs='?', help='file to write library to')
 
     parser.add_argument('--docstrings', action='store_true', help='write docstrings JSON instead of the python module')
     parser.add_argument('--docs', action='store_true', help='write doc .rst files to the outfile directory instead of the python module')
+    parser.add_argument('--compact', action='store_true', help='make the classes store their field values compactly (see CompactTypePadObject)')
+    parser.add_argument('--table', action='store_true', help='write the python module as a table of classes made when they are first used (see typepad.classtable)')
+
+    parser.add_argument('--snapshot', metavar='dir', help='read the object types and nouns from a schema snapshot (or the latest in a directory of them) instead of the API', default=None)
+    parser.add_argument('--save-snapshot', metavar='dir', help='save the object types and nouns as a new snapshot in the directory', default=None)
+    parser.add_argument('--force', action='store_true', help='write the outfile even if it was generated from the same schema before')
+    parser.add_argument('--cache', metavar='file', help='keep the text generated for each object type in the file, and only generate it again for types that changed', default=None)
 
     ohyeah = parser.parse_args(argv)
+    if ohyeah.outfile is None and ohyeah.save_snapshot is None:
+        parser.error('an outfile is required unless saving a snapshot')
 
     log_level = ohyeah.verbose
     log_level = 0 if log_level < 0 else log_level if log_level <= 4 else 4
@@ -1067,14 +1369,41 @@ def main(argv=None):
     logging.basicConfig(level=log_level)
     logging.info('Log level set to %s', logging.getLevelName(log_level))
 
-    objtypes = generate_types(ohyeah.types, ohyeah.nouns)
+    if ohyeah.compact:
+        ObjectType.base_class = 'CompactTypePadObject'
+
+    types_fn, nouns_fn = ohyeah.types, ohyeah.nouns
+    if ohyeah.snapshot is not None:
+        snapshot_types_fn, snapshot_nouns_fn = snapshot_files(ohyeah.snapshot)
+        types_fn = types_fn or snapshot_types_fn
+        nouns_fn = nouns_fn or snapshot_nouns_fn
+    types, nouns = load_schema(types_fn, nouns_fn)
+    schema_digest = schema_hash(types, nouns)
+    logging.info('Schema hash is %s', schema_digest)
+
+    if ohyeah.save_snapshot is not None:
+        save_snapshot(types, nouns, ohyeah.save_snapshot)
+    if ohyeah.outfile is None:
+        return 0
+
     if ohyeah.docstrings:
         fn = write_docstrings
     elif ohyeah.docs:
         fn = write_docs
+    elif ohyeah.table:
+        fn = write_table
     else:
         fn = write_module
-    fn(objtypes, ohyeah.outfile)
+
+    cache = RenderCache(ohyeah.cache)
+    stamp = build_stamp(schema_digest, [fn.__name__, ObjectType.base_class])
+    if not ohyeah.force and read_stamp(ohyeah.outfile, cache) == stamp:
+        logging.info('%s is already generated from this schema, so not writing it', ohyeah.outfile)
+        return 0
+
+    objtypes = generate_types(types, nouns)
+    fn(objtypes, ohyeah.outfile, stamp=stamp, cache=cache)
+    cache.save()
 
     return 0
 
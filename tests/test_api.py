@@ -107,7 +107,7 @@ requests = {
               'accept': 'application/json',
               'content-type': 'application/json',
           },
-          'body': """{"content": "Hi this post has some content is it not nifty", "objectType": "Post", "categories": ["fred", "wilma"], "title": "New post #47"}""",
+          'body': mox.Func(json_equals_func({"content": "Hi this post has some content is it not nifty", "objectType": "Post", "categories": ["fred", "wilma"], "title": "New post #47"})),
           'method': 'POST' },
         { 'status': 201,
           'location': 'http://127.0.0.1:8000/assets/307.json',
@@ -644,6 +644,65 @@ class TestRelationship(unittest.TestCase):
         finally:
             typepad.client = real_typepad_client
 
+    def test_block_all(self):
+        real_typepad_client = typepad.client
+        typepad.client = mox.MockObject(typepad.TypePadClient)
+        try:
+            callbacks = list()
+            def save_callback(callback):
+                callbacks.append(callback)
+                return True
+            def deliver(*args):
+                for url, status in zip(urls, ('200 OK', '404 Not Found')):
+                    resp = httplib2.Response({
+                        'status':           int(status.split()[0]),
+                        'etag':             '7',
+                        'content-type':     'application/json',
+                        'content-location': url,
+                    })
+                    callbacks.pop(0)(url, resp, """{"types": ["tag:api.typepad.com,2009:Member"]}""")
+
+            urls = ['http://127.0.0.1:8000/relationships/%s/status.json' % url_id
+                for url_id in ('6r00d83451ce6b69e20120a81fb3a4970c', '6r00d83451ce6b69e20120a81fb3a4970d')]
+
+            typepad.client.batch_request()
+            for url in urls:
+                typepad.client.batch({'uri': url, 'headers': {'accept': 'application/json'}},
+                    mox.Func(save_callback))
+            typepad.client.complete_batch().WithSideEffects(deliver)
+
+            resp = httplib2.Response({
+                'status':           200,
+                'etag':             '9',
+                'content-type':     'application/json',
+                'content-location': urls[0],
+            })
+            typepad.client.request(
+                uri=urls[0],
+                method='PUT',
+                headers={'if-match': '7', 'accept': 'application/json', 'content-type': 'application/json'},
+                body=mox.Func(json_equals_func({"types": ["tag:api.typepad.com,2009:Blocked"]})),
+            ).AndReturn((resp, """{"types": ["tag:api.typepad.com,2009:Blocked"]}"""))
+            mox.Replay(typepad.client)
+
+            rels = [typepad.Relationship.get(url[:-len('/status.json')] + '.json', batch=False)
+                for url in urls]
+            results = typepad.Relationship.block_all(rels)
+
+            mox.Verify(typepad.client)
+
+            self.assertEquals(len(results), 2)
+            self.assert_(results[0].ok)
+            self.assert_(results[0].item is rels[0])
+            self.assert_(isinstance(results[0].value, typepad.RelationshipStatus))
+            self.assertEquals(results[0].value.types, ["tag:api.typepad.com,2009:Blocked"])
+            self.assert_(not results[1].ok)
+            self.assert_(results[1].item is rels[1])
+            self.assert_(isinstance(results[1].error, typepad.RelationshipStatus.NotFound))
+
+        finally:
+            typepad.client = real_typepad_client
+
 
 class TestUserAndUserProfile(unittest.TestCase):
 
@@ -0,0 +1,145 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import errno
+import socket
+import threading
+import unittest
+
+import httplib2
+
+import typepad
+from typepad import bulk
+
+
+class TestRun(unittest.TestCase):
+
+    def test_ordered_results(self):
+        threads = set()
+        def double(x):
+            threads.add(threading.currentThread())
+            if x == 3:
+                raise ValueError('three')
+            return x * 2
+
+        results = bulk.run(double, range(8), max_workers=4)
+
+        self.assertEquals([r.item for r in results], range(8))
+        self.assertEquals([r.value for r in results], [0, 2, 4, None, 8, 10, 12, 14])
+        self.assert_(isinstance(results[3].error, ValueError))
+        self.assertEquals(bulk.errors(results), [results[3]])
+        self.assert_(threading.currentThread() not in threads)
+
+    def test_worker_clients(self):
+        typepad.client.endpoint = 'http://api.example.com'
+        typepad.client.cookies['session'] = 'abc'
+        try:
+            def client_info(x):
+                return typepad.client.client, typepad.client.endpoint, typepad.client.cookies
+            results = bulk.run(client_info, range(2), max_workers=2)
+        finally:
+            typepad.client.endpoint = typepad.TypePadClient.endpoint
+            typepad.client.cookies.clear()
+
+        for result in results:
+            client, endpoint, cookies = result.value
+            self.assert_(client is not typepad.client.client)
+            self.assertEquals(endpoint, 'http://api.example.com')
+            self.assertEquals(cookies, {'session': 'abc'})
+
+    def test_serial_without_proxy(self):
+        real_typepad_client = typepad.client
+        typepad.client = typepad.TypePadClient()
+        try:
+            threads = set()
+            def note_thread(x):
+                threads.add(threading.currentThread())
+            bulk.run(note_thread, range(4), max_workers=4)
+        finally:
+            typepad.client = real_typepad_client
+
+        self.assertEquals(threads, set([threading.currentThread()]))
+
+    def test_retry_unsent(self):
+        failures = {
+            0: socket.error(errno.ECONNREFUSED, 'Connection refused'),
+            1: httplib2.ServerNotFoundError('no such host'),
+        }
+        calls = list()
+        def fail_once(x):
+            calls.append(x)
+            if x in failures:
+                raise failures.pop(x)
+            return x
+
+        results = bulk.run(fail_once, range(3), max_workers=1, retries=1,
+            retry_delay=0)
+
+        self.assertEquals(bulk.errors(results), [])
+        self.assertEquals(sorted(calls), [0, 0, 1, 1, 2])
+
+    def test_no_retry_after_send(self):
+        failures = (
+            socket.timeout('timed out'),
+            socket.error(errno.ECONNRESET, 'Connection reset by peer'),
+            ValueError('bad response'),
+        )
+        calls = list()
+        def fail(x):
+            calls.append(x)
+            raise failures[x]
+
+        results = bulk.run(fail, range(3), max_workers=1, retries=2,
+            retry_delay=0)
+
+        self.assertEquals([r.error for r in results], list(failures))
+        self.assertEquals(calls, range(3))
+
+    def test_retry_on_classes(self):
+        calls = list()
+        def fail(x):
+            calls.append(x)
+            raise ValueError('bad response')
+
+        results = bulk.run(fail, [0], max_workers=1, retries=2,
+            retry_on=ValueError, retry_delay=0)
+
+        self.assert_(isinstance(results[0].error, ValueError))
+        self.assertEquals(calls, [0, 0, 0])
+
+    def test_safe_to_retry(self):
+        self.assert_(bulk.safe_to_retry(socket.gaierror(-2, 'Name or service not known')))
+        self.assert_(bulk.safe_to_retry(socket.error(errno.ECONNREFUSED, 'Connection refused')))
+        self.failIf(bulk.safe_to_retry(socket.error(errno.EPIPE, 'Broken pipe')))
+        self.failIf(bulk.safe_to_retry(socket.error('connection refused')))
+        self.failIf(bulk.safe_to_retry(KeyError('x')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import time
+import unittest
+
+import httplib2
+import mox
+
+import typepad
+from typepad.cache import SnapshotCache, find_class
+from tests import utils
+
+
+class TestSnapshotCache(utils.TempdirTestCase):
+
+    def setUp(self):
+        super(TestSnapshotCache, self).setUp()
+        self.cache = SnapshotCache(os.path.join(self.tempdir, 'cache.db'))
+
+    def test_round_trip(self):
+        event = typepad.Event.from_dict({
+            'objectType': 'Event',
+            'urlId': '6e1234',
+            'verbs': ['tag:api.typepad.com,2009:NewAsset'],
+            'actor': {'objectType': 'User', 'displayName': 'Mike', 'urlId': '6p1234'},
+            'object': {'objectType': 'Post', 'title': 'Hi', 'urlId': '6a1234'},
+        })
+        event._etag = '7'
+        self.cache.put(event)
+
+        # A cache opened by another process sees it too.
+        cache = SnapshotCache(self.cache.path)
+        cached = cache.get('http://api.typepad.com/events/6e1234.json')
+        self.assert_(isinstance(cached, typepad.Event))
+        self.assertEquals(cached._location, 'http://api.typepad.com/events/6e1234.json')
+        self.assertEquals(cached._etag, '7')
+        self.assert_(cached._delivered)
+        self.assert_(isinstance(cached.actor, typepad.User))
+        self.assert_(isinstance(cached.object, typepad.Post))
+        self.assertEquals(cached.object.title, 'Hi')
+        self.assertEquals(cached.to_dict(), event.to_dict())
+
+        # Relative and HTTPS URLs find the same object.
+        self.assert_(cache.get('/events/6e1234.json') is not None)
+        self.assert_(cache.get('https://api.typepad.com/events/6e1234.json') is not None)
+        self.assert_(cache.get('/events/6e5678.json') is None)
+
+        cache.delete('/events/6e1234.json')
+        self.assert_(cache.get('/events/6e1234.json') is None)
+
+    def test_max_age(self):
+        group = typepad.Group.from_dict({'objectType': 'Group', 'urlId': '6p1234'})
+        self.cache.put(group)
+        self.assert_(self.cache.get(group._location, max_age=60) is not None)
+        self.cache._db().execute("UPDATE objects SET saved = ?", (time.time() - 120,))
+        self.assert_(self.cache.get(group._location, max_age=60) is None)
+        self.assert_(self.cache.get(group._location) is not None)
+
+    def test_load_all(self):
+        self.cache.put_all([
+            typepad.Group.from_dict({'objectType': 'Group', 'urlId': '6p1234'}),
+            typepad.Application.from_dict({'objectType': 'Application', 'id': '6p5678'}),
+        ])
+        objs = self.cache.load_all()
+        self.assertEquals(sorted(type(obj).__name__ for obj in objs), ['Application', 'Group'])
+        objs = self.cache.load_all(classes=[typepad.Application])
+        self.assertEquals([obj.id for obj in objs], ['6p5678'])
+
+    def test_list_classes(self):
+        self.assert_(find_class('ListOfBadge') is typepad.ListOf('Badge'))
+        self.assert_(find_class('StreamOfEvent') is typepad.StreamOf('Event'))
+        self.assertRaises(KeyError, find_class, 'ListOfNothing')
+
+        members = typepad.ListOf('Relationship').from_dict({'totalResults': 1, 'entries': [
+            {'urlId': '6r1234', 'source': {'objectType': 'User'}},
+        ]})
+        members._location = 'http://api.typepad.com/groups/6p1234/memberships.json'
+        self.cache.put(members)
+        cached = self.cache.get(members._location)
+        self.assert_(isinstance(cached, typepad.ListOf('Relationship')))
+        self.assert_(isinstance(cached[0], typepad.Relationship))
+        self.assert_(isinstance(cached[0].source, typepad.User))
+
+    def test_fetch(self):
+        http = typepad.TypePadClient()
+        typepad.client = http
+
+        mock = mox.Mox()
+        mock.StubOutWithMock(http, 'request')
+        http.request(uri='http://api.typepad.com/groups/6p1234.json',
+            headers={'accept': 'application/json'}).AndReturn((httplib2.Response({
+                'status': 200,
+                'etag': '7',
+                'content-type': 'application/json',
+            }), '{"objectType": "Group", "urlId": "6p1234", "displayName": "Augue Tempor"}'))
+        mock.ReplayAll()
+
+        group = self.cache.fetch(typepad.Group, '/groups/6p1234.json')
+        self.assertEquals(group.display_name, 'Augue Tempor')
+        # The second fetch comes from the cache.
+        group = self.cache.fetch(typepad.Group, '/groups/6p1234.json')
+        self.assertEquals(group.display_name, 'Augue Tempor')
+        self.assertEquals(group._etag, '7')
+
+        mock.VerifyAll()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import types
+import unittest
+
+from remoteobjects.dataobject import find_by_name
+
+import typepad
+from typepad import classtable
+
+
+MODULE = '''
+from typepad.tpobject import *
+from typepad import fields
+from typepad.classtable import ClassTable
+
+table = ClassTable({
+    'TableAuthor': ((), """class TableAuthor(TypePadObject):
+    _class_object_type = 'TableAuthor'
+    display_name = fields.Field(api_name='displayName')
+"""),
+    'TableThing': (('TableRef',), """class TableThing(TypePadObject):
+    _class_object_type = 'TableThing'
+    title = fields.Field()
+    author = fields.Object('TableAuthor')
+    def ref(self):
+        return TableRef(title=self.title)
+"""),
+    'TableSubthing': (('TableThing',), """class TableSubthing(TableThing):
+    _class_object_type = 'TableSubthing'
+    filename = fields.Field()
+"""),
+    'TableRef': (('TableThing',), """class TableRef(TypePadObject):
+    title = fields.Field()
+    def thing(self):
+        return TableThing(title=self.title)
+"""),
+}, object_types={
+    'TableAuthor': 'TableAuthor',
+    'TableThing': 'TableThing',
+    'TableSubthing': 'TableSubthing',
+})
+
+table.install(__name__)
+'''
+
+
+class TestClassTable(unittest.TestCase):
+
+    def setUp(self):
+        module = types.ModuleType('tests.classtable_example')
+        sys.modules[module.__name__] = module
+        exec MODULE in module.__dict__
+        self.module = sys.modules[module.__name__]
+        self.table = self.module.table
+
+    def tearDown(self):
+        del sys.modules[self.module.__name__]
+        classtable.tables.remove(self.table)
+
+    def test_attribute(self):
+        self.assert_(isinstance(self.module, classtable.TableModule))
+        self.assertEquals(self.table.loaded, {})
+
+        subthing = self.module.TableSubthing
+        self.assertEquals(subthing.__module__, 'tests.classtable_example')
+        self.assert_(issubclass(subthing, self.module.TableThing))
+        # Classes the methods refer to are made too.
+        self.assertEquals(sorted(self.table.loaded), ['TableRef', 'TableSubthing', 'TableThing'])
+        self.assert_(self.module.TableThing(title='Hi').ref().thing().__class__ is self.module.TableThing)
+
+        self.assert_('TableAuthor' in self.module.__all__)
+        self.assertRaises(AttributeError, lambda: self.module.TableNothing)
+        self.assertRaises(KeyError, self.table.load, 'TableNothing')
+
+    def test_find_by_name(self):
+        thing = find_by_name('TableThing').from_dict({'title': 'Hi', 'author': {'displayName': 'Mike'}})
+        self.assert_('TableAuthor' not in self.table.loaded)
+        self.assertEquals(thing.author.display_name, 'Mike')
+        self.assert_(thing.author.__class__ is self.module.TableAuthor)
+
+    def test_object_type(self):
+        obj = typepad.TypePadObject.from_dict({'objectType': 'TableSubthing', 'filename': 'a.txt'})
+        self.assertEquals(obj.__class__.__name__, 'TableSubthing')
+        self.assertEquals(obj.filename, 'a.txt')
+
+        obj = typepad.TypePadObject.from_dict({'objectType': 'TableNothing'})
+        self.assert_(obj.__class__ is typepad.TypePadObject)
+
+    def test_load_all(self):
+        self.table.load_all()
+        self.assertEquals(sorted(self.table.loaded), self.table.names())
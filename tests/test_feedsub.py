@@ -0,0 +1,298 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import hashlib
+import hmac
+from StringIO import StringIO
+from tempfile import SpooledTemporaryFile
+import threading
+import time
+import unittest
+from wsgiref import util as wsgiutil
+
+import typepad
+from typepad import feedsub
+from typepad.feedsub import CallbackReceiver, SeenEntries, SignatureVerifier, parse_entries
+
+
+FEED = """<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+    <id>tag:example.com,2010:feed</id>
+    <title>Example Feed</title>
+    <link rel="self" href="http://feeds.example.com/ExampleFeed"/>
+    %s
+</feed>"""
+
+ENTRY = """<entry>
+        <id>tag:example.com,2010:entry-%(n)d</id>
+        <published>2010-07-06T23:26:42+00:00</published>
+        <title>Entry %(n)d</title>
+        <summary type="html">Summary &lt;b&gt;%(n)d&lt;/b&gt;</summary>
+        <content type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml">Content %(n)d</div></content>
+        <link rel="replies" type="application/rss+xml" href="http://example.com/%(n)d/rss"/>
+        <link rel="alternate" type="text/html" href="http://example.com/%(n)d"/>
+        <category term="example"/>
+    </entry>"""
+
+
+def feed(count):
+    return FEED % ''.join(ENTRY % {'n': n} for n in range(count))
+
+
+class TestFeedSub(unittest.TestCase):
+
+    def request(self, app, method='GET', query='', body='', headers=None):
+        environ = {
+            'REQUEST_METHOD': method,
+            'QUERY_STRING': query,
+            'PATH_INFO': '/feed-sub',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': StringIO(body),
+        }
+        environ.update(headers or {})
+        wsgiutil.setup_testing_defaults(environ)
+        response = {}
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+        response['body'] = ''.join(app(environ, start_response))
+        return response
+
+    def test_parse_entries(self):
+        entries = list(parse_entries(StringIO(feed(2))))
+        self.assertEquals(len(entries), 2)
+
+        entry = entries[1]
+        self.assertEquals(entry.id, 'tag:example.com,2010:entry-1')
+        self.assertEquals(entry.title, 'Entry 1')
+        self.assertEquals(entry.summary, 'Summary <b>1</b>')
+        self.assert_('Content 1</html:div>' in entry.content)
+        self.assertEquals(entry.published, '2010-07-06T23:26:42+00:00')
+        self.assert_(entry.updated is None)
+        self.assertEquals(entry.link, 'http://example.com/1')
+        self.assertEquals(entry.links[0], {'rel': 'replies', 'type': 'application/rss+xml',
+            'href': 'http://example.com/1/rss'})
+        self.assertEquals(entry.categories, ['example'])
+        self.assertEquals(entry.feed_id, 'tag:example.com,2010:feed')
+        self.assertEquals(entry.feed_url, 'http://feeds.example.com/ExampleFeed')
+
+        self.assertRaises(SyntaxError, lambda: list(parse_entries(StringIO('<feed>'))))
+
+    def test_verify(self):
+        app = CallbackReceiver(None, verify_token='3FQui9KU6')
+        response = self.request(app, query='hub.mode=subscribe&hub.challenge=4mg4zMm8J&hub.verify_token=3FQui9KU6')
+        self.assertEquals(response['status'], '200 OK')
+        self.assertEquals(response['body'], '4mg4zMm8J')
+
+        response = self.request(app, query='hub.mode=subscribe&hub.challenge=4mg4zMm8J&hub.verify_token=nope')
+        self.assertEquals(response['status'], '404 Not Found')
+        response = self.request(app, query='hub.mode=subscribe&hub.challenge=4mg4zMm8J')
+        self.assertEquals(response['status'], '404 Not Found')
+        response = self.request(app, query='hub.mode=publish&hub.challenge=4mg4zMm8J&hub.verify_token=3FQui9KU6')
+        self.assertEquals(response['status'], '404 Not Found')
+
+        verified = []
+        def verify(token, mode, topic):
+            verified.append((token, mode, topic))
+            return True
+        app = CallbackReceiver(None, verify_token=verify)
+        response = self.request(app, query='hub.mode=unsubscribe&hub.challenge=x&hub.verify_token=t&hub.topic=http%3A//example.com/')
+        self.assertEquals(response['body'], 'x')
+        self.assertEquals(verified, [('t', 'unsubscribe', 'http://example.com/')])
+
+        app = CallbackReceiver(None, verify_token=set(['a', 'b']))
+        self.assertEquals(self.request(app, query='hub.mode=subscribe&hub.challenge=x&hub.verify_token=b')['body'], 'x')
+
+        self.assertEquals(self.request(app, method='PUT')['status'], '405 Method Not Allowed')
+
+    def test_receive(self):
+        received = []
+        app = CallbackReceiver(lambda entry, environ: received.append(entry.title), verify_token='x')
+        response = self.request(app, method='POST', body=feed(3))
+        self.assertEquals(response['status'], '204 No Content')
+        self.assertEquals(received, ['Entry 0', 'Entry 1', 'Entry 2'])
+
+        response = self.request(app, method='POST', body='<feed xmlns="http://www.w3.org/2005/Atom"><entry>')
+        self.assertEquals(response['status'], '400 Bad Request')
+        self.assertEquals(len(received), 3)
+
+        # Once some entries were handled, a push that turns out to be
+        # malformed is still answered as received, so those entries aren't
+        # pushed and handled again.
+        body = feed(3)
+        body = body[:body.index('Entry 2</title>')]
+        response = self.request(app, method='POST', body=body)
+        self.assertEquals(response['status'], '204 No Content')
+        self.assertEquals(received, ['Entry 0', 'Entry 1', 'Entry 2', 'Entry 0', 'Entry 1'])
+
+    def test_incremental(self):
+        body = feed(500)
+        reads = []
+        class Input(StringIO):
+            def read(self, size=-1):
+                data = StringIO.read(self, size)
+                reads.append(len(data))
+                return data
+
+        seen = []
+        def handler(entry, environ):
+            seen.append(sum(reads))
+        app = CallbackReceiver(handler, verify_token='x')
+        self.request(app, method='POST', body=body, headers={'wsgi.input': Input(body)})
+
+        self.assertEquals(len(seen), 500)
+        # The first entries were handled before the whole body was read.
+        self.assert_(seen[0] < len(body) / 4)
+        self.assertEquals(sum(reads), len(body))
+
+    def test_signed(self):
+        body = feed(2)
+        signature = 'sha1=' + hmac.new('s33krit', body, hashlib.sha1).hexdigest()
+
+        received = []
+        app = CallbackReceiver(lambda entry, environ: received.append(entry.id), verify_token='x',
+            secret='s33krit')
+        app.spool_size = 100
+        app.read_size = 64
+
+        response = self.request(app, method='POST', body=body,
+            headers={'HTTP_X_HUB_SIGNATURE': signature})
+        self.assertEquals(response['status'], '204 No Content')
+        self.assertEquals(len(received), 2)
+
+        del received[:]
+        for bad in (None, 'sha1=' + '0' * 40, signature[:-1], 'md5=' + signature[5:]):
+            headers = {}
+            if bad is not None:
+                headers['HTTP_X_HUB_SIGNATURE'] = bad
+            response = self.request(app, method='POST', body=body, headers=headers)
+            self.assertEquals(response['status'], '202 Accepted')
+        self.assertEquals(received, [])
+
+        # The spooled copy of the body is closed however the push ends.
+        spools = []
+        class Spool(SpooledTemporaryFile):
+            def __init__(self, *args, **kwargs):
+                SpooledTemporaryFile.__init__(self, *args, **kwargs)
+                spools.append(self)
+        truncated = body[:body.index('Entry 1</title>')]
+        feedsub.SpooledTemporaryFile = Spool
+        try:
+            self.request(app, method='POST', body=body,
+                headers={'HTTP_X_HUB_SIGNATURE': signature})
+            self.request(app, method='POST', body=body, headers={})
+            self.request(app, method='POST', body=truncated, headers={'HTTP_X_HUB_SIGNATURE':
+                'sha1=' + hmac.new('s33krit', truncated, hashlib.sha1).hexdigest()})
+        finally:
+            feedsub.SpooledTemporaryFile = SpooledTemporaryFile
+        self.assertEquals(len(spools), 3)
+        self.assert_(all(spool.closed for spool in spools))
+        del received[:]
+
+        # The secret can depend on the request.
+        app.secret = lambda environ: environ['PATH_INFO'] == '/feed-sub' and u's33krit' or None
+        response = self.request(app, method='POST', body=body,
+            headers={'HTTP_X_HUB_SIGNATURE': signature})
+        self.assertEquals(len(received), 2)
+
+    def test_verify_all(self):
+        def sign(body, secret):
+            return 'sha1=' + hmac.new(secret, body, hashlib.sha1).hexdigest()
+
+        verifier = SignatureVerifier()
+        pushes = [
+            (feed(1), sign(feed(1), 'one'), 'one'),
+            (feed(2), sign(feed(2), 'one'), 'two'),
+            (StringIO(feed(3)), sign(feed(3), 'two'), u'two'),
+            (feed(4), None, 'one'),
+            (feed(5), sign(feed(5), 'one'), 'one'),
+        ]
+        self.assertEquals(verifier.verify_all(pushes, max_workers=3), [True, False, True, False, True])
+        pushes[2][0].seek(0)
+
+        # Checking doesn't depend on the API client, so it's done on
+        # several threads even when typepad.client isn't thread-aware.
+        threads = set()
+        verify = verifier.verify
+        def note_thread(*args):
+            threads.add(threading.currentThread())
+            time.sleep(0.01)
+            return verify(*args)
+        verifier.verify = note_thread
+        real_typepad_client = typepad.client
+        typepad.client = typepad.TypePadClient()
+        try:
+            self.assertEquals(verifier.verify_all(pushes, max_workers=3), [True, False, True, False, True])
+        finally:
+            typepad.client = real_typepad_client
+        self.assert_(len(threads) > 1)
+        self.assert_(threading.currentThread() not in threads)
+
+        # The keyed HMACs are kept for each secret.
+        self.assertEquals(sorted(verifier._keyed), ['one', 'two'])
+
+    def test_seen_entries(self):
+        seen = SeenEntries(max_size=6)
+        self.assert_(seen.add('a'))
+        self.assert_(not seen.add('a'))
+        self.assert_('a' in seen)
+        self.assert_(u'a' in seen)
+        self.assert_('b' not in seen)
+
+        for entry_id in 'bc':
+            self.assert_(seen.add(entry_id))
+        # Adding the third ID started a new generation, so 'a' is still
+        # remembered, and seeing it again moves it to the new generation.
+        self.assert_(not seen.add('a'))
+        for entry_id in 'def':
+            self.assert_(seen.add(entry_id))
+        self.assert_('a' in seen)
+        self.assert_('b' not in seen)
+        self.assert_(len(seen) <= 6)
+
+        seen.discard('a')
+        self.assert_('a' not in seen)
+
+    def test_receive_seen(self):
+        received = []
+        def handler(entry, environ):
+            if entry.title == 'Entry 3' and not received:
+                raise ValueError('oops')
+            received.append(entry.id)
+        seen = SeenEntries()
+        app = CallbackReceiver(handler, verify_token='x', seen=seen)
+
+        self.assertRaises(ValueError, lambda: self.request(app, method='POST', body=FEED % (ENTRY % {'n': 3})))
+        self.request(app, method='POST', body=feed(2))
+        self.request(app, method='POST', body=feed(4))
+        self.assertEquals(received, ['tag:example.com,2010:entry-%d' % n for n in (0, 1, 2, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+import httplib2
+import remoteobjects.http
+import simplejson
+
+import typepad
+from typepad import jsonlib
+
+
+class TestJsonlib(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = jsonlib.backend
+
+    def tearDown(self):
+        jsonlib.backend = self.backend
+
+    def test_backends(self):
+        self.assert_('json' in jsonlib.backends)
+        self.assertRaises(ValueError, jsonlib.use, 'blargh')
+
+        data = {'title': u'Mik\xe9', 'url': 'http://example.com/', 'n': None, 'ratio': 0.1, 'tags': [1, 2]}
+        for name in jsonlib.backends:
+            jsonlib.use(name)
+            self.assertEquals(jsonlib.backend.name, name)
+            encoded = jsonlib.dumps(data)
+            self.assert_(isinstance(encoded, str))
+            self.assert_('\\/' not in encoded)
+            self.assertEquals(jsonlib.loads(encoded), data)
+
+            # Objects are encoded with the default function.
+            self.assertEquals(jsonlib.loads(jsonlib.dumps({'a': object()}, default=lambda o: 'obj')), {'a': 'obj'})
+
+            # Invalid UTF-8 is forgiven.
+            self.assertEquals(jsonlib.loads('{"a": "\xe9"}').keys(), ['a'])
+            self.assertRaises(ValueError, jsonlib.loads, '{bad')
+
+    def test_response(self):
+        for name in jsonlib.backends:
+            jsonlib.use(name)
+            user = typepad.User.get('http://api.typepad.com/users/6p1234.json', batch=False)
+            response = httplib2.Response({'status': 200, 'content-type': 'application/json', 'etag': '"7"'})
+            user.update_from_response(user._location, response, '{"displayName": "Mike", "urlId": "6p1234"}')
+            self.assert_(user._delivered)
+            self.assertEquals(user._etag, '"7"')
+            self.assertEquals(user.display_name, 'Mike')
+
+    def test_response_decoding(self):
+        decoded = list()
+        class Recorder(jsonlib._Backend):
+            def loads(self, content):
+                decoded.append(content)
+                return super(Recorder, self).loads(content)
+        jsonlib.backend = Recorder('json', __import__('json'))
+
+        user = typepad.User.get('http://api.typepad.com/users/6p1234.json', batch=False)
+        response = httplib2.Response({'status': 200, 'content-type': 'application/json'})
+        user.update_from_response(user._location, response, '{"displayName": "Mike"}')
+        self.assertEquals(decoded, ['{"displayName": "Mike"}'])
+        self.assertEquals(user.display_name, 'Mike')
+
+        # Only TypePad objects are decoded that way.
+        self.assert_(remoteobjects.http.json is simplejson)
+
+    def test_default_backend(self):
+        # ujson decodes differently, so it's only used when chosen.
+        self.assert_(self.backend.name in ('simplejson', 'json'))
+
+    def test_request_bodies(self):
+        defaults = list()
+        class Recorder(jsonlib._Backend):
+            def dumps(self, data, default=None):
+                defaults.append(default)
+                return super(Recorder, self).dumps(data, default=default)
+        jsonlib.backend = Recorder('json', __import__('json'))
+
+        typepad.Post(title='Hi').to_json()
+        typepad.Group._AddMemberPost(user_id='6p1234').to_json()
+        # Compiled encoders need no default function, so libraries that
+        # can't call one (such as ujson) can encode their output.
+        self.assertEquals(defaults, [None, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+import typepad
+from typepad import packing
+
+
+class PackedCompactThing(typepad.CompactTypePadObject):
+
+    title = typepad.fields.Field()
+    author = typepad.fields.Object('User')
+
+
+class TestPacking(unittest.TestCase):
+
+    def event(self):
+        event = typepad.Event.from_dict({
+            'objectType': 'Event',
+            'urlId': '6e1234',
+            'verbs': ['tag:api.typepad.com,2009:NewAsset'],
+            'actor': {
+                'objectType': 'User',
+                'displayName': u'Mik\xe9',
+                'urlId': '6p1234',
+                'avatarLink': {'url': 'http://example.com/a.jpg', 'width': 50, 'height': 50},
+            },
+            'object': {
+                'objectType': 'Post',
+                'title': 'Hi',
+                'urlId': '6a1234',
+                'categories': ['news', 'python'],
+                'embeddedImageLinks': [{'url': 'http://example.com/b.jpg', 'width': 640}],
+                'somethingNew': {'a': 1},
+            },
+        })
+        event._location = 'http://api.typepad.com/events/6e1234.json'
+        event._etag = '7'
+        return event
+
+    def test_round_trip(self):
+        event = self.event()
+        for codec in packing.codecs:
+            data = packing.pack(event, codec=codec)
+            self.assert_(isinstance(data, str))
+
+            unpacked = packing.unpack(data)
+            self.assert_(isinstance(unpacked, typepad.Event))
+            self.assertEquals(unpacked._location, event._location)
+            self.assertEquals(unpacked._etag, '7')
+            self.assertEquals(unpacked.to_dict(), event.to_dict())
+
+            # Embedded objects keep their subclasses.
+            self.assert_(isinstance(unpacked.actor, typepad.User))
+            self.assert_(isinstance(unpacked.object, typepad.Post))
+            self.assertEquals(unpacked.actor.display_name, u'Mik\xe9')
+            self.assertEquals(unpacked.actor.avatar_link.width, 50)
+            self.assertEquals(unpacked.object.embedded_image_links[0].url, 'http://example.com/b.jpg')
+            # Data with no field is kept too.
+            self.assertEquals(unpacked.object.api_data['somethingNew'], {'a': 1})
+
+    def test_changed_fields(self):
+        event = self.event()
+        event.object.title = 'Changed'
+
+        unpacked = packing.unpack(packing.pack(event))
+        self.assertEquals(unpacked.object.title, 'Changed')
+
+    def test_compact(self):
+        thing = PackedCompactThing.from_dict({'author': {'objectType': 'User', 'displayName': 'Mike'}})
+        thing.title = 'Changed'
+
+        unpacked = packing.unpack(packing.pack(thing))
+        self.assert_(isinstance(unpacked, PackedCompactThing))
+        self.assertEquals(unpacked.title, 'Changed')
+        self.assertEquals(unpacked.author.display_name, 'Mike')
+
+    def test_pack_all(self):
+        first = self.event()
+        second = typepad.Post.from_dict({'objectType': 'Post', 'title': 'Hello'})
+
+        objs = packing.unpack_all(packing.pack_all([first, second]))
+        self.assertEquals([type(obj) for obj in objs], [typepad.Event, typepad.Post])
+        self.assertEquals([obj.to_dict() for obj in objs], [first.to_dict(), second.to_dict()])
+
+    def test_smaller(self):
+        import simplejson as json
+        event = self.event()
+        self.assert_(len(packing.pack(event)) < len(json.dumps(event.to_dict())))
+
+    def test_bad_data(self):
+        self.assertRaises(ValueError, packing.pack, self.event(), codec='bogus')
+        self.assertRaises(ValueError, packing.unpack, 'X' + 'whatever')
+
+
+if __name__ == '__main__':
+    unittest.main()
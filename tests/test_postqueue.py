@@ -0,0 +1,192 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import errno
+import os
+import socket
+import unittest
+
+import httplib2
+import mox
+
+import typepad
+from typepad.postqueue import PostQueue
+from tests import utils
+
+
+class TestPostQueue(utils.TempdirTestCase):
+
+    def setUp(self):
+        super(TestPostQueue, self).setUp()
+        self.path = os.path.join(self.tempdir, 'posts.db')
+
+    def group(self):
+        group = typepad.Group()
+        group._location = 'http://api.typepad.com/groups/7.json'
+        return group.post_assets
+
+    def test_post(self):
+        http = typepad.TypePadClient()
+        typepad.client = http
+
+        mock = mox.Mox()
+        mock.StubOutWithMock(http, 'request')
+        request = dict(
+            uri='http://api.typepad.com/groups/7/post-assets.json',
+            method='POST',
+            headers=mox.IgnoreArg(),
+            body=mox.Func(lambda body: utils.json_equals({'objectType': 'Post', 'title': 'Hi'}, body)),
+        )
+        http.request(**request).AndRaise(socket.error(errno.ECONNREFUSED, 'Connection refused'))
+        http.request(**request).AndReturn((httplib2.Response({
+            'status': 201,
+            'location': 'http://api.typepad.com/assets/307.json',
+            'content-type': 'application/json',
+        }), '{"objectType": "Post", "title": "Hi"}'))
+        mock.ReplayAll()
+
+        queue = PostQueue(self.path)
+        queue.retry_delay = 0
+        queue.poll_interval = 0
+        post_id = queue.post(self.group(), typepad.Post(title='Hi'), key='item-1')
+        # Queueing the same key again does nothing.
+        self.assertEquals(queue.post(self.group(), typepad.Post(title='Hi'), key='item-1'), post_id)
+        self.assertEquals(queue.counts(), {'pending': 1})
+
+        queue.drain()
+
+        mock.VerifyAll()
+
+        entry = queue.entry(post_id)
+        self.assertEquals(entry.state, 'done')
+        self.assertEquals(entry.attempts, 2)
+        self.assertEquals(entry.location, 'http://api.typepad.com/assets/307.json')
+        self.assertEquals(queue.counts(), {'done': 1})
+
+    def test_refused(self):
+        http = typepad.TypePadClient()
+        typepad.client = http
+
+        mock = mox.Mox()
+        mock.StubOutWithMock(http, 'request')
+        http.request(uri='http://api.typepad.com/groups/7/post-assets.json', method='POST',
+            headers=mox.IgnoreArg(), body=mox.IgnoreArg()).AndReturn((httplib2.Response({'status': 403}), ''))
+        mock.ReplayAll()
+
+        queue = PostQueue(self.path)
+        post_id = queue.post(self.group(), typepad.Comment(content='hi'))
+        queue.drain()
+
+        mock.VerifyAll()
+
+        entry = queue.entry(post_id)
+        self.assertEquals(entry.state, 'failed')
+        self.assertEquals(entry.attempts, 1)
+        self.assert_(entry.error)
+
+    def test_timeout_not_retried(self):
+        http = typepad.TypePadClient()
+        typepad.client = http
+
+        mock = mox.Mox()
+        mock.StubOutWithMock(http, 'request')
+        # The request may have been sent before it timed out, so it's only
+        # made once.
+        http.request(uri='http://api.typepad.com/groups/7/post-assets.json', method='POST',
+            headers=mox.IgnoreArg(), body=mox.IgnoreArg()).AndRaise(socket.timeout('timed out'))
+        mock.ReplayAll()
+
+        queue = PostQueue(self.path)
+        queue.retry_delay = 0
+        post_id = queue.post(self.group(), typepad.Post(title='Hi'))
+        queue.drain()
+
+        mock.VerifyAll()
+
+        entry = queue.entry(post_id)
+        self.assertEquals(entry.state, 'unknown')
+        self.assertEquals(entry.attempts, 1)
+        self.assertEquals(entry.error, 'timed out')
+
+    def test_failed_setup(self):
+        queue = PostQueue(self.path)
+        def setup():
+            raise ValueError('no client')
+        # The real error is raised, not one from closing the database.
+        self.assertRaises(ValueError, queue._work, setup, True)
+
+    def test_lazy_import(self):
+        queue = PostQueue(self.path)
+        post_id = queue.post(self.group(), typepad.Post(title='Hi'))
+
+        # Drain the queue in a new process, where the API classes aren't
+        # imported yet.
+        returncode, out, err = utils.run_python("""if True:
+            import sys
+            import httplib2
+            import typepad
+            from typepad.postqueue import PostQueue
+
+            class Client(typepad.TypePadClient):
+                def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+                    return httplib2.Response({
+                        'status': 201,
+                        'location': 'http://api.typepad.com/assets/307.json',
+                        'content-type': 'application/json',
+                    }), '{"objectType": "Post", "title": "Hi"}'
+            typepad.client = Client()
+
+            queue = PostQueue(%r)
+            print 'typepad.api' in sys.modules
+            queue.drain()
+            entry = queue.entry(%d)
+            print entry.state, entry.error""" % (self.path, post_id))
+        self.assertEquals(returncode, 0, err)
+        self.assertEquals(out.split(), ['False', 'done', 'None'])
+
+    def test_interrupted(self):
+        queue = PostQueue(self.path)
+        post_id = queue.post(self.group(), typepad.Post(title='Hi'))
+        queue._claim()
+        self.assertEquals(queue.entry(post_id).state, 'sending')
+
+        # Reopening the queue leaves the post alone, as another queue may be
+        # sending it.
+        queue = PostQueue(self.path)
+        self.assertEquals(queue.entry(post_id).state, 'sending')
+
+        # Recovering can't know if the post was sent.
+        queue.recover()
+        self.assertEquals(queue.entry(post_id).state, 'unknown')
+        queue.retry_unknown()
+        self.assertEquals(queue.entry(post_id).state, 'pending')
+
+
+if __name__ == '__main__':
+    unittest.main()
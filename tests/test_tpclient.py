@@ -28,12 +28,17 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 
+import errno
+import httplib
+import socket
+from StringIO import StringIO
 import unittest
 from urlparse import urlsplit
 
 from oauth.oauth import OAuthConsumer, OAuthToken
 
 import typepad.tpclient
+from typepad.tpobject import BrowserUploadEndpoint
 
 
 class TestTypePadClient(unittest.TestCase):
@@ -111,3 +116,64 @@ class TestTypePadClient(unittest.TestCase):
 
         c.clear_credentials()
         self.assertScheme(c.endpoint, 'http')
+
+    def test_clone(self):
+        c = typepad.tpclient.TypePadClient()
+        c.endpoint = 'http://api.typepad.com'
+        c.cookies['session'] = 'abc'
+        c.consumer = OAuthConsumer('x', 'y')
+        c.token = OAuthToken('z', 'q')
+
+        d = c.clone()
+        self.assert_(d is not c)
+        self.assertEquals(d.endpoint, c.endpoint)
+        self.assertScheme(d.endpoint, 'https')
+        self.assertEquals(d.cookies, {'session': 'abc'})
+        self.assert_(d.consumer is c.consumer)
+        self.assert_(d.token is c.token)
+        self.assertEquals(len(d.credentials.credentials), 1)
+        self.assertEquals(len(d.authorizations), len(c.authorizations))
+
+        # The clone's settings are its own.
+        d.cookies['other'] = 'def'
+        d.clear_credentials()
+        self.assertEquals(c.cookies, {'session': 'abc'})
+        self.assertEquals(len(c.credentials.credentials), 1)
+        self.assertScheme(c.endpoint, 'https')
+
+    def test_retry_rewinds_body(self):
+        sent = list()
+
+        class FakeSocket(object):
+            def makefile(self, *args, **kwargs):
+                return StringIO('HTTP/1.1 204 No Content\r\nContent-Length: 0\r\n\r\n')
+
+        class FlakyConnection(object):
+            def __init__(self, host, **kwargs):
+                self.sock = FakeSocket()
+            def set_debuglevel(self, level):
+                pass
+            def connect(self):
+                pass
+            def close(self):
+                pass
+            def request(self, method, url, body, headers):
+                if not sent:
+                    # Fail partway through sending the body.
+                    sent.append(body.read(5))
+                    raise socket.error(errno.ENETUNREACH, 'Network is unreachable')
+                sent.append(''.join(iter(lambda: body.read(5), '')))
+            def getresponse(self):
+                response = httplib.HTTPResponse(self.sock)
+                response.begin()
+                return response
+
+        body = BrowserUploadEndpoint.StreamingBody(['0123456789', StringIO('abcdef')])
+        c = typepad.tpclient.TypePadClient()
+        response, content = c.request('http://api.example.com/upload', method='POST',
+            body=body, headers={'content-length': str(len(body))},
+            connection_type=FlakyConnection)
+
+        self.assertEquals(response.status, 204)
+        # The retry sent the whole body, not just what was left of it.
+        self.assertEquals(sent, ['01234', '0123456789abcdef'])
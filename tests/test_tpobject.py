@@ -27,7 +27,12 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+from __future__ import with_statement
+
 import cgi
+from datetime import datetime
+import errno
+import gzip
 try:
     from email.feedparser import FeedParser
     from email.header import Header
@@ -36,16 +41,21 @@ except ImportError:
     from email.Header import Header
 import logging
 import os
+import pickle
 import random
 import re
+import shutil
+import socket
 from StringIO import StringIO
 import sys
+import tempfile
 import traceback
 import unittest
 from urlparse import urlparse
 
 import httplib2
 import mox
+import nose
 from oauth.oauth import OAuthConsumer, OAuthToken
 import simplejson as json
 
@@ -71,6 +81,26 @@ class TestObjects(unittest.TestCase):
         self.assert_(x is y, "two ListOf's the same thing are not only "
                              "equivalent but the same instance")
 
+    def test_class_for_data(self):
+        self.assert_(typepad.Asset.class_for_data({'objectType': 'Post'}) is typepad.Post)
+        self.assert_(typepad.Asset.class_for_data({'objectType': 'Blargh'}) is typepad.Asset)
+        self.assert_(typepad.Asset.class_for_data(None) is typepad.Asset)
+
+        post = typepad.Asset.from_dict({'objectType': 'Post', 'title': 'Hi'})
+        self.assert_(type(post) is typepad.Post)
+        self.assertEquals(post.title, 'Hi')
+
+        class Thingy(typepad.TypePadObject):
+            _class_object_type = 'Thingy'
+        self.assert_(typepad.TypePadObject.class_for_data({'objectType': 'Thingy'}) is Thingy)
+
+        # Redeclaring a class of the same name replaces it, as with
+        # find_by_name().
+        class Thingy(Thingy):
+            pass
+        self.assert_(typepad.TypePadObject.class_for_data({'objectType': 'Thingy'}) is Thingy)
+        self.assert_(type(typepad.TypePadObject.from_dict({'objectType': 'Thingy'})) is Thingy)
+
     def test_videolink_by_width(self):
         v = typepad.VideoLink(embed_code="\n<object width=\"500\" height=\"395\">\n    <param name=\"movie\" value=\"http://www.youtube.com/v/deadbeef\" />\n    <param name=\"quality\" value=\"high\" />\n    <param name=\"wmode\" value=\"transparent\" />\n    <param name=\"allowscriptaccess\" value=\"never\" />\n    <param name=\"allowFullScreen\" value=\"true\" />\n    <embed type=\"application/x-shockwave-flash\"\n        width=\"500\" height=\"395\"\n        src=\"http://www.youtube.com/v/deadbeef\"\n        quality=\"high\" wmode=\"transparent\" allowscriptaccess=\"never\" allowfullscreen=\"true\"\n    />\n</object>\n")
         sv = v.by_width(400)
@@ -79,6 +109,43 @@ class TestObjects(unittest.TestCase):
         self.assert_(re.search('\swidth="400"', sv.embed_code))
         self.assert_(re.search('\sheight="316"', sv.embed_code))
 
+    def test_videolink_sizes(self):
+        videos = [
+            typepad.VideoLink(embed_code='<object width="500" height="395"><embed width="500" height="395"/></object>'),
+            typepad.VideoLink(embed_code='<iframe height="360" data-width="2" width="640"></iframe>'),
+        ]
+        self.assertEquals(typepad.VideoLink.sizes(videos, 400), [
+            ('<object width="400" height="316"><embed width="400" height="316"/></object>', 400, 316),
+            ('<iframe height="225" data-width="2" width="400"></iframe>', 400, 225),
+        ])
+        for video, (embed_code, width, height) in zip(videos, typepad.VideoLink.sizes(videos, 320)):
+            sv = video.by_width(320)
+            self.assertEquals((sv.embed_code, sv.width, sv.height), (embed_code, width, height))
+
+        # The originals are unchanged.
+        self.assertEquals(videos[1].embed_code, '<iframe height="360" data-width="2" width="640"></iframe>')
+        self.assertEquals((videos[1].width, videos[1].height), (640, 360))
+
+        # Setting the dimensions updates the embed code, as does setting a
+        # new embed code.
+        video = videos[1]
+        video.height = 100
+        self.assertEquals(video.embed_code, '<iframe height="100" data-width="2" width="640"></iframe>')
+        video = typepad.VideoLink(embed_code='<iframe width="10" height="20"></iframe>')
+        self.assertEquals(video.width, 10)
+        video.embed_code = '<iframe width="10" height="20" frameborder="0"></iframe>'
+        video.height = 40
+        self.assertEquals(video.embed_code, '<iframe width="10" height="40" frameborder="0"></iframe>')
+
+        # As before, resizing needs both dimensions, even if the embed code
+        # doesn't have them.
+        def set_width(video, width):
+            video.width = width
+        for embed_code in ('<iframe width="10"></iframe>', '<iframe></iframe>'):
+            video = typepad.VideoLink(embed_code=embed_code)
+            self.assertRaises(TypeError, set_width, video, 20)
+            self.assertRaises(TypeError, video.by_width, 20)
+
 
 class TestImageLink(unittest.TestCase):
 
@@ -180,30 +247,419 @@ class TestImageLink(unittest.TestCase):
 
         self.assertEquals(l.by_width(None).url, 'http://example.com/blah-1024wi')
 
-
-class ClientTestCase(unittest.TestCase):
+    def test_sizes(self):
+        images = [
+            typepad.ImageLink(url_template='http://example.com/big-{spec}', height=5000, width=5000),
+            typepad.ImageLink(url_template='http://example.com/wide-{spec}', height=100, width=200),
+            typepad.ImageLink(url='http://example.com/elsewhere', height=300, width=400),
+        ]
+        for mode in ('inscribe', 'by_width', 'by_height', 'square'):
+            for size in (None, 1, 76, 100, 250, 4999):
+                expected = []
+                for image in images:
+                    link = getattr(image, mode)(size)
+                    expected.append((link.url, link.width, link.height))
+                self.assertEquals(typepad.ImageLink.sizes(images, mode, size), expected,
+                    'testing sizes(%r, %r)' % (mode, size))
+
+        self.assertRaises(ValueError, lambda: typepad.ImageLink.sizes(images, 'stretch', 75))
+
+        # Resizing doesn't change the original link.
+        l = images[1]
+        self.assertEquals(l.square(75).url, 'http://example.com/wide-75si')
+        self.assertEquals((l.url, l.width, l.height), (None, 200, 100))
+        l.url_template = 'http://example.com/other-{spec}'
+        self.assertEquals(l.square(75).url, 'http://example.com/other-75si')
+
+    def test_size_arrays(self):
+        random.seed(47)
+        dims = [(w, h) for w in (1, 49, 50, 75, 251, 640, 1024, 1025, 5000)
+            for h in (1, 76, 250, 480, 3001)]
+        dims += [(random.randint(1, 6000), random.randint(1, 6000)) for i in range(200)]
+        widths = [w for w, h in dims]
+        heights = [h for w, h in dims]
+
+        def prove():
+            for mode in ('inscribe', 'by_width', 'by_height', 'square'):
+                suffix = typepad.ImageLink._sizers[mode][1]
+                for size in (None, 1, 50, 76, 100, 249, 250, 1024, 4999):
+                    expected = []
+                    for w, h in dims:
+                        link = typepad.ImageLink(url_template='{spec}', width=w, height=h)
+                        link = getattr(link, mode)(size)
+                        expected.append((int(link.url[:-2]), link.width, link.height))
+                    specs, new_widths, new_heights = typepad.ImageLink.size_arrays(
+                        widths, heights, mode, size)
+                    self.assertEquals(zip(list(specs), list(new_widths), list(new_heights)),
+                        expected, 'testing size_arrays(%r, %r)' % (mode, size))
+                    self.assertEquals(link.url[-2:], suffix)
+
+            self.assertRaises(ValueError, lambda: typepad.ImageLink.size_arrays(
+                widths, heights, 'stretch', 75))
+
+        # Without NumPy, the sizes are computed one by one.
+        import_numpy = typepad.tpobject._import_numpy
+        typepad.tpobject._import_numpy = lambda: None
+        try:
+            prove()
+        finally:
+            typepad.tpobject._import_numpy = import_numpy
+
+        if import_numpy() is None:
+            raise nose.SkipTest('no vectorized image sizing tests without numpy')
+        prove()
+        self.assertRaises(ZeroDivisionError, lambda: typepad.ImageLink.size_arrays(
+            [0, 10], [0, 10], 'inscribe', 75))
+
+
+class CompactThing(typepad.CompactTypePadObject):
+
+    _class_object_type = 'CompactThing'
+
+    title = typepad.fields.Field()
+    url_id = typepad.fields.Field(api_name='urlId')
+    published = typepad.fields.Datetime()
+    author = typepad.fields.Object('User')
+
+
+class CompactSubthing(CompactThing):
+
+    _class_object_type = 'CompactSubthing'
+
+    content = typepad.fields.Field()
+
+
+class OtherCompactThing(typepad.CompactTypePadObject):
+
+    _class_object_type = 'OtherCompactThing'
+
+    content = typepad.fields.Field()
+    title = typepad.fields.Field()
+
+
+class TestCompactTypePadObject(unittest.TestCase):
+
+    def test_fields(self):
+        data = {
+            'objectType': 'CompactThing',
+            'title': 'Hi',
+            'urlId': '6a1234',
+            'published': '2010-07-01T12:00:00Z',
+            'author': {'objectType': 'User', 'displayName': 'Mike'},
+        }
+        thing = CompactThing.from_dict(data)
+        self.assertEquals(thing.title, 'Hi')
+        self.assertEquals(thing.published, datetime(2010, 7, 1, 12, 0, 0))
+        self.assert_(isinstance(thing.author, typepad.User))
+        self.assertEquals(thing.author.display_name, 'Mike')
+
+        # Decoded values aren't kept in the instance's __dict__.
+        self.assert_('title' not in thing.__dict__)
+        self.assert_('published' not in thing.__dict__)
+
+        thing.title = 'Hello'
+        self.assertEquals(thing.title, 'Hello')
+        self.assertEquals(thing.to_dict()['title'], 'Hello')
+        del thing.title
+        self.assert_(thing.title is None)
+        self.assert_('title' not in thing.to_dict())
+
+        # Values can be given by keyword too.
+        thing = CompactThing(title='Hi', url_id='6a1234')
+        self.assertEquals(thing.title, 'Hi')
+        self.assertEquals(thing.url_id, '6a1234')
+        self.assert_(thing.published is None)
+
+        # Fields are still available through the class.
+        self.assert_(isinstance(CompactThing.title, typepad.fields.Field))
+
+    def test_reclass(self):
+        thing = CompactThing.from_dict({
+            'objectType': 'CompactSubthing',
+            'title': 'Hi',
+            'content': 'Hello',
+        })
+        self.assert_(isinstance(thing, CompactSubthing))
+        self.assertEquals(thing.title, 'Hi')
+        self.assertEquals(thing.content, 'Hello')
+
+        # Values stay with their fields when reclassed into a class with
+        # different field positions.
+        thing = CompactThing(title='Hi')
+        thing.url_id = '6a1234'
+        self.assert_(thing.reclass_for_data({'objectType': 'OtherCompactThing'}))
+        self.assert_(isinstance(thing, OtherCompactThing))
+        self.assertEquals(thing.title, 'Hi')
+        self.assert_(thing.content is None)
+
+        # The values move into the new class's positions, not the __dict__.
+        self.assert_('title' not in thing.__dict__)
+        self.assert_('url_id' not in thing.__dict__)
+        self.assertEquals(thing.__dict__['_values'][OtherCompactThing._field_indexes['title']], 'Hi')
+        self.assertEquals(len(thing.__dict__['_values']), len(OtherCompactThing._field_indexes))
+
+    def test_pickle(self):
+        thing = CompactThing.from_dict({'title': 'Hi', 'urlId': '6a1234'})
+        thing.title = 'Hello'
+
+        thing = pickle.loads(pickle.dumps(thing))
+        self.assertEquals(thing.title, 'Hello')
+        self.assertEquals(thing.url_id, '6a1234')
+
+
+class TestInterner(unittest.TestCase):
+
+    def events(self, display_name='Mike'):
+        author = {'objectType': 'User', 'id': 'tag:api.typepad.com,2009:6p1234', 'displayName': display_name}
+        return {'entries': [
+            {'objectType': 'Event', 'id': 'tag:api.typepad.com,2009:6e1',
+             'actor': dict(author),
+             'object': {'objectType': 'Post', 'title': 'Hi', 'author': dict(author)}},
+            {'objectType': 'Event', 'id': 'tag:api.typepad.com,2009:6e2',
+             'actor': dict(author, displayName='Someone else')},
+        ]}
+
+    def test_response(self):
+        events = typepad.ListOf('Event').from_dict(self.events())
+        self.assert_(events.entries[0].actor is not events.entries[0].object.author)
+
+        typepad.TypePadObject.intern_embedded = True
+        try:
+            events = typepad.ListOf('Event').from_dict(self.events())
+            others = typepad.ListOf('Event').from_dict(self.events())
+        finally:
+            typepad.TypePadObject.intern_embedded = False
+        first, second = events.entries
+        self.assert_(isinstance(first.object, typepad.Post))
+        self.assert_(first.actor is first.object.author)
+        self.assertEquals(first.actor.display_name, 'Mike')
+        # Objects with different data aren't shared.
+        self.assertEquals(second.actor.display_name, 'Someone else')
+        # Objects are shared only within each response.
+        self.assert_(others.entries[0].actor is not first.actor)
+
+        self.assertEquals(events.to_dict(), self.events())
+
+    def test_scope(self):
+        with typepad.Interner() as interner:
+            self.assert_(typepad.Interner.current() is interner)
+            events = typepad.ListOf('Event').from_dict(self.events())
+            others = typepad.ListOf('Event').from_dict(self.events())
+        self.assert_(typepad.Interner.current() is None)
+
+        self.assert_(others.entries[0].actor is events.entries[0].actor)
+        self.assert_(others.entries[0].object.author is events.entries[0].actor)
+
+    def test_compact(self):
+        with typepad.Interner():
+            first = CompactThing.from_dict({'author': {'objectType': 'User', 'urlId': '6p1234'}})
+            second = CompactThing.from_dict({'author': {'objectType': 'User', 'urlId': '6p1234'}})
+        self.assert_(first.author is second.author)
+        self.assert_('author' not in first.__dict__)
+
+
+class TestEagerDecoding(unittest.TestCase):
 
     def setUp(self):
-        self.typepad_client = typepad.client
+        typepad.TypePadObject.eager_decoding = True
 
     def tearDown(self):
-        typepad.client = self.typepad_client
-        del self.typepad_client
-
-        for x in ('headers', 'body'):
-            try:
-                delattr(self, x)
-            except AttributeError:
-                pass
-
-    def saver(self, fld):
-        def save_data(data):
-            setattr(self, fld, data)
-            return True
-        return save_data
-
-
-class TestActionEndpoint(ClientTestCase):
+        typepad.TypePadObject.eager_decoding = False
+
+    def test_decode(self):
+        data = {
+            'objectType': 'Event',
+            'verbs': ['tag:api.typepad.com,2009:NewAsset'],
+            'published': '2010-07-01T12:00:00Z',
+            'actor': {'objectType': 'User', 'displayName': 'Mike'},
+            'object': {'objectType': 'Post', 'title': 'Hi',
+                'embeddedImageLinks': [{'url': 'http://example.com/a.jpg'}]},
+        }
+        event = typepad.Event.from_dict(data)
+        for attrname in ('verbs', 'published', 'actor', 'object'):
+            self.assert_(attrname in event.__dict__, '%s was not decoded' % attrname)
+        self.assert_(isinstance(event.actor, typepad.User))
+        self.assert_(isinstance(event.object, typepad.Post))
+        self.assert_('title' in event.object.__dict__)
+        self.assert_(isinstance(event.object.embedded_image_links[0], typepad.ImageLink))
+        self.assertEquals(event.published, datetime(2010, 7, 1, 12, 0, 0))
+        self.assertEquals(event.verbs, ['tag:api.typepad.com,2009:NewAsset'])
+        self.assert_(event.verbs is not data['verbs'])
+        # Fields without data still have their defaults.
+        self.assert_(event.id is None)
+
+        typepad.TypePadObject.eager_decoding = False
+        self.assertEquals(typepad.Event.from_dict(data), event)
+
+    def test_bad_data(self):
+        # Data that can't be decoded fails when it's decoded.
+        self.assertRaises(TypeError, typepad.Event.from_dict, {'published': 'garbage'})
+        self.assertRaises(TypeError, typepad.Event.from_dict,
+            {'object': {'objectType': 'Post', 'published': 'garbage'}})
+
+    def test_field_without_descriptor(self):
+        # A field no class attribute stores is left for the field itself.
+        class Odd(CompactThing):
+            pass
+        Odd.fields = dict(Odd.fields, zzz=typepad.fields.Field(api_name='zzz'))
+        Odd.fields['zzz'].attrname = 'zzz'
+
+        odd = Odd.from_dict({'title': 'Hi', 'zzz': 'Z'})
+        self.assertEquals(odd.title, 'Hi')
+        self.assert_(odd.url_id is None)
+        self.assert_('zzz' not in odd.__dict__)
+        self.assertEquals(odd.to_dict()['zzz'], 'Z')
+
+    def test_compact(self):
+        thing = CompactThing.from_dict({
+            'title': 'Hi',
+            'author': {'objectType': 'User', 'displayName': 'Mike'},
+        })
+        self.assertEquals(thing.__dict__['_values'][CompactThing._field_indexes['title']], 'Hi')
+        self.assertEquals(thing.author.display_name, 'Mike')
+        self.assert_(thing.published is None)
+
+    def test_interned(self):
+        author = {'objectType': 'User', 'urlId': '6p1234'}
+        with typepad.Interner():
+            event = typepad.Event.from_dict({'actor': author,
+                'object': {'objectType': 'Post', 'author': dict(author)}})
+        self.assert_(event.actor is event.object.author)
+
+
+class TestEncoding(unittest.TestCase):
+
+    def generic_to_dict(self, obj):
+        ret = remoteobjects.RemoteObject.to_dict(obj)
+        if 'objectType' not in ret and hasattr(obj, 'object_type'):
+            ret['objectType'] = obj._class_object_type
+        return ret
+
+    def test_to_dict(self):
+        data = {
+            'objectType': 'Post',
+            'title': 'Hi',
+            'published': '2010-07-01T12:00:00Z',
+            'author': {'objectType': 'User', 'displayName': 'Mike'},
+            'categories': ['news'],
+            'somethingNew': {'a': [1, 2]},
+            'content': None,
+        }
+        post = typepad.Asset.from_dict(data)
+        self.assertEquals(post.to_dict(), self.generic_to_dict(post))
+
+        post.title = 'Hello'
+        post.author.display_name = 'Someone'
+        post.published = datetime(2010, 7, 2, 12, 0, 0)
+        post.text_format = 'html'
+        encoded = post.to_dict()
+        self.assertEquals(encoded, self.generic_to_dict(post))
+        self.assertEquals(encoded['title'], 'Hello')
+        self.assertEquals(encoded['author']['displayName'], 'Someone')
+        self.assertEquals(encoded['published'], '2010-07-02T12:00:00Z')
+
+        # The data is a copy.
+        encoded['somethingNew']['a'].append(3)
+        self.assertEquals(post.api_data['somethingNew'], {'a': [1, 2]})
+
+        events = typepad.ListOf('Event').from_dict({'entries': [{'objectType': 'Event'}]})
+        self.assertEquals(events.to_dict(), {'entries': [{'objectType': 'Event'}]})
+
+    def test_compact(self):
+        thing = CompactThing.from_dict({'title': 'Hi', 'author': {'displayName': 'Mike'}})
+        thing.url_id = '6a1234'
+        self.assertEquals(thing.to_dict(), self.generic_to_dict(thing))
+        self.assertEquals(thing.to_dict()['urlId'], '6a1234')
+
+    def test_to_json(self):
+        post = typepad.Post(title='Hi', content=None)
+        self.assertEquals(json.loads(post.to_json()), {'objectType': 'Post', 'title': 'Hi'})
+
+        action = typepad.Group._AddMemberPost(user_id='6p1234')
+        self.assertEquals(json.loads(action.to_json()), {'userId': '6p1234'})
+
+    def test_post_put(self):
+        real_typepad_client = typepad.client
+        http = typepad.TypePadClient()
+        typepad.client = http
+        try:
+            post = typepad.Post(title='Hi', categories=['news'])
+            posted = post.to_json()
+            group = typepad.Group()
+            group._location = 'http://api.typepad.com/groups/7.json'
+
+            mock = mox.Mox()
+            mock.StubOutWithMock(http, 'request')
+            # Asset bodies are encoded with to_json(), not remoteobjects'
+            # generic encoding.
+            http.request(uri='http://api.typepad.com/groups/7/post-assets.json', method='POST',
+                headers=mox.IgnoreArg(), body=posted).AndReturn((httplib2.Response({
+                    'status': 201,
+                    'location': 'http://api.typepad.com/assets/307.json',
+                    'content-type': 'application/json',
+                    'etag': '"7"',
+                }), '{"objectType": "Post", "title": "Hi", "categories": ["news"]}'))
+            http.request(uri='http://api.typepad.com/assets/307.json', method='PUT',
+                headers=mox.Func(lambda headers: headers['if-match'] == '"7"'),
+                body=mox.Func(lambda body: body == post.to_json())).AndReturn((httplib2.Response({
+                    'status': 200,
+                    'content-type': 'application/json',
+                }), '{"objectType": "Post", "title": "Hello"}'))
+            mock.ReplayAll()
+
+            group.post_assets.post(post)
+            self.assertEquals(post._location, 'http://api.typepad.com/assets/307.json')
+            post.title = 'Hello'
+            post.put()
+
+            mock.VerifyAll()
+            self.assertEquals(post.title, 'Hello')
+        finally:
+            typepad.client = real_typepad_client
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def run_python(self, code):
+        # The API classes are imported already in this process, so try the
+        # import in a new one.
+        returncode, out, err = utils.run_python(code)
+        self.assertEquals(returncode, 0, err)
+        return out.split()
+
+    def test_lazy(self):
+        out = self.run_python("""if True:
+            import sys
+            import typepad
+            print 'typepad.api' in sys.modules
+            print typepad.User.__module__, 'typepad.api' in sys.modules
+            print typepad.api.User is typepad.User""")
+        self.assertEquals(out, ['False', 'typepad.api', 'True', 'True'])
+
+    def test_reclass(self):
+        out = self.run_python("""if True:
+            import sys
+            import typepad
+            print typepad.TypePadObject.from_dict({'objectType': 'Post'}).__class__.__name__
+            print 'typepad.api' in sys.modules
+            print len([name for name, value in typepad.api.__dict__.items()
+                if not name.startswith('_') and getattr(typepad, name, None) is not value])""")
+        self.assertEquals(out, ['Post', 'True', '0'])
+
+    def test_find_class(self):
+        out = self.run_python("""if True:
+            from typepad.cache import find_class
+            print find_class('ListOfAsset').__name__""")
+        self.assertEquals(out, ['ListOfAsset'])
+
+    def test_import_all(self):
+        out = self.run_python("""if True:
+            from typepad import *
+            print Asset.__name__, TypePadObject.__name__""")
+        self.assertEquals(out, ['Asset', 'TypePadObject'])
+
+
+class TestActionEndpoint(utils.ClientTestCase):
 
     def test_responseless(self):
         request = {
@@ -310,8 +766,61 @@ class TestActionEndpoint(ClientTestCase):
             },
         }, self.body))
 
+    def test_post_all(self):
+        http = typepad.TypePadClient()
+        typepad.client = http
+
+        mock = mox.Mox()
+        mock.StubOutWithMock(http, 'request')
+        for volume, response in ((1, {'status': 204}), (2, None), (2, {'status': 204}), (3, {'status': 404})):
+            request = http.request(
+                uri='http://api.typepad.com/meese/%d/snert.json' % volume,
+                method='POST',
+                headers=mox.IgnoreArg(),
+                body=mox.Func(lambda body, volume=volume: utils.json_equals({'volume': volume}, body)),
+            )
+            if response is None:
+                request.AndRaise(socket.error(errno.ECONNREFUSED, 'Connection refused'))
+            else:
+                request.AndReturn((httplib2.Response(response), ''))
+        mock.ReplayAll()
+
+        class Moose(typepad.TypePadObject):
+
+            class Snert(typepad.TypePadObject):
+                volume = typepad.fields.Field()
+            snert = typepad.fields.ActionEndpoint(api_name='snert', post_type=Snert)
+
+        meese = list()
+        for i in range(1, 4):
+            moose = Moose()
+            moose._location = 'http://api.typepad.com/meese/%d.json' % i
+            meese.append(moose)
+
+        self.assert_(isinstance(Moose.snert, typepad.fields.ActionEndpoint))
+        results = Moose.snert.post_all([(moose, {'volume': i + 1}) for i, moose in enumerate(meese)],
+            retries=1)
+
+        mock.VerifyAll()
+
+        self.assertEquals([result.item[0] for result in results], meese)
+        self.assert_(results[0].ok)
+        self.assert_(results[1].ok)
+        self.assert_(not results[2].ok)
+        self.assert_(isinstance(results[2].error, Moose.NotFound))
+
 
-class TestBrowserUpload(ClientTestCase):
+class TestBrowserUpload(utils.ClientTestCase):
+
+    def saver(self, fld):
+        if fld != 'body':
+            return super(TestBrowserUpload, self).saver(fld)
+        def save_body(body):
+            # Upload bodies are streamed, so read it as it would be sent.
+            self.body = body.read()
+            self.assertEquals(len(self.body), len(body))
+            return True
+        return save_body
 
     def message_from_response(self, headers, body):
         fp = FeedParser()
@@ -402,6 +911,8 @@ class TestBrowserUpload(ClientTestCase):
             'objectType': 'Photo',
         }, asset_json))
 
+        self.assertEquals(int(self.headers['Content-Length']), len(self.body))
+
         filepart = bodyparts['file']
         self.assertEquals(filepart.get_payload(decode=False), 'hi hello pretend file')
         filelength = filepart.get('content-length')
@@ -516,6 +1027,153 @@ class TestBrowserUpload(ClientTestCase):
         filelength = filepart.get('content-length')
         self.assertEquals(int(filelength), len(filecontent))
 
+    def test_upload_all(self):
+        class BatchClient(typepad.TypePadClient):
+            subrequest_limit = 2
+            def batch_request(self):
+                self.batches.append([])
+            def batch(self, request, callback):
+                self.batches[-1].append((request['uri'], callback))
+            def complete_batch(self):
+                for url, callback in self.batches[-1]:
+                    url_id = url.rsplit('/', 1)[-1][:-len('.json')]
+                    if url_id == 'missing':
+                        callback(url, httplib2.Response({'status': 404}), '{}')
+                        continue
+                    content = json.dumps({'objectType': 'Photo', 'urlId': url_id, 'title': 'Photo %s' % url_id})
+                    callback(url, httplib2.Response({'status': 200, 'content-type': 'application/json'}), content)
+
+        http = BatchClient()
+        http.batches = []
+        typepad.client = http
+
+        posted = []
+        def post(obj, fileobj, content_type='application/octet-stream', **kwargs):
+            progress = kwargs.pop('progress')
+            content = fileobj.read()
+            progress(len(content), len(content), 0.1)
+            posted.append((obj.title, content, content_type, kwargs))
+            if obj.title == 'bad':
+                location = 'http://www.typepad.com/?status=403&error=Nope'
+            else:
+                location = 'http://www.typepad.com/?status=201&asset_url=/assets/%s.json' % obj.title
+            return httplib2.Response({'status': 302, 'location': location}), ''
+
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, 'photo.png')
+            open(filename, 'wb').write('png file')
+
+            brupload = typepad.BrowserUploadEndpoint()
+            brupload.post = post
+            uploads = [
+                (typepad.Photo(title='a1'), StringIO('file a1')),
+                (typepad.Photo(title='bad'), StringIO('file bad')),
+                (typepad.Photo(title='a2'), filename),
+                (typepad.Photo(title='missing'), StringIO('file missing'), 'image/gif'),
+            ]
+            reports = []
+            progress = lambda upload, sent, total, elapsed: reports.append((upload[0].title, sent))
+            results = brupload.upload_all(uploads, max_workers=2, progress=progress,
+                post_type='photo')
+        finally:
+            shutil.rmtree(tempdir)
+
+        self.assertEquals(posted, [
+            ('a1', 'file a1', 'application/octet-stream', {'post_type': 'photo'}),
+            ('bad', 'file bad', 'application/octet-stream', {'post_type': 'photo'}),
+            ('a2', 'png file', 'image/png', {'post_type': 'photo'}),
+            ('missing', 'file missing', 'image/gif', {'post_type': 'photo'}),
+        ])
+        self.assertEquals([result.item for result in results], uploads)
+        self.assertEquals(sorted(reports), [('a1', 7), ('a2', 8), ('bad', 8), ('missing', 12)])
+
+        self.assert_(results[0].ok)
+        self.assert_(results[0].value is uploads[0][0])
+        self.assertEquals(results[0].value.title, 'Photo a1')
+        self.assertEquals(results[2].value.title, 'Photo a2')
+
+        self.assert_(isinstance(results[1].error, typepad.Photo.Forbidden))
+        self.assert_(isinstance(results[3].error, typepad.Photo.NotFound))
+        self.assertEquals(results[3].value._location, 'http://api.typepad.com/assets/missing.json')
+
+        # The three uploaded assets were requested in two batches.
+        self.assertEquals([len(batch) for batch in http.batches], [2, 1])
+
+    def test_multipart_form(self):
+        form = typepad.BrowserUploadEndpoint.MultipartForm()
+        self.assertNotEquals(form.boundary, typepad.BrowserUploadEndpoint.MultipartForm().boundary)
+
+        fileobj = StringIO('skipped\r\n--not the boundary\r\nfile content')
+        fileobj.seek(len('skipped'))
+        form.add_field('asset', '{"objectType": "Photo"}')
+        form.add_field('say "hi"', u'\u2603')
+        form.add_file('file', fileobj, 'image/png')
+        # The file is only read when the body is.
+        self.assertEquals(fileobj.tell(), len('skipped'))
+
+        body = form.body()
+        response = self.message_from_response(form.headers(), body.read())
+        self.assert_(response.is_multipart())
+        self.assertEquals(response.get_boundary(), form.boundary)
+
+        asset, greeting, filepart = response.get_payload()
+        self.assertEquals(asset.get_param('name', header='content-disposition'), 'asset')
+        self.assertEquals(asset.get_payload(), '{"objectType": "Photo"}')
+        self.assertEquals(greeting.get_param('name', header='content-disposition'), 'say "hi"')
+        self.assertEquals(greeting.get_payload(), '\xe2\x98\x83')
+        self.assertEquals(filepart.get_content_type(), 'image/png')
+        self.assertEquals(filepart['content-length'], str(len('\r\n--not the boundary\r\nfile content')))
+        self.assertEquals(filepart.get_payload(), '\r\n--not the boundary\r\nfile content')
+
+    def test_streaming_body(self):
+        fileobj = tempfile.TemporaryFile()
+        content = ''.join(chr(i % 256) for i in range(100000))
+        fileobj.write('skipped' + content)
+        fileobj.seek(len('skipped'))
+
+        body = typepad.BrowserUploadEndpoint.StreamingBody(['head', fileobj, 'tail'])
+        self.assertEquals(len(body), len(content) + 8)
+
+        chunks = list(iter(lambda: body.read(8192), ''))
+        self.assertEquals(''.join(chunks), 'head' + content + 'tail')
+        self.assert_(max(len(chunk) for chunk in chunks) <= 8192)
+
+        # Reading again, as when a request is retried, starts over.
+        self.assertEquals(body.read(), 'head' + content + 'tail')
+        self.assertEquals(body.read(), '')
+
+        # Progress is reported after each read, and starts over on a retry.
+        reports = []
+        fileobj.seek(len('skipped'))
+        body = typepad.BrowserUploadEndpoint.StreamingBody(['head', fileobj, 'tail'],
+            progress=lambda sent, total, elapsed: reports.append((sent, total)))
+        while body.read(50000):
+            pass
+        body.read(8)
+        self.assertEquals(reports, [(50000, 100008), (100000, 100008), (100008, 100008), (8, 100008)])
+
+        # Files that can't seek are read up front.
+        class Unseekable(object):
+            def __init__(self, content):
+                self.read = StringIO(content).read
+        body = typepad.BrowserUploadEndpoint.StreamingBody([Unseekable('abc'), 'def'])
+        self.assertEquals(len(body), 6)
+        self.assertEquals(body.read(4), 'abcd')
+        self.assertEquals(body.read(4), 'ef')
+
+        # Files whose descriptors belong to another stream are measured by
+        # what they read.
+        compressed = tempfile.NamedTemporaryFile(suffix='.gz')
+        gzipped = gzip.GzipFile(fileobj=compressed, mode='wb')
+        gzipped.write(content)
+        gzipped.close()
+        compressed.flush()
+        body = typepad.BrowserUploadEndpoint.StreamingBody([gzip.open(compressed.name), 'tail'])
+        self.assertEquals(len(body), len(content) + 4)
+        self.assertEquals(body.read(), content + 'tail')
+        compressed.close()
+
 
 if __name__ == '__main__':
     utils.log()
@@ -0,0 +1,153 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import os
+from StringIO import StringIO
+import unittest
+
+import httplib2
+
+import typepad
+from typepad.uploadsession import UploadSession
+from tests import utils
+
+
+class TestUploadSession(utils.TempdirTestCase):
+
+    def setUp(self):
+        super(TestUploadSession, self).setUp()
+        self.path = os.path.join(self.tempdir, 'uploads.db')
+
+    def test_key(self):
+        session = UploadSession(self.path)
+
+        fileobj = StringIO('skipped file content')
+        fileobj.seek(len('skipped '))
+        key = session.key(fileobj, {'post_type': 'photo'})
+        # The file is left where it was.
+        self.assertEquals(fileobj.tell(), len('skipped '))
+
+        self.assertEquals(session.key(StringIO('file content'), {'post_type': 'photo'}), key)
+        self.assertNotEquals(session.key(StringIO('file content'), {'post_type': 'audio'}), key)
+        self.assertNotEquals(session.key(StringIO('file contents'), {'post_type': 'photo'}), key)
+
+        # Parameters can be unicode.
+        key = session.key(StringIO('file content'), {'title': u'Caf\xe9', u'post_type': u'photo'})
+        self.assertEquals(session.key(StringIO('file content'), {'title': 'Caf\xc3\xa9', 'post_type': 'photo'}), key)
+        self.assertNotEquals(session.key(StringIO('file content'), {'title': u'Cafe', 'post_type': 'photo'}), key)
+
+        class Unseekable(object):
+            def read(self, size=-1):
+                return ''
+        self.assert_(session.key(Unseekable()) is None)
+
+    def test_journal(self):
+        session = UploadSession(self.path)
+        key = session.key(StringIO('file'))
+        self.assert_(session.entry(key) is None)
+
+        session.start(key)
+        session.fail(key, ValueError('no'))
+        session.start(key)
+        self.assert_(session.asset_url(key) is None)
+        self.assertEquals(session.counts(), {'sending': 1})
+
+        # A reopened session still has the interrupted upload.
+        session.close()
+        session = UploadSession(self.path)
+        entry = session.entry(key)
+        self.assertEquals(entry.state, 'sending')
+        self.assertEquals(entry.attempts, 2)
+        self.assert_(entry.error is None)
+
+        session.finish(key, 'http://api.typepad.com/assets/1.json')
+        self.assertEquals(session.asset_url(key), 'http://api.typepad.com/assets/1.json')
+        self.assertEquals(session.counts(), {'done': 1})
+
+    def test_upload_all(self):
+        class BatchClient(typepad.TypePadClient):
+            def batch_request(self):
+                pass
+            def batch(self, request, callback):
+                url = request['uri']
+                url_id = url.rsplit('/', 1)[-1][:-len('.json')]
+                self.fetched.append(url_id)
+                callback(url, httplib2.Response({'status': 200, 'content-type': 'application/json'}),
+                    '{"objectType": "Photo", "title": "Photo %s"}' % url_id)
+            def complete_batch(self):
+                pass
+
+        http = BatchClient()
+        http.fetched = []
+        typepad.client = http
+
+        posted = []
+        refuse = set(['b'])
+        def post(obj, fileobj, content_type='application/octet-stream', **kwargs):
+            content = fileobj.read()
+            posted.append(content)
+            if content in refuse:
+                location = 'http://www.typepad.com/?status=500&error=Oops'
+            else:
+                location = 'http://www.typepad.com/?status=201&asset_url=/assets/%s.json' % content
+            return httplib2.Response({'status': 302, 'location': location}), ''
+
+        brupload = typepad.BrowserUploadEndpoint()
+        brupload.post = post
+
+        def upload():
+            uploads = [(typepad.Photo(), StringIO(content)) for content in ('a', 'b', 'c')]
+            session = UploadSession(self.path)
+            try:
+                return brupload.upload_all(uploads, session=session, post_type='photo')
+            finally:
+                session.close()
+
+        results = upload()
+        self.assertEquals(sorted(posted), ['a', 'b', 'c'])
+        self.assertEquals([result.ok for result in results], [True, False, True])
+
+        # Uploading the same files again only sends the one that failed, but
+        # still updates the objects for the others.
+        del posted[:]
+        del http.fetched[:]
+        refuse.clear()
+        results = upload()
+        self.assertEquals(posted, ['b'])
+        self.assertEquals([result.ok for result in results], [True, True, True])
+        self.assertEquals([result.value.title for result in results],
+            ['Photo a', 'Photo b', 'Photo c'])
+        self.assertEquals(sorted(http.fetched), ['a', 'b', 'c'])
+
+        session = UploadSession(self.path)
+        self.assertEquals(session.counts(), {'done': 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -29,6 +29,11 @@
 
 import logging
 import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
 
 import httplib2
 import mox
@@ -36,6 +41,8 @@ import nose
 import nose.tools
 import simplejson as json
 
+import typepad
+
 
 def todo(fn):
     @nose.tools.make_decorator(fn)
@@ -94,6 +101,54 @@ def mock_http(req, resp_or_content):
     return mock
 
 
+class ClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.typepad_client = typepad.client
+
+    def tearDown(self):
+        typepad.client = self.typepad_client
+        del self.typepad_client
+
+        for x in ('headers', 'body'):
+            try:
+                delattr(self, x)
+            except AttributeError:
+                pass
+
+    def saver(self, fld):
+        def save_data(data):
+            setattr(self, fld, data)
+            return True
+        return save_data
+
+
+class TempdirTestCase(ClientTestCase):
+
+    """A `ClientTestCase` that also makes a temporary directory for each
+    test, as `self.tempdir`."""
+
+    def setUp(self):
+        super(TempdirTestCase, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super(TempdirTestCase, self).tearDown()
+
+
+def run_python(code):
+    """Runs `code` in a new Python process that can import the `typepad`
+    package being tested, returning its exit status, standard output and
+    standard error."""
+    path = os.path.join(os.path.dirname(__file__), '..')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([path] + sys.path))
+    proc = subprocess.Popen([sys.executable, '-c', code], env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    return proc.returncode, out, err
+
+
 def log():
     import sys
     logging.basicConfig(level=logging.DEBUG, stream=sys.stderr, format="%(asctime)s %(levelname)s %(message)s")
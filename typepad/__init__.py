@@ -45,6 +45,79 @@ Leah Culver
 Mark Paschal"""
 
 
+import sys
+import types
+
+
+class _Package(types.ModuleType):
+
+    """The `typepad` package, which imports the API classes in `typepad.api`
+    the first time one of them is used.
+
+    Few programs use more than a handful of the TypePad API classes, so the
+    package doesn't build them all when it's imported. Instead, the first
+    attribute of the package that isn't already set (such as
+    ``typepad.User``) imports `typepad.api`, and from then on the package
+    holds the API classes the same as if they'd been imported with ``from
+    typepad.api import *``.
+
+    """
+
+    def __init__(self, module):
+        types.ModuleType.__init__(self, module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+        # Functions defined in the package module use its namespace, so keep
+        # the original module (and its namespace) alive.
+        self._module = module
+        self._api = None
+        # Don't import the API until the package itself is imported.
+        self._importing = True
+
+    def __getattr__(self, name):
+        if self._importing or (name.startswith('__') and name != '__all__'):
+            raise AttributeError(name)
+        if self._api is None:
+            self._import_api()
+            try:
+                return self.__dict__[name]
+            except KeyError:
+                pass
+        # The API module may make its classes on demand too (see
+        # `typepad.classtable`).
+        value = getattr(self._api, name)
+        if name != '__all__':
+            self.__dict__[name] = value
+        return value
+
+    def finish_import(self, namespace):
+        """Adds the names the package module defined after it was replaced
+        in `sys.modules` to the package."""
+        for name, value in namespace.items():
+            self.__dict__.setdefault(name, value)
+        self._importing = False
+
+    def _import_api(self):
+        """Imports `typepad.api` and adds its public names to the package."""
+        import typepad.api
+        api = sys.modules['typepad.api']
+        names = getattr(api, '__all__', None)
+        if names is None:
+            names = [name for name in api.__dict__ if not name.startswith('_')]
+        for name in names:
+            if name in api.__dict__:
+                self.__dict__[name] = api.__dict__[name]
+            else:
+                # Leave it to the API module to make when it's used.
+                self.__dict__.pop(name, None)
+        self.__dict__['__all__'] = sorted(set(names).union(name
+            for name in self.__dict__ if not name.startswith('_')))
+        self._api = api
+
+
+# Replace the package module before importing any submodules, so they all
+# refer to the lazy package.
+_package = sys.modules[__name__] = _Package(sys.modules[__name__])
+
 from remoteobjects import RemoteObject, ListObject
 
 from typepad.tpclient import TypePadClient, OAuthClient, ThreadAwareTypePadClientProxy
@@ -59,4 +132,6 @@ client = ThreadAwareTypePadClientProxy()
 
 from typepad.tpobject import *
 from typepad import fields
-from typepad.api import *
+
+
+_package.finish_import(globals())
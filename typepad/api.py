@@ -40,7 +40,7 @@ from remoteobjects.dataobject import find_by_name
 
 from typepad.tpobject import *
 from typepad.tpobject import _ImageResizer, _VideoResizer
-from typepad import fields
+from typepad import bulk, fields
 import typepad
 
 
@@ -1482,6 +1482,48 @@ class Relationship(TypePadObject):
     unblock = _rel_type_updater(None)
     leave = _rel_type_updater(None)
 
+    def _rel_type_bulk_updater(uri):
+        def update_all(cls, relationships, max_workers=4):
+            """Updates all the given relationships at once, returning a
+            `typepad.bulk.BulkResult` for each one."""
+            types = [uri] if uri else []
+            return cls._set_all_rel_types(relationships, types, max_workers)
+        return classmethod(update_all)
+
+    @classmethod
+    def _set_all_rel_types(cls, relationships, types, max_workers):
+        """Sets the types of all the given relationships to `types`.
+
+        The relationships' statuses are all fetched through batch requests,
+        then saved on up to `max_workers` threads at once. Returns a
+        `typepad.bulk.BulkResult` for each relationship, in order, whose value
+        is its saved `RelationshipStatus`.
+
+        """
+        relationships = list(relationships)
+        # Get the status links unbatched, so we can batch them ourselves.
+        statuses = [cls.status_obj.__get__(rel, batch=False) for rel in relationships]
+        fetched = bulk.deliver(statuses)
+
+        def save(rel_status):
+            rel_status.types = list(types)
+            rel_status.put()
+            return rel_status
+
+        saved = iter(bulk.run(save, [result.value for result in fetched if result.ok],
+            max_workers=max_workers))
+
+        results = list()
+        for rel, result in zip(relationships, fetched):
+            if result.ok:
+                result = saved.next()
+            results.append(bulk.BulkResult(rel, result.value, result.error))
+        return results
+
+    block_all = _rel_type_bulk_updater("tag:api.typepad.com,2009:Blocked")
+    unblock_all = _rel_type_bulk_updater(None)
+    leave_all = _rel_type_bulk_updater(None)
+
     def _rel_type_checker(uri):
         def has_edge_with_uri(self):
             return uri in self.status.types
@@ -0,0 +1,279 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+The `typepad.bulk` module provides helpers for performing many TypePad API
+requests at once.
+
+Use `deliver()` to fetch many promised `TypePadObject` instances through as
+few batch requests as possible, and `run()` to perform requests that can't be
+batched (such as ``PUT`` and ``POST`` requests) on several threads at once.
+Both return a `BulkResult` for each item, so one failed request doesn't keep
+the rest from being performed.
+
+"""
+
+import errno
+import logging
+from Queue import Queue, Empty
+import socket
+import threading
+import time
+
+from batchhttp.client import BatchError
+import httplib2
+
+import typepad
+from typepad.tpclient import ThreadAwareTypePadClientProxy
+
+
+log = logging.getLogger(__name__)
+
+connection_errors = (socket.error, httplib2.ServerNotFoundError)
+"""The exceptions raised when a request fails at the network level.
+
+Not all of these are safe to retry: a timed out or reset connection may fail
+after the request was sent, so the API may have performed it anyway. Use
+`safe_to_retry()` to tell which failures happened before sending."""
+
+
+def safe_to_retry(exc):
+    """Returns whether the exception `exc` means a request could not be sent
+    to the API at all, and so is safe to retry.
+
+    Only failures to find or connect to the API server count. Other
+    `connection_errors` (such as timeouts and reset connections) can happen
+    after the request was sent, so retrying them could perform the request
+    twice.
+
+    """
+    if isinstance(exc, httplib2.ServerNotFoundError):
+        return True
+    if isinstance(exc, socket.timeout):
+        return False
+    if isinstance(exc, socket.gaierror):
+        return True
+    if isinstance(exc, socket.error):
+        return getattr(exc, 'errno', None) == errno.ECONNREFUSED
+    return False
+
+
+class BulkResult(object):
+
+    """The outcome of one item of a bulk operation.
+
+    A `BulkResult` holds the `item` it was made for, plus either the `value`
+    produced for that item or the `error` raised while trying.
+
+    """
+
+    def __init__(self, item, value=None, error=None):
+        self.item = item
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        """Whether the item was processed without error."""
+        return self.error is None
+
+    def __repr__(self):
+        if self.error is not None:
+            return '<%s %r error=%r>' % (type(self).__name__, self.item, self.error)
+        return '<%s %r value=%r>' % (type(self).__name__, self.item, self.value)
+
+
+def errors(results):
+    """Returns the `BulkResult` instances in `results` that failed."""
+    return [result for result in results if result.error is not None]
+
+
+class _Delivery(object):
+
+    """A batch subrequest callback that records any error delivering its
+    object in a `BulkResult`, instead of aborting the whole batch."""
+
+    def __init__(self, result):
+        self.result = result
+
+    def __call__(self, url, response, content):
+        try:
+            self.result.item.update_from_response(url, response, content)
+        except Exception, exc:
+            self.result.error = exc
+
+
+def deliver(objs, batch_size=None):
+    """Delivers the given undelivered `TypePadObject` instances through batch
+    requests.
+
+    Each batch request contains at most `batch_size` subrequests; by default,
+    the `typepad.client` instance's `subrequest_limit`. No batch request may
+    already be open on `typepad.client`.
+
+    Returns a list of `BulkResult` instances in the same order as `objs`. The
+    `value` of each successful result is its delivered object.
+
+    """
+    if batch_size is None:
+        batch_size = typepad.client.subrequest_limit
+
+    results = [BulkResult(obj) for obj in objs]
+    for start in range(0, len(results), batch_size):
+        chunk = results[start:start + batch_size]
+        # Hold strong references to the callbacks, as the batch request
+        # only keeps weak ones.
+        callbacks = [_Delivery(result) for result in chunk]
+
+        typepad.client.batch_request()
+        try:
+            for callback in callbacks:
+                typepad.client.batch(callback.result.item.get_request(), callback)
+        except:
+            typepad.client.clear_batch()
+            raise
+
+        batch_error = None
+        try:
+            typepad.client.complete_batch()
+        except Exception, exc:
+            log.debug('Batch request for %d objects failed: %s', len(chunk), exc)
+            batch_error = exc
+
+        for result in chunk:
+            if result.error is None and not result.item._delivered:
+                result.error = batch_error or BatchError('No subresponse for %s'
+                    % result.item._location)
+
+    for result in results:
+        if result.error is None:
+            result.value = result.item
+    return results
+
+
+def _retry_test(retry_on):
+    if isinstance(retry_on, (tuple, type)):
+        return lambda exc: isinstance(exc, retry_on)
+    return retry_on
+
+
+def _call(func, result, retries, retry_on, retry_delay):
+    while True:
+        try:
+            result.value = func(result.item)
+        except Exception, exc:
+            if retries <= 0 or not retry_on(exc):
+                log.debug('Bulk operation on %r failed: %s', result.item, exc)
+                result.error = exc
+                return
+            log.debug('Retrying bulk operation on %r after error: %s', result.item, exc)
+            retries -= 1
+            time.sleep(retry_delay)
+            retry_delay *= 2
+        else:
+            return
+
+
+def worker_setup():
+    """Returns a function that prepares a worker thread to make requests on
+    behalf of the calling thread.
+
+    The returned function sets the worker thread's `typepad.client` to a
+    clone of the calling thread's, so the worker is authorized as the caller
+    is. If `typepad.client` is not thread-aware (for instance, if it was
+    replaced with one shared user agent), returns ``None``, as then requests
+    can't safely be made from several threads at once.
+
+    """
+    if not isinstance(typepad.client, ThreadAwareTypePadClientProxy):
+        return
+    parent = typepad.client.client
+
+    def setup():
+        if hasattr(parent, 'clone'):
+            typepad.client.client = parent.clone()
+    return setup
+
+
+def run(func, items, max_workers=4, retries=0, retry_on=safe_to_retry,
+    retry_delay=0.5):
+    """Calls `func` with each of `items`, on up to `max_workers` threads at
+    once.
+
+    Returns a list of `BulkResult` instances in the same order as `items`.
+    An exception raised by `func` for an item is recorded in that item's
+    result, and does not stop the other items from being processed.
+
+    If `func` raises an exception matching `retry_on`, it is called again for
+    that item, up to `retries` more times. `retry_on` may be an exception
+    class or tuple of classes, or a function that returns whether a given
+    exception should be retried. The first retry is made after `retry_delay`
+    seconds, with the delay doubling for each one after that. By default only
+    failures to reach the API are retried (see `safe_to_retry()`), since an
+    operation that failed any other way may have been performed anyway.
+
+    Worker threads make their requests as the calling thread does (see
+    `worker_setup()`). If `typepad.client` is not thread-aware, the items are
+    processed one at a time in the calling thread instead.
+
+    """
+    results = [BulkResult(item) for item in items]
+    retry_on = _retry_test(retry_on)
+
+    setup = worker_setup()
+    if setup is None:
+        max_workers = 1
+    max_workers = min(max_workers, len(results))
+    if max_workers <= 1:
+        for result in results:
+            _call(func, result, retries, retry_on, retry_delay)
+        return results
+
+    queue = Queue()
+    for result in results:
+        queue.put(result)
+
+    def work():
+        setup()
+        while True:
+            try:
+                result = queue.get_nowait()
+            except Empty:
+                return
+            _call(func, result, retries, retry_on, retry_delay)
+
+    threads = [threading.Thread(target=work) for i in range(max_workers)]
+    for thread in threads:
+        thread.setDaemon(True)
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
@@ -0,0 +1,215 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+The `typepad.cache` module provides `SnapshotCache`, a persistent cache of
+`TypePadObject` instances.
+
+Reference data that rarely changes, such as `Application`, `Group` and
+`ObjectType` objects, can be saved in a `SnapshotCache` and loaded from it by
+later processes without asking the TypePad API for them again.
+
+>>> cache = SnapshotCache('/var/cache/myapp/typepad.db')
+>>> group = cache.fetch(typepad.Group, '/groups/6p1234.json', max_age=3600)
+
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from urlparse import urljoin, urlparse, urlunparse
+import zlib
+
+from remoteobjects.dataobject import find_by_name
+
+import typepad
+from typepad import jsonlib
+from typepad.tpobject import ListOf, StreamOf, import_api
+
+
+log = logging.getLogger(__name__)
+
+
+def find_class(name):
+    """Returns the `TypePadObject` class with the given name.
+
+    Unlike `remoteobjects.dataobject.find_by_name()`, this function also
+    finds ``ListOf`` and ``StreamOf`` classes that haven't been made yet in
+    this process. If there is no class by that name, raises `KeyError`.
+
+    """
+    try:
+        return find_by_name(name)
+    except KeyError:
+        if import_api():
+            return find_class(name)
+        for metacls in (ListOf, StreamOf):
+            prefix = metacls.__name__
+            if name.startswith(prefix) and len(name) > len(prefix):
+                find_by_name(name[len(prefix):])  # KeyError
+                return metacls(name[len(prefix):])
+        raise
+
+
+def _cache_key(url):
+    """Returns the key for the object at `url`, which is only its path and
+    query, so the key is the same whether the object was requested over
+    HTTP or HTTPS."""
+    parts = urlparse(url)
+    return urlunparse(('', '', parts[2], parts[3], parts[4], ''))
+
+
+class SnapshotCache(object):
+
+    """A cache of `TypePadObject` instances stored in a SQLite database.
+
+    Objects are stored by their URLs, as the encoded dictionaries of their
+    data (see `TypePadObject.to_dict()`) along with their class names.
+    Objects loaded from the cache are fully delivered and have their
+    original classes, URLs and ETags.
+
+    """
+
+    def __init__(self, path):
+        """Opens the cache stored in the SQLite database at `path`, creating
+        it if necessary."""
+        self.path = path
+        self._local = threading.local()
+        self._db().execute("""CREATE TABLE IF NOT EXISTS objects (
+            key TEXT PRIMARY KEY,
+            class_name TEXT NOT NULL,
+            data BLOB NOT NULL,
+            etag TEXT,
+            saved REAL NOT NULL
+        )""")
+
+    def _db(self):
+        try:
+            return self._local.db
+        except AttributeError:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.db = db
+            return db
+
+    def _encode(self, obj):
+        if obj._location is None:
+            raise ValueError('Cannot cache %r with no URL' % (obj,))
+        data = jsonlib.dumps(obj.to_dict())
+        return (_cache_key(obj._location), type(obj).__name__,
+            sqlite3.Binary(zlib.compress(data)), getattr(obj, '_etag', None),
+            time.time())
+
+    def _decode(self, key, class_name, data, etag):
+        obj = find_class(class_name).from_dict(jsonlib.loads(zlib.decompress(str(data))))
+        obj._location = urljoin(typepad.client.endpoint, key)
+        obj._etag = etag
+        return obj
+
+    def put(self, obj):
+        """Saves `obj` in the cache, replacing any object already cached
+        from the same URL."""
+        self.put_all((obj,))
+
+    def put_all(self, objs):
+        """Saves all the given objects in the cache at once."""
+        rows = [self._encode(obj) for obj in objs]
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("""INSERT OR REPLACE INTO objects (key, class_name, data, etag, saved)
+                VALUES (?, ?, ?, ?, ?)""", rows)
+            db.execute("COMMIT")
+        except:
+            db.execute("ROLLBACK")
+            raise
+
+    def get(self, url, max_age=None):
+        """Returns the cached object from `url`, or ``None`` if there is no
+        such object in the cache.
+
+        If `max_age` is given, objects saved more than `max_age` seconds ago
+        are not returned.
+
+        """
+        query = "SELECT key, class_name, data, etag FROM objects WHERE key = ?"
+        args = [_cache_key(url)]
+        if max_age is not None:
+            query += " AND saved >= ?"
+            args.append(time.time() - max_age)
+        row = self._db().execute(query, args).fetchone()
+        if row is None:
+            return
+        return self._decode(*row)
+
+    def fetch(self, cls, url, max_age=None):
+        """Returns the object from `url` from the cache or, if it's not
+        cached, requests it as an instance of `cls` and caches it.
+
+        The object is requested from the API immediately, without waiting for
+        a batch request.
+
+        """
+        obj = self.get(url, max_age=max_age)
+        if obj is None:
+            obj = cls.get(url, batch=False)
+            obj.deliver()
+            self.put(obj)
+        return obj
+
+    def load_all(self, classes=None, max_age=None):
+        """Returns all the objects in the cache.
+
+        If `classes` is given, only the cached instances of those
+        `TypePadObject` classes (not including their subclasses) are
+        returned. If `max_age` is given, only objects saved in the last
+        `max_age` seconds are returned.
+
+        """
+        query = "SELECT key, class_name, data, etag FROM objects"
+        conditions, args = list(), list()
+        if classes is not None:
+            names = [cls.__name__ for cls in classes]
+            conditions.append("class_name IN (%s)" % ', '.join('?' * len(names)))
+            args.extend(names)
+        if max_age is not None:
+            conditions.append("saved >= ?")
+            args.append(time.time() - max_age)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return [self._decode(*row) for row in self._db().execute(query, args)]
+
+    def delete(self, url):
+        """Removes the object from `url` from the cache, if it's there."""
+        self._db().execute("DELETE FROM objects WHERE key = ?", (_cache_key(url),))
+
+    def clear(self):
+        """Removes all the objects from the cache."""
+        self._db().execute("DELETE FROM objects")
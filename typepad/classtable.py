@@ -0,0 +1,202 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+The `typepad.classtable` module provides `ClassTable`, a table of the source
+of a module's classes that makes each class only when it's first used.
+
+Running ``generate.py --table`` writes the `typepad.api` module as such a
+table instead of a series of ``class`` statements, so a program that uses a
+few API classes doesn't spend its start up making all of them. Classes in a
+table are made when they're:
+
+* read as attributes of their module (such as ``typepad.api.User``),
+* looked up by name with `remoteobjects.dataobject.find_by_name()`, as
+  `Object` and `ListOf` fields do for classes given by name, or
+* named by the ``objectType`` of data being decoded into a `TypePadObject`.
+
+"""
+
+import sys
+import threading
+import types
+
+import remoteobjects.dataobject
+
+from typepad import tpobject
+
+
+tables = []
+"""All the `ClassTable` instances, in the order they were made."""
+
+
+class ClassTable(object):
+
+    """A table of classes to make the first time each is used.
+
+    The table holds the source of each class's ``class`` statement, and the
+    names of the other classes in the table the statement requires (its
+    parent classes and any classes its methods refer to), as generated by
+    ``generate.py --table``. Once the table is installed as its module with
+    `install()`, making one of its classes executes that class's statement
+    in the module's namespace, just as the statement would have been
+    executed in an ordinary module.
+
+    """
+
+    def __init__(self, classes, object_types=None):
+        """Initializes a table of `classes`.
+
+        Parameter `classes` is a dictionary of the source of each class by
+        name, as a ``(requires, source)`` tuple of the names of the other
+        classes in the table the class requires and the class's ``class``
+        statement. Optional parameter `object_types` is a dictionary of the
+        names of the classes for the API object types they implement, by
+        object type.
+
+        """
+        self.classes = classes
+        self.object_types = object_types or {}
+        self.namespace = None
+        self.loaded = {}
+        self._loading = set()
+        self._lock = threading.RLock()
+
+        for object_type, name in self.object_types.iteritems():
+            tpobject.classes_by_object_type.setdefault(object_type, name)
+        tables.append(self)
+
+    def install(self, name):
+        """Replaces the module `name` with a module that makes the classes
+        in this table when they're first used, returning the new module.
+
+        Call `install()` at the end of the module the table is for, as
+        ``table.install(__name__)``.
+
+        """
+        module = TableModule(sys.modules[name], self)
+        # The classes replace any imported names and classes they shadow, as
+        # they would have if they were defined in the module.
+        registry = remoteobjects.dataobject.classes_by_name
+        for clsname in self.classes:
+            module.__dict__.pop(clsname, None)
+            registry.pop(clsname, None)
+        self.namespace = module.__dict__
+        sys.modules[name] = module
+        return module
+
+    def names(self):
+        """Returns the names of the classes in this table."""
+        return sorted(self.classes)
+
+    def load(self, name):
+        """Returns the class with the given name, making it first if it
+        hasn't been made yet.
+
+        If there is no class by that name in the table, raises `KeyError`.
+
+        """
+        try:
+            return self.loaded[name]
+        except KeyError:
+            pass
+
+        requires, source = self.classes[name]  # KeyError
+        if self.namespace is None:
+            raise ValueError('Class table for %r has not been installed yet'
+                % name)
+
+        self._lock.acquire()
+        try:
+            if name in self.loaded:
+                return self.loaded[name]
+
+            self._loading.add(name)
+            try:
+                for required in requires:
+                    # Classes can refer to each other in their methods, so
+                    # don't start over on classes being made already.
+                    if required not in self._loading:
+                        self.load(required)
+
+                code = compile(source, '<%s.%s>' % (self.namespace['__name__'], name), 'exec')
+                exec code in self.namespace
+            finally:
+                self._loading.discard(name)
+
+            cls = self.loaded[name] = self.namespace[name]
+            return cls
+        finally:
+            self._lock.release()
+
+    def load_all(self):
+        """Makes all the classes in this table that haven't been made yet."""
+        for name in self.names():
+            self.load(name)
+
+
+class TableModule(types.ModuleType):
+
+    """A module whose classes are made from a `ClassTable` when they're
+    first used."""
+
+    def __init__(self, module, table):
+        types.ModuleType.__init__(self, module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+        self._module = module
+        self._table = table
+
+    def __getattr__(self, name):
+        if name == '__all__':
+            names = [name for name in self.__dict__ if not name.startswith('_')]
+            names.extend(self._table.names())
+            self.__dict__['__all__'] = names
+            return names
+        try:
+            return self._table.load(name)
+        except KeyError:
+            raise AttributeError(name)
+
+
+class _ClassRegistry(dict):
+
+    """The `remoteobjects` registry of `DataObject` classes by name, which
+    makes classes from class tables when they're first looked up."""
+
+    def __missing__(self, name):
+        for table in tables:
+            if name in table.classes and table.namespace is not None:
+                return table.load(name)
+        raise KeyError(name)
+
+
+if not isinstance(remoteobjects.dataobject.classes_by_name, _ClassRegistry):
+    remoteobjects.dataobject.classes_by_name = _ClassRegistry(
+        remoteobjects.dataobject.classes_by_name)
@@ -0,0 +1,513 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+The `typepad.feedsub` module provides `CallbackReceiver`, a WSGI application
+for receiving the content TypePad pushes to an application's feed
+subscription callback URL.
+
+When you create an `ExternalFeedSubscription` with a callback URL (or change
+its URL with `update_notification_settings()`), TypePad verifies the URL with
+a PubSubHubbub subscription verification request, then pushes the new items
+in the subscription's feeds to it as Atom documents. A `CallbackReceiver`
+answers the verification requests, checks the ``X-Hub-Signature`` of pushes
+to subscriptions with a ``secret``, and calls a function with each pushed
+entry as it's parsed:
+
+>>> def new_entry(entry, environ):
+...     print entry.title, entry.link
+>>> application = CallbackReceiver(new_entry, verify_token='3FQui9KU6',
+...     secret='s33krit')
+
+Pushed documents are parsed incrementally, so a large push is never held in
+memory whole. (To check a push's signature before acting on any of its
+entries, a signed push is first copied to a temporary file, which is kept in
+memory only if it's small.)
+
+When several subscribed feeds carry the same items, give the receiver a
+`SeenEntries` set to handle each entry only once:
+
+>>> application = CallbackReceiver(new_entry, verify_token='3FQui9KU6',
+...     seen=SeenEntries(max_size=500000))
+
+Pushes saved for later can be checked many at a time with a
+`SignatureVerifier`.
+
+"""
+
+import cgi
+import hashlib
+import hmac
+import logging
+from multiprocessing.pool import ThreadPool
+import struct
+from tempfile import SpooledTemporaryFile
+import threading
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+
+
+log = logging.getLogger(__name__)
+
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+_FEED = '{%s}feed' % ATOM_NS
+_ENTRY = '{%s}entry' % ATOM_NS
+_ID = '{%s}id' % ATOM_NS
+_LINK = '{%s}link' % ATOM_NS
+
+
+def _text(elem, name):
+    child = elem.find('{%s}%s' % (ATOM_NS, name))
+    if child is None:
+        return
+    return child.text
+
+
+class Entry(object):
+
+    """An Atom entry pushed to a feed subscription callback.
+
+    The common parts of the entry are available as attributes: its `id`,
+    `title`, `summary`, `content`, `published` and `updated` timestamps (as
+    the strings given in the entry), `links` (a list of dictionaries of
+    each link's attributes, such as ``rel`` and ``href``), and the terms of
+    its `categories`. Its `feed_id` and `feed_url` are the ID and ``self``
+    link of the feed document it was pushed in.
+
+    The entry's `element` is its `ElementTree` element, for reading any other
+    parts of the entry. As entries are discarded once they're handled, the
+    element is only complete while the entry is being handled.
+
+    """
+
+    def __init__(self, element, feed_id=None, feed_url=None):
+        self.element = element
+        self.feed_id = feed_id
+        self.feed_url = feed_url
+
+        self.id = _text(element, 'id')
+        self.title = _text(element, 'title')
+        self.summary = _text(element, 'summary')
+        self.published = _text(element, 'published')
+        self.updated = _text(element, 'updated')
+
+        self.content = None
+        content = element.find('{%s}content' % ATOM_NS)
+        if content is not None:
+            if len(content):
+                # XHTML content is the markup inside the content element.
+                self.content = ''.join(ElementTree.tostring(child) for child in content)
+            else:
+                self.content = content.text
+
+        self.links = [dict(link.attrib) for link in element.findall(_LINK)]
+        self.categories = [category.get('term')
+            for category in element.findall('{%s}category' % ATOM_NS)]
+
+    @property
+    def link(self):
+        """The URL of the entry's ``alternate`` link, or ``None`` if it has
+        none."""
+        for link in self.links:
+            if link.get('rel', 'alternate') == 'alternate':
+                return link.get('href')
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, self.id)
+
+
+def parse_entries(fileobj):
+    """Yields an `Entry` for each entry in the Atom feed document read from
+    `fileobj`.
+
+    The document is parsed as it's read, and each entry is discarded after
+    the next is requested, so documents of any size are parsed in about the
+    memory of their largest entry. Raises `SyntaxError` if the document isn't
+    well-formed XML.
+
+    """
+    feed_id = feed_url = None
+    depth = 0
+    root = None
+    for event, elem in ElementTree.iterparse(fileobj, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            if root is None:
+                root = elem
+            continue
+
+        depth -= 1
+        if depth != 1 or root.tag != _FEED:
+            continue
+        if elem.tag == _ENTRY:
+            yield Entry(elem, feed_id, feed_url)
+            root.clear()
+        elif elem.tag == _ID:
+            feed_id = elem.text
+        elif elem.tag == _LINK and elem.get('rel') == 'self':
+            feed_url = elem.get('href')
+
+
+class _BodyReader(object):
+
+    """A reader of a WSGI request body, which reads no more than the request's
+    ``Content-Length`` and optionally updates a digest with what it reads."""
+
+    def __init__(self, fileobj, length=None, digest=None):
+        self.fileobj = fileobj
+        self.left = length
+        self.digest = digest
+
+    def read(self, size=-1):
+        if self.left is not None:
+            if size < 0 or size > self.left:
+                size = self.left
+            if size == 0:
+                return ''
+        data = self.fileobj.read(size)
+        if self.left is not None:
+            self.left -= len(data)
+        if self.digest is not None:
+            self.digest.update(data)
+        return data
+
+
+def signature_matches(signature, digest):
+    """Returns whether the ``X-Hub-Signature`` header value `signature`
+    matches the HMAC `digest` of a pushed body.
+
+    The comparison takes the same time wherever the signatures differ.
+
+    """
+    if not signature or not signature.startswith('sha1='):
+        return False
+    expected = 'sha1=' + digest.hexdigest()
+    if len(signature) != len(expected):
+        return False
+    result = 0
+    for x, y in zip(signature, expected):
+        result |= ord(x) ^ ord(y)
+    return result == 0
+
+
+class SignatureVerifier(object):
+
+    """Checks the ``X-Hub-Signature`` signatures of pushes.
+
+    Starting an HMAC with a secret takes some work of its own, so the
+    verifier keeps an HMAC started with each secret it's used with, and
+    copies it for each push signed with that secret.
+
+    """
+
+    read_size = 65536
+    """The number of bytes of a pushed file to read at a time."""
+
+    def __init__(self):
+        self._keyed = dict()
+
+    def digest(self, secret):
+        """Returns a new HMAC-SHA1 digest keyed with `secret`."""
+        keyed = self._keyed.get(secret)
+        if keyed is None:
+            key = secret
+            if isinstance(key, unicode):
+                key = key.encode('utf-8')
+            keyed = hmac.new(key, digestmod=hashlib.sha1)
+            self._keyed[secret] = keyed
+        return keyed.copy()
+
+    def verify(self, body, signature, secret):
+        """Returns whether the ``X-Hub-Signature`` header value `signature`
+        is the correct signature of `body` (a string or file) with
+        `secret`."""
+        digest = self.digest(secret)
+        if isinstance(body, basestring):
+            digest.update(body)
+        else:
+            while True:
+                chunk = body.read(self.read_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return signature_matches(signature, digest)
+
+    def verify_all(self, pushes, max_workers=4):
+        """Checks the signatures of many pushes, on up to `max_workers`
+        threads at once.
+
+        Parameter `pushes` is a sequence of ``(body, signature, secret)``
+        tuples, as for `verify()`. Returns a list of whether each push's
+        signature is correct, in the same order. As the HMAC computation lets
+        other threads run, large pushes are checked in parallel.
+
+        """
+        pushes = list(pushes)
+        verify = lambda push: self.verify(*push)
+        max_workers = min(max_workers, len(pushes))
+        if max_workers <= 1:
+            return map(verify, pushes)
+
+        pool = ThreadPool(max_workers)
+        try:
+            return pool.map(verify, pushes)
+        finally:
+            pool.close()
+            pool.join()
+
+
+class SeenEntries(object):
+
+    """A bounded set of the IDs of entries that have been handled.
+
+    Rather than the IDs themselves, the set keeps a 64-bit hash of each ID,
+    in two generations: once the newer generation holds half of `max_size`
+    IDs, the older generation is forgotten and the newer one takes its
+    place. An ID seen again moves into the newer generation, so IDs that are
+    pushed repeatedly aren't forgotten. An entry pushed again after more than
+    `max_size` other entries may be handled again.
+
+    """
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self._current = set()
+        self._previous = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(entry_id):
+        if isinstance(entry_id, unicode):
+            entry_id = entry_id.encode('utf-8')
+        return struct.unpack('<q', hashlib.sha1(entry_id).digest()[:8])[0]
+
+    def __contains__(self, entry_id):
+        key = self._key(entry_id)
+        return key in self._current or key in self._previous
+
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+    def add(self, entry_id):
+        """Adds `entry_id` to the set, returning whether it was not already
+        in the set."""
+        key = self._key(entry_id)
+        self._lock.acquire()
+        try:
+            if key in self._current:
+                return False
+            seen = key in self._previous
+            if seen:
+                self._previous.discard(key)
+            self._current.add(key)
+            if len(self._current) >= self.max_size // 2:
+                self._previous = self._current
+                self._current = set()
+            return not seen
+        finally:
+            self._lock.release()
+
+    def discard(self, entry_id):
+        """Removes `entry_id` from the set, if it's in it."""
+        key = self._key(entry_id)
+        self._lock.acquire()
+        try:
+            self._current.discard(key)
+            self._previous.discard(key)
+        finally:
+            self._lock.release()
+
+
+class CallbackReceiver(object):
+
+    """A WSGI application for an application's feed subscription callback
+    URL.
+
+    Each entry pushed to the callback URL is passed to `handler`, along with
+    the WSGI environment of the request it was pushed in. If `handler`
+    raises an exception, the exception propagates to the WSGI server, which
+    should respond with an error so that TypePad tries the push again later.
+
+    Parameter `verify_token` is the verify token the subscriptions were
+    created with: either a string, a collection of strings, or a function
+    that is given a verification request's token, mode (``subscribe`` or
+    ``unsubscribe``) and topic, and returns whether to confirm the request.
+
+    If the subscriptions have a `secret`, pushes are only handled if they're
+    signed with it. The `secret` can also be a function that is given a
+    push's WSGI environment and returns the secret of the subscription it's
+    for, or ``None`` if that subscription has no secret. As the
+    PubSubHubbub specification requires, pushes without a valid signature
+    are answered as if they were received, but are otherwise ignored.
+
+    Pushed documents are parsed as they're read, so entries are handled
+    before the rest of the document has been checked. A push that can't be
+    parsed is answered with a ``400 Bad Request`` error, unless some of its
+    entries were already handled; then the error is only logged and the push
+    is answered as received, so that TypePad doesn't push the same entries
+    again.
+
+    If a `SeenEntries` set is given as `seen`, entries whose IDs are in it
+    are skipped, and the IDs of entries that are handled are added to it. (If
+    `handler` raises an exception for an entry, its ID is removed again, so
+    the entry is handled when it's pushed again.)
+
+    """
+
+    spool_size = 1024 * 1024
+    """The number of bytes of a signed push to keep in memory while checking
+    its signature. Larger pushes are copied to a temporary file on disk."""
+    read_size = 65536
+    """The number of bytes of a signed push to read at a time."""
+
+    def __init__(self, handler, verify_token, secret=None, seen=None):
+        self.handler = handler
+        self.verify_token = verify_token
+        self.secret = secret
+        self.seen = seen
+        self.verifier = SignatureVerifier()
+
+    def __call__(self, environ, start_response):
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if method == 'GET':
+            return self.verify(environ, start_response)
+        if method == 'POST':
+            return self.receive(environ, start_response)
+        start_response('405 Method Not Allowed', [('Allow', 'GET, POST'),
+            ('Content-Type', 'text/plain')])
+        return ['Method not allowed']
+
+    def token_is_valid(self, token, mode, topic):
+        """Returns whether a verification request with the given verify
+        token, mode and topic should be confirmed."""
+        if token is None:
+            return False
+        valid = self.verify_token
+        if callable(valid):
+            return bool(valid(token, mode, topic))
+        if isinstance(valid, basestring):
+            return token == valid
+        return token in valid
+
+    def secret_for(self, environ):
+        """Returns the secret with which the push in the given WSGI
+        environment should be signed, or ``None`` if it needn't be."""
+        if callable(self.secret):
+            return self.secret(environ)
+        return self.secret
+
+    def verify(self, environ, start_response):
+        """Answers a PubSubHubbub verification request, echoing its
+        ``hub.challenge`` if its ``hub.verify_token`` is valid."""
+        query = cgi.parse_qs(environ.get('QUERY_STRING', ''))
+        param = lambda name: query.get(name, [None])[0]
+        mode, challenge = param('hub.mode'), param('hub.challenge')
+
+        if (mode not in ('subscribe', 'unsubscribe') or challenge is None
+            or not self.token_is_valid(param('hub.verify_token'), mode, param('hub.topic'))):
+            log.warning('Refusing feed subscription verification request %r',
+                environ.get('QUERY_STRING'))
+            start_response('404 Not Found', [('Content-Type', 'text/plain')])
+            return ['Not found']
+
+        start_response('200 OK', [('Content-Type', 'text/plain'),
+            ('Content-Length', str(len(challenge)))])
+        return [challenge]
+
+    def receive(self, environ, start_response):
+        """Handles a content distribution request, passing each entry in the
+        pushed document to the receiver's handler."""
+        length = environ.get('CONTENT_LENGTH')
+        length = int(length) if length else None
+
+        secret = self.secret_for(environ)
+        if secret is None:
+            return self._handle_push(_BodyReader(environ['wsgi.input'], length),
+                environ, start_response)
+
+        digest = self.verifier.digest(secret)
+        body = _BodyReader(environ['wsgi.input'], length, digest)
+        spool = SpooledTemporaryFile(max_size=self.spool_size)
+        try:
+            while True:
+                chunk = body.read(self.read_size)
+                if not chunk:
+                    break
+                spool.write(chunk)
+            spool.seek(0)
+
+            if not signature_matches(environ.get('HTTP_X_HUB_SIGNATURE'), digest):
+                log.warning('Ignoring feed subscription push to %s with an invalid signature',
+                    environ.get('PATH_INFO'))
+                start_response('202 Accepted', [('Content-Type', 'text/plain')])
+                return ['']
+
+            return self._handle_push(spool, environ, start_response)
+        finally:
+            spool.close()
+
+    def _handle_push(self, source, environ, start_response):
+        """Passes each entry in the pushed document read from `source` to the
+        receiver's handler, and answers the push."""
+        handled = 0
+        try:
+            seen = self.seen
+            for entry in parse_entries(source):
+                if seen is None or entry.id is None:
+                    self.handler(entry, environ)
+                    handled += 1
+                    continue
+                # Claim the entry before handling it, so the same entry
+                # pushed through another feed at once isn't handled twice.
+                if not seen.add(entry.id):
+                    continue
+                try:
+                    self.handler(entry, environ)
+                except:
+                    seen.discard(entry.id)
+                    raise
+                handled += 1
+        except SyntaxError, exc:
+            if handled:
+                # Asking for the push again would handle those entries twice.
+                log.warning('Could not parse feed subscription push to %s after handling %d entries: %s',
+                    environ.get('PATH_INFO'), handled, exc)
+            else:
+                log.warning('Could not parse feed subscription push to %s: %s',
+                    environ.get('PATH_INFO'), exc)
+                start_response('400 Bad Request', [('Content-Type', 'text/plain')])
+                return ['Could not parse pushed content']
+
+        start_response('204 No Content', [])
+        return []
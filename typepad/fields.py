@@ -29,12 +29,10 @@
 
 import logging
 
-import simplejson as json
-
 import remoteobjects.dataobject
 import remoteobjects.fields
 from remoteobjects.fields import *
-import remoteobjects.http
+import typepad.bulk
 import typepad.tpobject
 
 
@@ -94,8 +92,12 @@ class ActionEndpoint(remoteobjects.fields.Property):
             self.api_name = attrname
 
     def __get__(self, instance, owner):
+        if instance is None:
+            # Yield the real endpoint when gotten through the class.
+            return self
+
         if instance._location is None:
-            raise AttributeError('Cannot find URL of %s relative to URL-less %s' % (self.cls.__name__, owner.__name__))
+            raise AttributeError('Cannot find URL of %s relative to URL-less %s' % (self.api_name, owner.__name__))
 
         assert instance._location.endswith('.json')
         newurl = instance._location[:-5]
@@ -105,7 +107,7 @@ class ActionEndpoint(remoteobjects.fields.Property):
         def post(**kwargs):
             post_obj = self.post_type(**kwargs)
 
-            body = json.dumps(post_obj.to_dict(), default=remoteobjects.http.omit_nulls)
+            body = post_obj.to_json()
             headers = {'content-type': post_obj.content_types[0]}
             request = post_obj.get_request(url=newurl, method='POST',
                 body=body, headers=headers)
@@ -122,3 +124,28 @@ class ActionEndpoint(remoteobjects.fields.Property):
             return resp_obj
 
         return post
+
+    def post_all(self, calls, max_workers=4, retries=0):
+        """Performs this action for many objects at once.
+
+        Parameter `calls` is a sequence of ``(instance, kwargs)`` pairs, each
+        an instance of the class that has this action and the keyword
+        arguments with which to perform the action on it. For example, to add
+        many users to a group:
+
+        >>> calls = [(group, {'user_id': user.url_id}) for user in users]
+        >>> results = Group.add_member.post_all(calls)
+
+        The actions are performed on up to `max_workers` threads at once, as
+        with `typepad.bulk.run()`. Actions that fail to connect to the API are
+        tried again up to `retries` more times.
+
+        Returns a list of `typepad.bulk.BulkResult` instances in the same
+        order as `calls`, with values of whatever the action returns.
+
+        """
+        def post(call):
+            instance, kwargs = call
+            return self.__get__(instance, type(instance))(**kwargs)
+        return typepad.bulk.run(post, calls, max_workers=max_workers,
+            retries=retries)
@@ -0,0 +1,142 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+The `typepad.jsonlib` module chooses the JSON library used for encoding and
+decoding API data.
+
+By default, `simplejson` is used if it's installed, or the standard `json`
+module if not. Use `use()` to choose a particular one, such as the faster
+`ujson`:
+
+>>> typepad.jsonlib.use('ujson')
+
+Whichever library is in use, work it can't do the same way as the others
+falls back to `simplejson` or the standard `json` module: with `ujson`,
+that's decoding content that isn't valid UTF-8 and encoding with a
+``default`` function.
+
+`ujson` is never chosen by default, as it decodes all strings as
+`unicode`, where `simplejson` decodes strings that are all ASCII as `str`.
+Before using it, make sure code that checks the type of decoded API data
+accepts either (as with `isinstance(value, basestring)`).
+
+"""
+
+try:
+    import simplejson as _fallback
+except ImportError:
+    import json as _fallback
+
+
+class _Backend(object):
+
+    def __init__(self, name, module):
+        self.name = name
+        self.module = module
+
+    def loads(self, content):
+        return self.module.loads(content)
+
+    def dumps(self, data, default=None):
+        return self.module.dumps(data, default=default, separators=(',', ':'))
+
+
+class _UltraJSONBackend(_Backend):
+
+    def loads(self, content):
+        try:
+            return self.module.loads(content, precise_float=True)
+        except ValueError:
+            # Let the fallback library say what's wrong with the content, or
+            # decode it after all (ujson rejects some invalid UTF-8 that the
+            # other libraries can forgive).
+            return _fallback.loads(content)
+
+    def dumps(self, data, default=None):
+        if default is not None:
+            # ujson can't call a default function for objects it can't
+            # encode (it encodes their attributes instead).
+            return _fallback.dumps(data, default=default, separators=(',', ':'))
+        return self.module.dumps(data, escape_forward_slashes=False)
+
+
+_backend_classes = (
+    ('ujson', _UltraJSONBackend),
+    ('simplejson', _Backend),
+    ('json', _Backend),
+)
+
+backends = {}
+"""The available JSON libraries, by name."""
+for _name, _cls in _backend_classes:
+    try:
+        backends[_name] = _cls(_name, __import__(_name))
+    except ImportError:
+        pass
+
+backend = None
+"""The JSON library in use."""
+
+
+def use(name):
+    """Makes the named JSON library (``ujson``, ``simplejson`` or ``json``)
+    the one to use for encoding and decoding API data."""
+    global backend
+    try:
+        backend = backends[name]
+    except KeyError:
+        raise ValueError('JSON library %r is not available' % name)
+
+
+for _name in ('simplejson', 'json'):
+    if _name in backends:
+        use(_name)
+        break
+
+
+def loads(content):
+    """Decodes the JSON string `content` with the JSON library in use."""
+    try:
+        return backend.loads(content)
+    except UnicodeDecodeError:
+        from remoteobjects.json import ForgivingDecoder
+        return _fallback.loads(content, cls=ForgivingDecoder)
+
+
+def dumps(data, default=None):
+    """Encodes `data` as compact JSON with the JSON library in use.
+
+    Optional parameter `default` is a function that returns an encodable
+    version of any object the library can't otherwise encode, as with
+    `json.dumps()`.
+
+    """
+    return backend.dumps(data, default=default)
@@ -0,0 +1,269 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+The `typepad.packing` module provides a compact binary encoding of
+`TypePadObject` instances, for caching many objects locally.
+
+Packed objects are encoded from the same data as `TypePadObject.to_dict()`,
+but instead of naming each field, a packed object stores a bitmask of which
+of its class's fields it has, followed by those fields' values in the order
+of the class's sorted field names. Any other data the object has is kept by
+name. Embedded objects are packed the same way.
+
+The packed structure is serialized with `msgpack` if it's installed, or
+with the standard `marshal` module otherwise. Either way, as field
+positions come from the class definitions, packed data should only be
+unpacked by the same version of this library that packed it.
+
+>>> data = pack_all(group.events.entries)
+>>> events = unpack_all(data)
+
+"""
+
+import marshal
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from typepad import fields
+from typepad.cache import find_class
+from typepad.tpobject import CompactTypePadObject
+
+
+class _MarshalCodec(object):
+
+    tag = 'M'
+
+    def dumps(self, data):
+        return marshal.dumps(data, 2)
+
+    def loads(self, data):
+        return marshal.loads(data)
+
+
+class _MsgpackCodec(object):
+
+    tag = 'P'
+
+    def dumps(self, data):
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+codecs = {'marshal': _MarshalCodec()}
+"""The available serializations for packed objects, by name."""
+if msgpack is not None:
+    codecs['msgpack'] = _MsgpackCodec()
+
+default_codec = 'msgpack' if msgpack is not None else 'marshal'
+"""The name of the serialization `pack()` and `pack_all()` use by default."""
+
+_codecs_by_tag = dict((codec.tag, codec) for codec in codecs.itervalues())
+
+RAW, OBJECT, LIST, DICT = range(4)
+
+_schemas = {}
+
+
+def _schema(cls):
+    """Returns the packing schema for `cls`: a list of ``(api_name, kind,
+    field)`` tuples for its fields in order, and a mapping of their API names
+    to their positions."""
+    try:
+        return _schemas[cls]
+    except KeyError:
+        pass
+
+    entries = list()
+    for field in sorted(cls.fields.itervalues(), key=lambda f: f.api_name):
+        if isinstance(field, fields.Dict) and isinstance(field.fld, fields.Object):
+            entry = (field.api_name, DICT, field.fld)
+        elif isinstance(field, fields.List) and isinstance(field.fld, fields.Object):
+            entry = (field.api_name, LIST, field.fld)
+        elif isinstance(field, fields.Object):
+            entry = (field.api_name, OBJECT, field)
+        else:
+            entry = (field.api_name, RAW, None)
+        entries.append(entry)
+    positions = dict((entry[0], i) for i, entry in enumerate(entries))
+
+    schema = _schemas[cls] = (entries, positions)
+    return schema
+
+
+def _object_data(obj):
+    """Returns the same data as ``obj.to_dict()``, without copying the data
+    the object was decoded from."""
+    data = dict(obj.api_data)
+    if isinstance(obj, CompactTypePadObject):
+        decoded = obj._decoded_fields()
+    else:
+        decoded = obj.__dict__
+    for field in obj.fields.itervalues():
+        value = decoded.get(field.attrname)
+        if value is not None:
+            data[field.api_name] = field.encode(value)
+    if 'objectType' not in data and hasattr(type(obj), 'object_type'):
+        data['objectType'] = obj._class_object_type
+    return data
+
+
+def _pack_data(cls, data, declared):
+    entries, positions = _schema(cls)
+    mask = 0
+    packed = list()
+    extras = None
+    for key in sorted(data, key=positions.get):
+        value = data[key]
+        i = positions.get(key)
+        if i is not None:
+            kind = entries[i][1]
+            if kind == RAW or value is None:
+                pass
+            elif kind == OBJECT and isinstance(value, dict):
+                value = _pack_embedded(entries[i][2].cls, value)
+            elif kind == LIST and isinstance(value, list) and all(isinstance(v, dict) for v in value):
+                subcls = entries[i][2].cls
+                value = [_pack_embedded(subcls, v) for v in value]
+            elif kind == DICT and isinstance(value, dict) and all(isinstance(v, dict) for v in value.itervalues()):
+                subcls = entries[i][2].cls
+                value = dict((k, _pack_embedded(subcls, v)) for k, v in value.iteritems())
+            else:
+                # Unexpected data for this field, so keep it by name.
+                i = None
+        if i is None:
+            if extras is None:
+                extras = dict()
+            extras[key] = value
+            continue
+        mask |= 1 << i
+        packed.append(value)
+
+    name = None if cls is declared else cls.__name__
+    return (name, mask, packed, extras)
+
+
+def _pack_embedded(declared, data):
+    return _pack_data(declared.class_for_data(data), data, declared)
+
+
+def _unpack_data(declared, packed):
+    name, mask, values, extras = packed
+    cls = declared if name is None else find_class(name)
+    entries = _schema(cls)[0]
+
+    data = dict(extras) if extras else dict()
+    values = iter(values)
+    i = 0
+    while mask:
+        if mask & 1:
+            api_name, kind, field = entries[i]
+            value = values.next()
+            if kind == RAW or value is None:
+                pass
+            elif kind == OBJECT:
+                value = _unpack_data(field.cls, value)[1]
+            elif kind == LIST:
+                subcls = field.cls
+                value = [_unpack_data(subcls, v)[1] for v in value]
+            else:
+                subcls = field.cls
+                value = dict((k, _unpack_data(subcls, v)[1]) for k, v in value.iteritems())
+            data[api_name] = value
+        mask >>= 1
+        i += 1
+
+    return cls, data
+
+
+def _pack_object(obj):
+    cls = type(obj)
+    return (cls.__name__, obj._location, getattr(obj, '_etag', None),
+        _pack_data(cls, _object_data(obj), cls))
+
+
+def _unpack_object(packed):
+    name, location, etag, packed = packed
+    cls, data = _unpack_data(find_class(name), packed)
+    obj = cls.from_dict(data)
+    obj._location = location
+    obj._etag = etag
+    return obj
+
+
+def _codec(name):
+    try:
+        return codecs[name or default_codec]
+    except KeyError:
+        raise ValueError('Unknown packing codec %r' % name)
+
+
+def _decoded(data):
+    try:
+        codec = _codecs_by_tag[data[:1]]
+    except KeyError:
+        raise ValueError('Data is not packed with an available codec')
+    return codec.loads(data[1:])
+
+
+def pack(obj, codec=None):
+    """Encodes the `TypePadObject` instance `obj` as a compact string.
+
+    The object's class, URL and ETag are encoded along with its data. The
+    string is serialized with the named `codec` (see `codecs`), or the
+    `default_codec` if none is given.
+
+    """
+    codec = _codec(codec)
+    return codec.tag + codec.dumps(_pack_object(obj))
+
+
+def unpack(data):
+    """Decodes a string made with `pack()` into a new `TypePadObject`
+    instance of the original class."""
+    return _unpack_object(_decoded(data))
+
+
+def pack_all(objs, codec=None):
+    """Encodes all the given `TypePadObject` instances as one compact string,
+    as `pack()` does."""
+    codec = _codec(codec)
+    return codec.tag + codec.dumps([_pack_object(obj) for obj in objs])
+
+
+def unpack_all(data):
+    """Decodes a string made with `pack_all()` into a list of new
+    `TypePadObject` instances."""
+    return [_unpack_object(packed) for packed in _decoded(data)]
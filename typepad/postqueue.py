@@ -0,0 +1,346 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+The `typepad.postqueue` module provides `PostQueue`, a durable write-behind
+queue for adding new objects (such as `Post` and `Comment` assets) to the
+TypePad API.
+
+Rather than waiting for each ``POST`` request as `TypePadObject.post()` does,
+producers add objects to a `PostQueue` and return immediately. The queued
+posts are kept in a SQLite database, so they survive a restart of the
+process, and are sent by a pool of worker threads.
+
+>>> queue = PostQueue('/var/spool/myapp/posts.db')
+>>> queue.recover()
+>>> queue.start()
+>>> queue.post(group.post_assets, typepad.Post(title='Hi', content='...'),
+...     key='feed-item-1234')
+
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+from typepad import bulk, jsonlib
+from typepad.cache import find_class
+from typepad.tpobject import TypePadObject
+
+
+log = logging.getLogger(__name__)
+
+
+PENDING = 'pending'
+"""State of a queued post that has not been sent yet."""
+SENDING = 'sending'
+"""State of a queued post that a worker is currently sending."""
+DONE = 'done'
+"""State of a queued post that was added to the API."""
+FAILED = 'failed'
+"""State of a queued post that the API would not accept, or that could not be
+sent in `PostQueue.max_attempts` tries."""
+UNKNOWN = 'unknown'
+"""State of a queued post that may or may not have been added to the API,
+because the connection failed after the post was sent or because the queue
+was shut down while sending it."""
+
+
+class PostQueue(object):
+
+    """A durable queue of objects to add to TypePad API resources.
+
+    Each queued post can be given an idempotency `key`, such as the ID of
+    the source item it was made from. A post is only queued once per key, so
+    producers can safely re-add items they're not sure were queued.
+
+    Posts that can't be sent because the API can't be reached are retried up
+    to `max_attempts` times. Posts the API refuses are marked `FAILED` with
+    the error that occurred. As a ``POST`` request the API may have acted on
+    can't safely be repeated, posts whose connection failed after they were
+    sent (for instance, by timing out) are marked `UNKNOWN`, as are posts
+    that were being sent when the queue was shut down once `recover()` is
+    called; use `retry_unknown()` to send them again.
+
+    """
+
+    max_attempts = 5
+    """The number of times to try sending a post before giving up on it."""
+    retry_delay = 1.0
+    """The number of seconds to wait before resending a post the first time.
+    The delay doubles for each attempt after that."""
+    poll_interval = 0.5
+    """The number of seconds a worker waits before checking for new posts
+    when the queue is empty."""
+
+    class Entry(object):
+
+        """A post in a `PostQueue`.
+
+        Once the post is added to the API, its `location` is the URL of the
+        new object. If sending the post failed, its `error` describes the
+        last error that occurred.
+
+        """
+
+        def __init__(self, id, key, state, attempts, location, error):
+            self.id = id
+            self.key = key
+            self.state = state
+            self.attempts = attempts
+            self.location = location
+            self.error = error
+
+        def __repr__(self):
+            return '<%s.Entry %d %s>' % (PostQueue.__name__, self.id, self.state)
+
+    def __init__(self, path, max_workers=4):
+        """Opens the queue stored in the SQLite database at `path`, creating
+        it if necessary.
+
+        The queue's posts are sent on up to `max_workers` threads at once,
+        once the queue is started.
+
+        """
+        self.path = path
+        self.max_workers = max_workers
+        self._local = threading.local()
+        self._threads = list()
+        self._stopping = threading.Event()
+
+        db = self._db()
+        db.execute("""CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE,
+            target TEXT NOT NULL,
+            class_name TEXT NOT NULL,
+            body TEXT NOT NULL,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            not_before REAL NOT NULL DEFAULT 0,
+            location TEXT,
+            error TEXT
+        )""")
+        db.execute("CREATE INDEX IF NOT EXISTS posts_state ON posts (state, not_before)")
+
+    def _db(self):
+        try:
+            return self._local.db
+        except AttributeError:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.db = db
+            return db
+
+    def post(self, target, obj, key=None):
+        """Queues `obj` to be added to the `TypePadObject` resource `target`,
+        as `target.post(obj)` would.
+
+        If a post with the given idempotency `key` is already in the queue,
+        `obj` is not queued again. Returns the ID of the queued post.
+
+        """
+        if target._location is None:
+            raise ValueError('Cannot add %r to %r with no URL to POST to'
+                % (obj, target))
+        body = obj.to_json()
+
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = None
+            if key is not None:
+                row = db.execute("SELECT id FROM posts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                cursor = db.execute("""INSERT INTO posts (key, target, class_name, body, state)
+                    VALUES (?, ?, ?, ?, ?)""",
+                    (key, target._location, type(obj).__name__, body, PENDING))
+                entry_id = cursor.lastrowid
+            else:
+                entry_id = row[0]
+            db.execute("COMMIT")
+        except:
+            db.execute("ROLLBACK")
+            raise
+        return entry_id
+
+    def entry(self, entry_id):
+        """Returns the `PostQueue.Entry` for the post with the given ID, or
+        ``None`` if there is no such post."""
+        row = self._db().execute("""SELECT id, key, state, attempts, location, error
+            FROM posts WHERE id = ?""", (entry_id,)).fetchone()
+        if row is None:
+            return
+        return self.Entry(*row)
+
+    def counts(self):
+        """Returns a dictionary of the number of posts in the queue in each
+        state."""
+        return dict(self._db().execute("SELECT state, COUNT(*) FROM posts GROUP BY state"))
+
+    def recover(self):
+        """Marks the posts left in the `SENDING` state by a queue that was
+        shut down while sending them as `UNKNOWN`.
+
+        Only call this when no other `PostQueue` (in this process or any
+        other) is sending posts from the same database, such as when your
+        application starts up, or posts that are really being sent will be
+        marked too.
+
+        """
+        self._db().execute("UPDATE posts SET state = ? WHERE state = ?", (UNKNOWN, SENDING))
+
+    def retry_unknown(self):
+        """Queues the posts in the `UNKNOWN` state to be sent again.
+
+        Only do this if you know those posts were not added to the API, or
+        that adding them twice is harmless.
+
+        """
+        self._db().execute("UPDATE posts SET state = ?, not_before = 0 WHERE state = ?",
+            (PENDING, UNKNOWN))
+
+    def _claim(self):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("""SELECT id, target, class_name, body, attempts FROM posts
+                WHERE state = ? AND not_before <= ? ORDER BY id LIMIT 1""",
+                (PENDING, time.time())).fetchone()
+            if row is not None:
+                db.execute("UPDATE posts SET state = ?, attempts = attempts + 1 WHERE id = ?",
+                    (SENDING, row[0]))
+            db.execute("COMMIT")
+        except:
+            db.execute("ROLLBACK")
+            raise
+        return row
+
+    def _finish(self, entry_id, state, location=None, error=None, not_before=0):
+        self._db().execute("""UPDATE posts SET state = ?, location = ?, error = ?, not_before = ?
+            WHERE id = ?""", (state, location, error, not_before, entry_id))
+
+    def _send(self, row):
+        entry_id, target_url, class_name, body, attempts = row
+        attempts += 1
+        try:
+            target = TypePadObject()
+            target._location = target_url
+            obj = find_class(class_name).from_dict(jsonlib.loads(body))
+            target.post(obj)
+        except Exception, exc:
+            if not bulk.safe_to_retry(exc):
+                if isinstance(exc, bulk.connection_errors):
+                    log.warning('Queued post %d may not have been sent: %s', entry_id, exc)
+                    self._finish(entry_id, UNKNOWN, error=str(exc))
+                else:
+                    log.warning('Queued post %d failed: %s', entry_id, exc)
+                    self._finish(entry_id, FAILED, error=str(exc))
+            elif attempts >= self.max_attempts:
+                log.warning('Giving up on queued post %d after %d attempts: %s', entry_id, attempts, exc)
+                self._finish(entry_id, FAILED, error=str(exc))
+            else:
+                log.debug('Will retry queued post %d after error: %s', entry_id, exc)
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                self._finish(entry_id, PENDING, error=str(exc), not_before=time.time() + delay)
+        else:
+            self._finish(entry_id, DONE, location=obj._location)
+
+    def _has_pending(self):
+        row = self._db().execute("SELECT 1 FROM posts WHERE state = ? LIMIT 1", (PENDING,)).fetchone()
+        return row is not None
+
+    def _work(self, setup, until_empty):
+        setup()
+        try:
+            while not self._stopping.isSet():
+                row = self._claim()
+                if row is not None:
+                    self._send(row)
+                elif until_empty and not self._has_pending():
+                    return
+                else:
+                    self._stopping.wait(self.poll_interval)
+        finally:
+            # The worker may have failed before it opened its connection.
+            db = getattr(self._local, 'db', None)
+            if db is not None:
+                db.close()
+                del self._local.db
+
+    def _start_workers(self, until_empty):
+        setup = bulk.worker_setup()
+        max_workers = self.max_workers
+        if setup is None:
+            # The workers will have to share the one user agent.
+            setup = lambda: None
+            max_workers = 1
+
+        self._stopping.clear()
+        for i in range(max_workers):
+            thread = threading.Thread(target=self._work, args=(setup, until_empty))
+            thread.setDaemon(True)
+            thread.start()
+            self._threads.append(thread)
+
+    def start(self):
+        """Starts sending queued posts in the background, until `stop()` is
+        called.
+
+        Worker threads make their requests as the calling thread does (see
+        `typepad.bulk.worker_setup()`).
+
+        """
+        if self._threads:
+            raise ValueError('%s is already started' % type(self).__name__)
+        self._start_workers(until_empty=False)
+
+    def stop(self):
+        """Stops sending queued posts, once the posts being sent are
+        finished."""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = list()
+
+    def drain(self):
+        """Sends all the queued posts, returning once there are no more posts
+        waiting to be sent.
+
+        Posts awaiting a retry are waited for, so `drain()` may take a while
+        if the API can't be reached.
+
+        """
+        if self._threads:
+            raise ValueError('%s is already started' % type(self).__name__)
+        self._start_workers(until_empty=True)
+        for thread in self._threads:
+            thread.join()
+        self._threads = list()
@@ -342,6 +342,35 @@ class OAuthClient(oauth.OAuthClient):
         return req.to_url()
 
 
+class _RewindingConnection(object):
+
+    """An HTTP connection that rewinds a request body before each attempt to
+    send it.
+
+    `httplib2` sends a request again on the same connection object if the
+    first attempt fails. A file-like body that was partly sent the first
+    time would then be sent from where it left off, so bodies that can be
+    rewound (such as `BrowserUploadEndpoint.StreamingBody` instances) are
+    rewound before each attempt.
+
+    """
+
+    def __init__(self, conn, body):
+        self.__dict__['conn'] = conn
+        self.__dict__['body'] = body
+
+    def request(self, method, url, body=None, headers=None):
+        if body is self.body:
+            body.rewind()
+        return self.conn.request(method, url, body, headers or {})
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.conn, name, value)
+
+
 class TypePadClient(batchhttp.client.BatchClient, OAuthHttp):
 
     """An HTTP user agent for performing TypePad API requests.
@@ -387,6 +416,11 @@ class TypePadClient(batchhttp.client.BatchClient, OAuthHttp):
             headers['cookie'] = '; '.join(cookies)
         return super(TypePadClient, self).request(uri, method, body, headers, redirections, connection_type)
 
+    def _conn_request(self, conn, request_uri, method, body, headers):
+        if hasattr(body, 'rewind'):
+            conn = _RewindingConnection(conn, body)
+        return super(TypePadClient, self)._conn_request(conn, request_uri, method, body, headers)
+
     def add_credentials(self, name, password, domain=""):
         endparts = urlparse.urlsplit(self.endpoint)
         if domain == '':
@@ -416,6 +450,23 @@ class TypePadClient(batchhttp.client.BatchClient, OAuthHttp):
         return super(TypePadClient, self).signed_request(uri=uri,
             method=method, body=body, headers=headers)
 
+    def clone(self):
+        """Returns a new `TypePadClient` instance that makes requests as this
+        one does, with the same endpoint, cookies and credentials.
+
+        As user agents can't be shared between threads, use `clone()` to
+        make a user agent for another thread to use on this one's behalf.
+
+        """
+        other = type(self)(cache=self.cache, timeout=self.timeout)
+        other.endpoint = self.endpoint
+        other.cookies = dict(self.cookies)
+        other._consumer = self._consumer
+        other._token = self._token
+        other.credentials.credentials = list(self.credentials.credentials)
+        other.authorizations = list(self.authorizations)
+        return other
+
     def _get_consumer(self):
         return self._consumer
 
@@ -38,6 +38,12 @@ The module contains:
 * the `TypePadObject` class, a `RemoteObject` subclass that enforces batch
   requesting and ``objectTypes`` behavior
 
+* the `CompactTypePadObject` class, a `TypePadObject` subclass that stores
+  its field values in less memory
+
+* the `Interner` class, for sharing instances of objects embedded many times
+  in API responses
+
 * the `Link` class, implementing the TypePad API's common link object
 
 * the `ListObject` class and `ListOf` metaclass, providing an interface for
@@ -45,6 +51,8 @@ The module contains:
 
 """
 
+import binascii
+from bisect import bisect_left
 import cgi
 from copy import copy
 from cStringIO import StringIO
@@ -58,26 +66,47 @@ import httplib
 import inspect
 from itertools import chain
 import logging
+import mimetypes
+import os
 import re
 import sys
+import threading
+import time
 import urllib
 from urlparse import urljoin, urlparse, urlunparse
 
 from batchhttp.client import BatchError
 import httplib2
 import remoteobjects
+import remoteobjects.http
 from remoteobjects.dataobject import find_by_name
 from remoteobjects.promise import PromiseError
 import remoteobjects.listobject
-import simplejson as json
 
 import typepad
-from typepad import fields
+from typepad import fields, jsonlib
 
 
 log = logging.getLogger(__name__)
 
 classes_by_object_type = {}
+object_type_classes = {}
+"""The `TypePadObject` classes for each API object type, by object type."""
+
+
+def import_api():
+    """Imports the `typepad.api` module, if it isn't imported yet.
+
+    The `typepad` package imports the API classes only when they're first
+    used, so code that looks classes up by name or object type calls this
+    before giving up on a name. Returns ``True`` if the module was imported
+    by this call, or ``False`` if it had already been imported.
+
+    """
+    if 'typepad.api' in sys.modules:
+        return False
+    __import__('typepad.api')
+    return True
 
 
 class TypePadObjectMetaclass(remoteobjects.RemoteObject.__metaclass__):
@@ -99,6 +128,13 @@ class TypePadObjectMetaclass(remoteobjects.RemoteObject.__metaclass__):
             pass
         else:
             classes_by_object_type[api_type] = newcls.__name__
+
+        # As find_by_name() finds the newest class of a name, so should the
+        # table of object type classes.
+        for api_type, clsname in classes_by_object_type.iteritems():
+            if clsname == name:
+                object_type_classes[api_type] = newcls
+
         return newcls
 
 
@@ -117,6 +153,14 @@ class TypePadObject(remoteobjects.RemoteObject):
 
     _class_object_type = None
     batch_requests = True
+    intern_embedded = False
+    """Whether to share one instance among the embedded objects with the same
+    identifier in each API response (see `Interner`)."""
+    eager_decoding = False
+    """Whether `update_from_dict()` decodes all the instance's fields at once,
+    with a decoder compiled for its class, instead of decoding each field
+    when it's first used. Data that can't be decoded then fails in
+    `update_from_dict()`, instead of when the field is used."""
 
     @classmethod
     def get(cls, url, *args, **kwargs):
@@ -155,23 +199,42 @@ class TypePadObject(remoteobjects.RemoteObject):
         """Adds another `TypePadObject` to this remote resource through an HTTP
         ``POST`` request, as in `HttpObject.post()`.
 
-        Regardless of the `http` parameter, the request is performed with the
-        `typepad.client` user agent.
+        The request body is encoded with `obj.to_json()`. Regardless of the
+        `http` parameter, the request is performed with the `typepad.client`
+        user agent.
 
         """
-        http = typepad.client
-        return super(TypePadObject, self).post(obj, http=http)
+        if getattr(self, '_location', None) is None:
+            raise ValueError('Cannot add %r to %r with no URL to POST to'
+                % (obj, self))
+
+        headers = {'content-type': self.content_types[0]}
+        request = obj.get_request(url=self._location, method='POST',
+            body=obj.to_json(), headers=headers)
+        response, content = typepad.client.request(**request)
+
+        obj.update_from_response(self._location, response, content)
 
     def put(self, http=None):
         """Saves a previously requested `TypePadObject` back to its remote
         resource through an HTTP ``PUT`` request, as in `HttpObject.put()`.
 
-        Regardless of the `http` parameter, the request is performed with the
-        `typepad.client` user agent.
+        The request body is encoded with `to_json()`. Regardless of the
+        `http` parameter, the request is performed with the `typepad.client`
+        user agent.
 
         """
-        http = typepad.client
-        return super(TypePadObject, self).put(http=http)
+        if getattr(self, '_location', None) is None:
+            raise ValueError('Cannot save %r with no URL to PUT to' % self)
+
+        headers = {'content-type': self.content_types[0]}
+        if getattr(self, '_etag', None) is not None:
+            headers['if-match'] = self._etag
+        request = self.get_request(method='PUT', body=self.to_json(),
+            headers=headers)
+        response, content = typepad.client.request(**request)
+
+        self.update_from_response(self._location, response, content)
 
     def delete(self, http=None):
         """Deletes the remote resource represented by this `TypePadObject`
@@ -208,6 +271,48 @@ class TypePadObject(remoteobjects.RemoteObject):
             ret._origin = inspect.stack()[1][1:4]
         return ret
 
+    @classmethod
+    def class_for_data(cls, data):
+        """Returns the `TypePadObject` subclass of which an instance decoded
+        from `data` should be.
+
+        If `data` is a dictionary with an ``objectType`` item naming an API
+        object type, the class for that object type is returned. Otherwise,
+        `cls` is returned.
+
+        """
+        try:
+            object_type = data['objectType']
+        except (TypeError, KeyError):
+            return cls
+        try:
+            return object_type_classes[object_type]
+        except (TypeError, KeyError):
+            pass
+
+        # The class may not have been made yet (see `typepad.classtable`), or
+        # even imported.
+        try:
+            find_by_name(classes_by_object_type[object_type])
+            return object_type_classes[object_type]
+        except (TypeError, KeyError):
+            pass
+        if import_api():
+            return cls.class_for_data(data)
+        return cls
+
+    @classmethod
+    def from_dict(cls, data):
+        """Decodes a dictionary into a new instance of the `TypePadObject`
+        subclass the data specify (see `class_for_data()`)."""
+        if cls.reclass_for_data.im_func is TypePadObject.reclass_for_data.im_func:
+            # Choose the class up front, so update_from_dict() needn't start
+            # over once it's reclassed.
+            cls = cls.class_for_data(data)
+        self = cls()
+        self.update_from_dict(data)
+        return self
+
     def reclass_for_data(self, data):
         """Modifies this `TypePadObject` instance to be an instance of the
         specific `TypePadObject` subclass specified in `data`.
@@ -226,30 +331,21 @@ class TypePadObject(remoteobjects.RemoteObject):
         `data` parameter's ``objectTypes`` list.
 
         This method returns ``True`` if the instance was changed to be a
-        different class, or ``False`` if it was not modified.
+        different class, or ``False`` if it was not modified. Override
+        `class_for_data()` to change which class that is.
 
         """
-        # What should I be?
-        try:
-            objtype = data['objectType']
-        except (TypeError, KeyError):
-            pass
-        else:
-            try:
-                objclsname = classes_by_object_type[objtype]
-                objcls = find_by_name(objclsname)  # KeyError
-            except KeyError:
-                pass
-            else:
-                # Is that a change?
-                if objcls is not self.__class__:
-                    self.__class__ = objcls
+        objcls = self.class_for_data(data)
+        if objcls is self.__class__:
+            # We're already that class, so go ahead.
+            return False
 
-                    # Have update_from_dict() start over.
-                    return True
+        self._reclass(objcls)
+        # Have update_from_dict() start over.
+        return True
 
-        # We're already that class, so go ahead.
-        return False
+    def _reclass(self, objcls):
+        self.__class__ = objcls
 
     def make_self_link(self):
         """Builds the API URL for this `TypePadObject` instance from its data.
@@ -308,13 +404,489 @@ class TypePadObject(remoteobjects.RemoteObject):
                 if log.isEnabledFor(logging.DEBUG):
                     log.exception(exc)
 
+        interner = Interner.current()
+        if interner is None and self.intern_embedded:
+            interner = Interner()
+        if interner is not None:
+            interner.intern_fields(self)
+        elif self.eager_decoding:
+            _decoder(type(self))(self, data, _from_dict)
+
+    def update_from_response(self, url, response, content):
+        """Adds the content of this HTTP response and message body to this
+        `TypePadObject` instance, as in `RemoteObject.update_from_response()`,
+        but decoding the content with the JSON library chosen in
+        `typepad.jsonlib`."""
+        self.raise_for_response(url, response, content)
+
+        self.update_from_dict(jsonlib.loads(content))
+
+        location_header = self.location_headers.get(response.status)
+        if location_header is None:
+            self._location = url
+        elif self.location_header_required.get(response.status):
+            self._location = response[location_header.lower()]
+        else:
+            self._location = response.get(location_header.lower(), url)
+
+        if 'etag' in response:
+            self._etag = response['etag']
+
+        # Any updating from a response constitutes delivery.
+        self._delivered = True
+
     def to_dict(self):
         """Encodes the `TypePadObject` instance to a dictionary."""
+        encoder = _encoder(type(self))
+        if encoder is not None:
+            return encoder(self, _copy_data)
+
         ret = super(TypePadObject, self).to_dict()
         if 'objectType' not in ret and hasattr(self, 'object_type'):
             ret['objectType'] = self._class_object_type
         return ret
 
+    def to_json(self):
+        """Encodes the `TypePadObject` instance as JSON, for the body of an
+        API request.
+
+        The result is the same as encoding the result of `to_dict()` as
+        JSON, but the instance's data isn't copied first.
+
+        """
+        encoder = _encoder(type(self))
+        if encoder is None:
+            return jsonlib.dumps(self.to_dict(), default=remoteobjects.http.omit_nulls)
+        # Compiled encoders only produce dictionaries, lists and plain
+        # values, so any JSON library can encode them without help.
+        return jsonlib.dumps(encoder(self, dict))
+
+
+class Interner(object):
+
+    """Shares one instance among embedded objects with the same identifier.
+
+    API responses often embed the same object many times, such as the author
+    of every asset in a list of events. Normally each of those becomes a
+    separate `TypePadObject` instance when it's first used. While an
+    `Interner` is in use, objects updated from API data instead decode their
+    embedded objects right away, and embedded objects with the same ``id``
+    (or ``urlId``) and the same data are the same instance.
+
+    Set `TypePadObject.intern_embedded` to share objects within each API
+    response. To share objects among many responses, use an `Interner` as a
+    context manager while the responses are delivered:
+
+    >>> with Interner():
+    ...     typepad.client.batch_request()
+    ...     events = group.events.filter(max_results=50)
+    ...     more = group.events.filter(start_index=51, max_results=50)
+    ...     typepad.client.complete_batch()
+
+    As shared objects are the same instance, a change to one of them is a
+    change to all of them.
+
+    """
+
+    _local = threading.local()
+    _object_fields = {}
+
+    def __init__(self):
+        self.objects = {}
+
+    @classmethod
+    def current(cls):
+        """Returns the `Interner` in use in this thread, or ``None`` if there
+        isn't one."""
+        return getattr(cls._local, 'interner', None)
+
+    def __enter__(self):
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(self.current())
+        self._local.interner = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._local.interner = self._local.stack.pop()
+
+    def intern(self, cls, data):
+        """Returns an instance of `cls` decoded from `data`, reusing the
+        instance already made for the same object if there is one."""
+        key = data.get('id') or data.get('urlId')
+        if key is not None:
+            obj = self.objects.get(key)
+            if isinstance(obj, cls) and (obj.api_data is data or obj.api_data == data):
+                return obj
+
+        obj = cls.from_dict(data)
+        if key is not None:
+            self.objects.setdefault(key, obj)
+        return obj
+
+    @classmethod
+    def object_fields(cls, objcls):
+        """Returns the fields of `objcls` that can hold embedded objects, as
+        ``(attrname, api_name, field)`` tuples."""
+        try:
+            return cls._object_fields[objcls]
+        except KeyError:
+            pass
+
+        object_fields = list()
+        for attrname, field in objcls.fields.iteritems():
+            if isinstance(field, fields.Object) or (isinstance(field, fields.List)
+                and isinstance(field.fld, fields.Object)):
+                # Find the descriptor that stores the field's value (it may
+                # not be the field itself in compact classes).
+                for klass in objcls.__mro__:
+                    if attrname in klass.__dict__:
+                        object_fields.append((klass.__dict__[attrname], field.api_name, field))
+                        break
+        cls._object_fields[objcls] = object_fields
+        return object_fields
+
+    def intern_fields(self, obj):
+        """Decodes the embedded objects in `obj`'s data, interning them."""
+        data = obj.__dict__['api_data']
+        self.__enter__()
+        try:
+            if obj.eager_decoding:
+                _decoder(type(obj))(obj, data, self.intern)
+                return
+            for descriptor, api_name, field in self.object_fields(type(obj)):
+                value = data.get(api_name)
+                if isinstance(field, fields.Dict):
+                    if not isinstance(value, dict) or not all(isinstance(v, dict) for v in value.itervalues()):
+                        continue
+                    subcls = field.fld.cls
+                    value = dict((k, self.intern(subcls, v)) for k, v in value.iteritems())
+                elif isinstance(field, fields.List):
+                    if not isinstance(value, list) or not all(isinstance(v, dict) for v in value):
+                        continue
+                    subcls = field.fld.cls
+                    value = [self.intern(subcls, v) for v in value]
+                elif isinstance(value, dict):
+                    value = self.intern(field.cls, value)
+                else:
+                    continue
+                descriptor.__set__(obj, value)
+        finally:
+            self.__exit__(None, None, None)
+
+
+_missing = object()
+
+
+class _CompactField(object):
+
+    """A descriptor that keeps a field's decoded value in its instance's list
+    of values, in place of the instance's ``__dict__``."""
+
+    def __init__(self, field, index):
+        self.field = field
+        self.index = index
+
+    def _values(self, obj):
+        values = obj.__dict__.get('_values')
+        if values is None:
+            values = obj.__dict__['_values'] = [_missing] * len(type(obj)._field_indexes)
+        elif len(values) <= self.index:
+            # The instance was reclassed into a subclass with more fields.
+            values.extend([_missing] * (len(type(obj)._field_indexes) - len(values)))
+        return values
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            # Yield the real field instance when gotten through the class.
+            return self.field
+
+        values = self._values(obj)
+        value = values[self.index]
+        if value is _missing:
+            field = self.field
+            # Values may be set directly in the instance's __dict__ (for
+            # instance, by get_by_url_id()), so look there first.
+            value = obj.__dict__.get(field.attrname, _missing)
+            if value is _missing:
+                try:
+                    value = obj.api_data[field.api_name]
+                except KeyError:
+                    if callable(field.default):
+                        value = field.default(obj)
+                    else:
+                        value = field.default
+                else:
+                    value = field.decode(value)
+            values[self.index] = value
+        return value
+
+    def __set__(self, obj, value):
+        self._values(obj)[self.index] = value
+
+    def __delete__(self, obj):
+        values = obj.__dict__.get('_values')
+        if values is not None and self.index < len(values):
+            values[self.index] = _missing
+        obj.__dict__.pop(self.field.attrname, None)
+        obj.api_data.pop(self.field.api_name, None)
+
+
+def _from_dict(cls, data):
+    return cls.from_dict(data)
+
+
+_decoders = {}
+
+
+def _decoder(cls):
+    """Returns the function that decodes API data into instances of `cls`,
+    compiling it first if necessary.
+
+    The function is called with an instance, the data to decode and a
+    function that makes an embedded object from its class and data. Errors
+    from decoding a value are raised from the function.
+
+    """
+    try:
+        return _decoders[cls]
+    except KeyError:
+        pass
+
+    namespace = {'_missing': _missing}
+    source = ['def decode(obj, data, make):', '    get = data.get']
+    compact = False
+    for num, (attrname, field) in enumerate(sorted(cls.fields.iteritems())):
+        descriptor = None
+        for klass in cls.__mro__:
+            if attrname in klass.__dict__:
+                descriptor = klass.__dict__[attrname]
+                break
+        if isinstance(descriptor, _CompactField):
+            target = 'values[%d]' % descriptor.index
+            compact = True
+        elif descriptor is field and type(field).__get__.im_func is fields.Field.__get__.im_func:
+            target = 'd[%r]' % attrname
+        else:
+            # The field does something special, so leave it be.
+            continue
+
+        name = 'f%d' % num
+        namespace[name] = field
+        source.append('    v = get(%r, _missing)' % field.api_name)
+        if type(field).decode.im_func is fields.Field.decode.im_func:
+            source.append('    if v is not _missing: %s = v' % target)
+            continue
+
+        setup = None
+        if isinstance(field, fields.Object):
+            test, expr = 'type(v) is dict', 'make(%s.cls, v)' % name
+        elif isinstance(field, fields.List) and isinstance(field.fld, fields.Object):
+            if isinstance(field, fields.Dict):
+                test = 'type(v) is dict'
+                expr = 'dict((k, make(c, x) if type(x) is dict else %s.fld.decode(x)) for k, x in v.iteritems())' % name
+            else:
+                test = 'type(v) is list'
+                expr = '[make(c, x) if type(x) is dict else %s.fld.decode(x) for x in v]' % name
+            setup = 'c = %s.fld.cls' % name
+        elif (type(field) is fields.List
+              and type(field.fld).decode.im_func is fields.Field.decode.im_func):
+            test, expr = 'type(v) is list', 'list(v)'
+        else:
+            test, expr = 'v is not _missing', '%s.decode(v)' % name
+        source.append('    if %s:' % test)
+        if setup is not None:
+            source.append('        ' + setup)
+        source.append('        %s = %s' % (target, expr))
+
+    if compact:
+        source.insert(1, "    values = obj.__dict__['_values'] = [_missing] * %d" % len(cls._field_indexes))
+    source.insert(1, '    d = obj.__dict__')
+    exec '\n'.join(source) + '\n' in namespace
+
+    decoder = _decoders[cls] = namespace['decode']
+    return decoder
+
+
+def _copy_data(value):
+    """Returns a copy of the API data `value`, as `copy.deepcopy()` would."""
+    if isinstance(value, dict):
+        return dict((k, _copy_data(v)) for k, v in value.iteritems())
+    if isinstance(value, list):
+        return [_copy_data(v) for v in value]
+    return value
+
+
+def _encode_object(value, copy):
+    encoder = _encoder(type(value)) if isinstance(value, TypePadObject) else None
+    if encoder is None:
+        return value.to_dict()
+    return encoder(value, copy)
+
+
+_encoders = {}
+
+
+def _encoder(cls):
+    """Returns the function that encodes instances of `cls` as dictionaries,
+    compiling it first if necessary, or ``None`` if `cls` encodes itself
+    some other way.
+
+    The function is called with an instance and a function for copying its
+    API data, and returns the same data as `TypePadObject.to_dict()` would.
+
+    """
+    try:
+        return _encoders[cls]
+    except KeyError:
+        pass
+
+    # Only compile encoders for classes that encode like TypePadObject.
+    supers = [klass for klass in cls.__mro__ if 'to_dict' in klass.__dict__]
+    if supers[:2] != [TypePadObject, remoteobjects.dataobject.DataObject]:
+        _encoders[cls] = None
+        return
+
+    namespace = {'_missing': _missing, 'enc': _encode_object}
+    source = [
+        'def encode(obj, copy):',
+        '    d = obj.__dict__',
+        '    data = copy(obj.api_data)',
+    ]
+    compact = False
+    for num, (attrname, field) in enumerate(sorted(cls.fields.iteritems())):
+        name = 'f%d' % num
+        namespace[name] = field
+        descriptor = None
+        for klass in cls.__mro__:
+            if attrname in klass.__dict__:
+                descriptor = klass.__dict__[attrname]
+                break
+
+        # Find the value if it's already decoded or set.
+        if isinstance(descriptor, _CompactField):
+            compact = True
+            source.append('    v = values[%d]' % descriptor.index)
+            source.append('    if v is _missing: v = d.get(%r, _missing)' % attrname)
+        elif descriptor is field and type(field).__get__.im_func is fields.Field.__get__.im_func:
+            source.append('    v = d.get(%r, _missing)' % attrname)
+        else:
+            source.append('    v = getattr(obj, %r, None)' % attrname)
+
+        # Otherwise have the field decode it, unless it would come out the
+        # same as the API data we already have.
+        plain = type(field).decode.im_func is fields.Field.decode.im_func
+        if not plain or callable(field.default):
+            source.append('    if v is _missing: v = getattr(obj, %r, None)' % attrname)
+        elif field.default is not None:
+            source.append('    if v is _missing and %r not in data: v = %s.default' % (field.api_name, name))
+
+        if plain:
+            expr = 'v'
+        elif isinstance(field, fields.Object) and type(field).encode.im_func is fields.Object.encode.im_func:
+            expr = 'enc(v, copy)'
+        elif (type(field) is fields.List and isinstance(field.fld, fields.Object)
+              and type(field.fld).encode.im_func is fields.Object.encode.im_func):
+            expr = '[enc(x, copy) for x in v]'
+        else:
+            expr = '%s.encode(v)' % name
+        source.append('    if v is not None and v is not _missing: data[%r] = %s' % (field.api_name, expr))
+
+    if hasattr(cls, 'object_type'):
+        source.append("    if 'objectType' not in data: data['objectType'] = obj._class_object_type")
+    source.append('    return data')
+    if compact:
+        source.insert(2, "    values = list(d.get('_values') or ())")
+        source.insert(3, '    values.extend([_missing] * (%d - len(values)))' % len(cls._field_indexes))
+    exec '\n'.join(source) + '\n' in namespace
+
+    encoder = _encoders[cls] = namespace['encode']
+    return encoder
+
+
+class CompactObjectMetaclass(TypePadObjectMetaclass):
+
+    """A metaclass for creating new `CompactTypePadObject` classes.
+
+    Each field a new class declares is given a position in its instances'
+    list of values, after the positions of the fields it inherits, so
+    instances can be reclassed to subclasses without moving their values.
+
+    """
+
+    def __new__(cls, name, bases, attrs):
+        newcls = super(CompactObjectMetaclass, cls).__new__(cls, name, bases, attrs)
+
+        indexes = dict(getattr(newcls, '_field_indexes', ()))
+        for attrname in sorted(attrs):
+            field = newcls.fields.get(attrname)
+            if field is None or type(field).__get__.im_func is not fields.Field.__get__.im_func:
+                # Leave properties and specially behaved fields (such as
+                # Constant fields) as they are.
+                continue
+            index = indexes.setdefault(attrname, len(indexes))
+            setattr(newcls, attrname, _CompactField(field, index))
+        newcls._field_indexes = indexes
+
+        return newcls
+
+
+class CompactTypePadObject(TypePadObject):
+
+    """A `TypePadObject` that stores its decoded field values compactly.
+
+    Normal `TypePadObject` instances keep each decoded field value in their
+    ``__dict__``, which grows as more fields are used. Instances of
+    `CompactTypePadObject` subclasses keep their values in one list instead,
+    using much less memory when many objects are held at once (such as in a
+    cache of many events). The API classes can be generated with this class
+    as their base by running ``generate.py`` with the ``--compact`` option.
+
+    """
+
+    __metaclass__ = CompactObjectMetaclass
+
+    def __getstate__(self):
+        state = super(CompactTypePadObject, self).__getstate__()
+        # Pickle decoded values by name, as field positions can differ
+        # between library versions.
+        state.update(self._decoded_fields())
+        return state
+
+    def _decoded_fields(self):
+        """Returns a dictionary of the instance's field values that have
+        already been decoded or set, by attribute name."""
+        decoded = dict((attrname, self.__dict__[attrname])
+            for attrname in self.fields if attrname in self.__dict__)
+        values = self.__dict__.get('_values', ())
+        for attrname, index in self._field_indexes.iteritems():
+            if index < len(values) and values[index] is not _missing:
+                decoded[attrname] = values[index]
+        return decoded
+
+    def _reclass(self, objcls):
+        # Keep any field values the instance already has in the positions of
+        # the new class's fields.
+        decoded = self._decoded_fields()
+        super(CompactTypePadObject, self)._reclass(objcls)
+
+        indexes = getattr(objcls, '_field_indexes', {})
+        values = [_missing] * len(indexes)
+        for attrname, value in decoded.iteritems():
+            index = indexes.get(attrname)
+            if index is not None:
+                values[index] = value
+                self.__dict__.pop(attrname, None)
+            elif attrname in self.fields:
+                self.__dict__[attrname] = value
+        if indexes:
+            self.__dict__['_values'] = values
+        else:
+            self.__dict__.pop('_values', None)
+
+    def update_from_dict(self, data):
+        self.__dict__.pop('_values', None)
+        super(CompactTypePadObject, self).update_from_dict(data)
+
 
 class _PageFilterer(object):
 
@@ -590,6 +1162,215 @@ class BrowserUploadEndpoint(object):
             g.flatten(self, unixfrom=unixfrom)
             return fp.getvalue()
 
+    class MultipartForm(object):
+
+        """A ``multipart/form-data`` request body, framed as its fields and
+        files are added.
+
+        Unlike flattening a `NetworkMessage`, building a `MultipartForm`
+        doesn't copy the values and files it's given: the form is a list of
+        the CRLF framing strings and the values and files themselves, which
+        `body()` makes into a `StreamingBody`. Its boundary is random rather
+        than chosen by searching the content for a string that doesn't occur
+        in it, so the content needn't be read in advance.
+
+        """
+
+        preamble = 'multipart snowform for you'
+
+        def __init__(self, boundary=None):
+            if boundary is None:
+                boundary = self.make_boundary()
+            self.boundary = boundary
+            self.parts = [self.preamble, '\r\n--', boundary]
+
+        @staticmethod
+        def make_boundary():
+            """Returns a new random boundary string.
+
+            With 128 random bits, the boundary is (for all practical purposes)
+            certain not to occur in any content.
+
+            """
+            return '=' * 15 + binascii.hexlify(os.urandom(16)) + '=='
+
+        @staticmethod
+        def quote(value):
+            """Returns `value` as a quoted header parameter value."""
+            return '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"')
+
+        def _add_part(self, headers, content):
+            framing = ['\r\n']
+            for header in headers:
+                framing.append(header)
+                framing.append('\r\n')
+            framing.append('\r\n')
+            self.parts.append(''.join(framing))
+            self.parts.append(content)
+            self.parts.append('\r\n--' + self.boundary)
+
+        def add_field(self, name, value):
+            """Adds a form field `name` with the string `value`."""
+            if isinstance(value, unicode):
+                value = value.encode('utf-8')
+            self._add_part(('Content-Disposition: form-data; name=%s' % self.quote(name),),
+                value)
+
+        def add_file(self, name, fileobj, content_type='application/octet-stream',
+            filename='file'):
+            """Adds the content of `fileobj` from its current position as the
+            form's file field `name`.
+
+            The file is read only when the body is, unless it can't tell its
+            length, in which case it's read now.
+
+            """
+            start, length = BrowserUploadEndpoint.StreamingBody.file_extent(fileobj)
+            if length is None:
+                fileobj = fileobj.read()
+                length = len(fileobj)
+            self._add_part((
+                'MIME-Version: 1.0',
+                'Content-Type: %s' % content_type,
+                'Content-Disposition: form-data; name=%s; filename=%s'
+                    % (self.quote(name), self.quote(filename)),
+                'Content-Transfer-Encoding: identity',
+                'Content-Length: %d' % length,
+            ), fileobj)
+
+        def headers(self):
+            """Returns a dictionary of the HTTP headers describing the
+            form."""
+            return {
+                'Content-Type': 'multipart/form-data; boundary=%s' % self.quote(self.boundary),
+                'MIME-Version': '1.0',
+            }
+
+        def body(self, progress=None):
+            """Returns the form as a `StreamingBody`, which reports its
+            `progress` as described there."""
+            return BrowserUploadEndpoint.StreamingBody(self.parts + ['--\r\n'],
+                progress=progress)
+
+    class StreamingBody(object):
+
+        """A request body made of strings and file contents, which are only
+        read as the body is sent.
+
+        A `StreamingBody` is a file-like object that `httplib` can send
+        chunk by chunk, so a large file can be uploaded without its content
+        being held in memory. Its length is known up front, for the
+        ``Content-Length`` header. Once the body has been read to the end,
+        reading it again starts over from the beginning. As `httplib2` can
+        retry a request after sending only part of its body, `TypePadClient`
+        also calls `rewind()` before each attempt to send a body, so a retry
+        sends the whole body again.
+
+        """
+
+        def __init__(self, parts, progress=None):
+            """Initializes a body consisting of `parts`, a list of strings
+            and file-like objects.
+
+            The files are read from their current positions to their ends.
+            Files that can't tell their lengths by seeking are read into
+            memory first.
+
+            If `progress` is given, it's called after each read of the body
+            with the number of bytes read so far, the length of the body, and
+            the number of seconds since the first read. As `httplib` sends
+            the body as it's read, that's how much of the body has been sent.
+
+            """
+            self.progress = progress
+            self.parts = list()
+            for part in parts:
+                if isinstance(part, basestring):
+                    self.parts.append((part, 0, len(part)))
+                    continue
+                start, length = self.file_extent(part)
+                if length is None:
+                    content = part.read()
+                    self.parts.append((content, 0, len(content)))
+                else:
+                    self.parts.append((part, start, length))
+            self.length = sum(length for part, start, length in self.parts)
+            self.rewind()
+
+        @staticmethod
+        def file_extent(fileobj):
+            """Returns the current position of `fileobj` and the number of
+            bytes left to read from it, or ``None`` for the length if it can't
+            be told without reading the file."""
+            try:
+                start = fileobj.tell()
+            except (AttributeError, IOError):
+                return None, None
+            # Only trust the size of the file descriptor for real files, as
+            # wrappers such as `GzipFile` read a different stream than it.
+            if isinstance(fileobj, file):
+                try:
+                    return start, os.fstat(fileobj.fileno()).st_size - start
+                except (IOError, OSError, ValueError):
+                    pass
+            try:
+                fileobj.seek(0, 2)
+                end = fileobj.tell()
+                fileobj.seek(start)
+            except (AttributeError, IOError, ValueError):
+                return None, None
+            return start, end - start
+
+        def __len__(self):
+            return self.length
+
+        def rewind(self):
+            """Makes the next read start from the beginning of the body."""
+            self._index = 0
+            self._offset = 0
+            self._ended = False
+            self._sent = 0
+            self._started = None
+
+        def read(self, size=-1):
+            """Reads up to `size` bytes of the body, or the rest of it if
+            `size` is negative."""
+            if self._ended:
+                self.rewind()
+            if self._started is None:
+                self._started = time.time()
+            if size < 0:
+                size = self.length
+
+            chunks = list()
+            while size > 0 and self._index < len(self.parts):
+                part, start, length = self.parts[self._index]
+                count = min(size, length - self._offset)
+                if isinstance(part, basestring):
+                    chunk = part[self._offset:self._offset + count]
+                else:
+                    if self._offset == 0:
+                        part.seek(start)
+                    chunk = part.read(count)
+                    if len(chunk) < count:
+                        raise IOError('File for upload ended %d bytes early'
+                            % (length - self._offset - len(chunk)))
+                chunks.append(chunk)
+                size -= count
+                self._offset += count
+                if self._offset >= length:
+                    self._index += 1
+                    self._offset = 0
+
+            if not chunks:
+                self._ended = True
+                return ''
+            chunk = ''.join(chunks)
+            if self.progress is not None:
+                self._sent += len(chunk)
+                self.progress(self._sent, self.length, time.time() - self._started)
+            return chunk
+
     def raise_error_for_response(self, resp, obj):
         if resp.status != 302 or 'location' not in resp:
             raise ValueError('Response is not a browser upload response: not a 302 or has no Location header')
@@ -631,52 +1412,199 @@ class BrowserUploadEndpoint(object):
             raise err_cls()
         raise err_cls(message)
 
-    def upload(self, obj, fileobj, content_type='application/octet-stream', **kwargs):
-        http = typepad.client
+    def post(self, obj, fileobj, content_type='application/octet-stream',
+        progress=None, **kwargs):
+        """Posts `obj` and the content of `fileobj` to the browser upload
+        endpoint, returning the HTTP response and content.
+
+        Unlike `upload()`, `post()` doesn't request the new asset afterward.
+        Use `asset_url()` to find its URL in the response.
 
+        If `progress` is given, it's called as the request body is sent with
+        the number of bytes sent so far, the total number of bytes to send,
+        and the number of seconds since sending began.
+
+        """
         data = dict(kwargs)
-        data['asset'] = json.dumps(obj.to_dict())
+        data['asset'] = obj.to_json()
 
-        bodyobj = self.NetworkMessage()
-        bodyobj.set_type('multipart/form-data')
-        bodyobj.preamble = "multipart snowform for you"
+        form = self.MultipartForm()
         for key, value in data.iteritems():
-            msg = self.NetworkMessage()
-            msg.add_header('Content-Disposition', 'form-data', name=key)
-            msg.set_payload(value)
-            bodyobj.attach(msg)
-
-        filemsg = self.NetworkMessage()
-        filemsg.set_type(content_type)
-        filemsg.add_header('Content-Disposition', 'form-data', name="file",
-            filename="file")
-        filemsg.add_header('Content-Transfer-Encoding', 'identity')
-        filecontent = fileobj.read()
-        filemsg.set_payload(filecontent)
-        filemsg.add_header('Content-Length', str(len(filecontent)))
-        bodyobj.attach(filemsg)
-
-        # Serialize the message first, so we have the generated MIME
-        # boundary when we pull the headers out.
-        body = bodyobj.as_string(write_headers=False)
-        headers = dict(bodyobj.items())
+            form.add_field(key, value)
+        form.add_file('file', fileobj, content_type)
+
+        body = form.body(progress=progress)
+        headers = form.headers()
+        headers['Content-Length'] = str(len(body))
 
         request = obj.get_request(url='/browser-upload.json', method='POST',
             headers=headers, body=body)
-        response, content = http.signed_request(**request)
-
-        if 'location' in response:
-            urlparts = urlparse(response['location'])
-            query = cgi.parse_qs(urlparts[4])
-            if 'asset_url' in query:
-                parts = urlparse(query['asset_url'][0])
-                url = urljoin(typepad.client.endpoint, parts[2])
-                request2 = obj.get_request(url=url, method='GET')
-                response2, content2 = http.request(**request2)
-                obj.update_from_response(url, response2, content2)
+        started = time.time()
+        response, content = typepad.client.signed_request(**request)
+        log.debug('Sent %d byte browser upload in %.2f seconds', len(body),
+            time.time() - started)
+        return response, content
+
+    def asset_url(self, response):
+        """Returns the URL of the asset created by the browser upload to which
+        `response` is the response, or ``None`` if the response doesn't say
+        where it is."""
+        if 'location' not in response:
+            return
+        urlparts = urlparse(response['location'])
+        query = cgi.parse_qs(urlparts[4])
+        if 'asset_url' not in query:
+            return
+        parts = urlparse(query['asset_url'][0])
+        return urljoin(typepad.client.endpoint, parts[2])
+
+    def upload(self, obj, fileobj, content_type='application/octet-stream',
+        progress=None, **kwargs):
+        response, content = self.post(obj, fileobj, content_type,
+            progress=progress, **kwargs)
+
+        url = self.asset_url(response)
+        if url is not None:
+            request2 = obj.get_request(url=url, method='GET')
+            response2, content2 = typepad.client.request(**request2)
+            obj.update_from_response(url, response2, content2)
 
         return response, content
 
+    def upload_all(self, uploads, content_type='application/octet-stream',
+        max_workers=4, retries=0, batch_size=None, session=None, progress=None,
+        **kwargs):
+        """Uploads many files at once.
+
+        Parameter `uploads` is a sequence of ``(obj, fileobj)`` or ``(obj,
+        fileobj, content_type)`` tuples, each a new asset and the file to
+        upload with it. Instead of a file, a filename can be given, in which
+        case the file is opened only when it's uploaded and its content type
+        is guessed from its name if not given. Other keyword arguments are
+        posted with every file, as with `upload()`. For example, to post a
+        directory of photos to a group:
+
+        >>> uploads = [(typepad.Photo(title=name), os.path.join(path, name))
+        ...     for name in os.listdir(path)]
+        >>> results = typepad.browser_upload.upload_all(uploads,
+        ...     post_type='photo', target_url=group.photo_assets._location)
+
+        The files are uploaded on up to `max_workers` threads at once, as
+        with `typepad.bulk.run()`, and uploads that fail to connect to the
+        API are tried again up to `retries` more times. Then the new assets
+        are requested through batch requests of up to `batch_size`
+        subrequests each, as with `typepad.bulk.deliver()`, and each `obj` is
+        updated with its asset's data.
+
+        Returns a list of `typepad.bulk.BulkResult` instances in the same
+        order as `uploads`, whose values are the updated objects. If a file
+        was uploaded but its asset couldn't be requested, its result has the
+        error from requesting it, and the object's ``_location`` is the new
+        asset's URL.
+
+        If a `typepad.uploadsession.UploadSession` is given as `session`,
+        each file is recorded in it as it's uploaded, and files the session
+        records as already uploaded with the same keyword arguments are not
+        uploaded again; their objects are updated from the assets made from
+        them before. Files that can't seek are always uploaded, as they can't
+        be hashed to find them in the session.
+
+        If `progress` is given, it's called as each file is sent with the
+        file's item from `uploads` followed by the arguments described in
+        `post()`. It's called on the threads sending the files.
+
+        """
+        uploads = list(uploads)
+        prepared = list()
+        for upload in uploads:
+            obj, fileobj = upload[:2]
+            ctype = upload[2] if len(upload) > 2 else None
+            start = None
+            if isinstance(fileobj, basestring):
+                if ctype is None:
+                    ctype = mimetypes.guess_type(fileobj)[0]
+            else:
+                # Remember where the file starts, in case we have to retry.
+                try:
+                    start = fileobj.tell()
+                except (AttributeError, IOError):
+                    pass
+            prepared.append((obj, fileobj, ctype or content_type, start, upload))
+
+        def post(item):
+            obj, fileobj, ctype, start, upload = item
+            filename = None
+            if isinstance(fileobj, basestring):
+                filename, fileobj = fileobj, open(fileobj, 'rb')
+            elif start is not None:
+                fileobj.seek(start)
+            try:
+                key = None
+                if session is not None:
+                    key = session.key(fileobj, kwargs)
+                if key is not None:
+                    url = session.asset_url(key)
+                    if url is not None:
+                        return url
+                    session.start(key)
+
+                try:
+                    post_kwargs = kwargs
+                    if progress is not None:
+                        post_kwargs = dict(kwargs,
+                            progress=lambda *args: progress(upload, *args))
+                    response, content = self.post(obj, fileobj, ctype, **post_kwargs)
+                    self.raise_error_for_response(response, obj)
+                    url = self.asset_url(response)
+                    if url is None:
+                        raise ValueError('Browser upload response has no asset URL')
+                except Exception, exc:
+                    if key is not None:
+                        session.fail(key, exc)
+                    raise
+            finally:
+                if filename is not None:
+                    fileobj.close()
+
+            if key is not None:
+                session.finish(key, url)
+            return url
+
+        results = typepad.bulk.run(post, prepared, max_workers=max_workers,
+            retries=retries)
+
+        uploaded = list()
+        for item, result in zip(prepared, results):
+            obj, upload = item[0], item[4]
+            result.item = upload
+            if result.ok:
+                obj._location = result.value
+                obj._delivered = False
+                result.value = obj
+                uploaded.append(result)
+
+        fetched = typepad.bulk.deliver([result.value for result in uploaded],
+            batch_size=batch_size)
+        for result, fetch in zip(uploaded, fetched):
+            if not fetch.ok:
+                result.value._delivered = True
+                result.error = fetch.error
+
+        return results
+
+
+def _import_numpy():
+    """Returns the `numpy` module, or ``None`` if it's not installed.
+
+    NumPy is only imported when first needed, as it takes a while to load.
+
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
 
 class _ImageResizer(object):
 
@@ -706,6 +1634,80 @@ class _ImageResizer(object):
     ))
     """A set of all known valid image sizing specs."""
 
+    @staticmethod
+    def _choose_spec(specs, size):
+        """Returns the smallest of the sorted sizes `specs` that is at least
+        `size`, and `size` limited to the largest of `specs`."""
+        i = bisect_left(specs, size)
+        if i == len(specs):
+            return specs[-1], specs[-1]
+        return specs[i], size
+
+    @classmethod
+    def _inscribe_size(cls, width, height, size):
+        if size == 0 or size is None: size = max(width, height)
+
+        if width > height:
+            if size > width:
+                size = width
+        else:
+            if size > height:
+                size = height
+
+        pi, size = cls._choose_spec(cls._PI, size)
+
+        if height > width:
+            # scale by height
+            new_height = size
+            new_width = int(width * (new_height / float(height)))
+        else:
+            # scale by width
+            new_width = size
+            new_height = int(height * (new_width / float(width)))
+
+        return pi, new_width, new_height
+
+    @classmethod
+    def _by_width_size(cls, width, height, size):
+        if size == 0 or size is None or size > width: size = width
+        wi, size = cls._choose_spec(cls._WI, size)
+        return wi, size, int(height * (size / float(width)))
+
+    @classmethod
+    def _by_height_size(cls, width, height, size):
+        if size == 0 or size is None or size > height: size = height
+        hi, size = cls._choose_spec(cls._HI, size)
+        return hi, int(width * (size / float(height))), size
+
+    @classmethod
+    def _square_size(cls, width, height, size):
+        if size == 0 or size is None: size = max(width, height)
+        if width > height:
+            if size > width:
+                size = width
+        else:
+            if size > height:
+                size = height
+
+        si, size = cls._choose_spec(cls._SI, size)
+        return si, size, size
+
+    _sizers = {
+        'inscribe': ('_inscribe_size', 'pi'),
+        'by_width': ('_by_width_size', 'wi'),
+        'by_height': ('_by_height_size', 'hi'),
+        'square': ('_square_size', 'si'),
+    }
+
+    def _resized(self, spec, width, height):
+        # Copy the link as copy() would, without the generic copy machinery.
+        link = type(self).__new__(type(self))
+        link.__dict__.update(self.__getstate__())
+        link.width = width
+        link.height = height
+        link.url = self._url_at(spec)
+        return link
+
     # selection algorithm to scale to fit both dimensions
     def inscribe(self, size):
         """Given a size, return an `ImageLink` of an image that is no taller
@@ -717,40 +1719,8 @@ class _ImageResizer(object):
 
         """
         if self.url_template is None: return self
-        if size == 0 or size is None: size = max(self.width, self.height)
-
-        if self.width > self.height:
-            if size > self.width:
-                size = self.width
-        else:
-            if size > self.height:
-                size = self.height
-
-        pi = size
-        if pi not in self._PI:
-            pi = self._PI[-1]
-            if size > pi:
-                size = pi
-            else:
-                for x in self._PI:
-                    if x > size:
-                        pi = x
-                        break
-
-        if self.height > self.width:
-            # scale by height
-            new_height = size
-            new_width = int(self.width * (new_height / float(self.height)))
-        else:
-            # scale by width
-            new_width = size
-            new_height = int(self.height * (new_width / float(self.width)))
-
-        url = copy(self)
-        url.width = new_width
-        url.height = new_height
-        url.url = self.at_size('%dpi' % pi)
-        return url
+        spec, width, height = self._inscribe_size(self.width, self.height, size)
+        return self._resized('%dpi' % spec, width, height)
 
     # selection algorithm to scale to fit width
     def by_width(self, size):
@@ -763,24 +1733,8 @@ class _ImageResizer(object):
 
         """
         if self.url_template is None: return self
-        if size == 0 or size is None or size > self.width: size = self.width
-
-        wi = size
-        if size not in self._WI:
-            wi = self._WI[-1]
-            if size > wi:
-                size = wi
-            else:
-                for x in self._WI:
-                    if x > size:
-                        wi = x
-                        break
-
-        url = copy(self)
-        url.width = size
-        url.height = int(self.height * (size / float(self.width)))
-        url.url = self.at_size('%dwi' % wi)
-        return url
+        spec, width, height = self._by_width_size(self.width, self.height, size)
+        return self._resized('%dwi' % spec, width, height)
 
     # selection algorithm to scale to fit height
     def by_height(self, size):
@@ -793,24 +1747,8 @@ class _ImageResizer(object):
 
         """
         if self.url_template is None: return self
-        if size == 0 or size is None or size > self.height: size = self.height
-
-        hi = size
-        if size not in self._HI:
-            hi = self._HI[-1]
-            if size > hi:
-                size = hi
-            else:
-                for x in self._HI:
-                    if x > size:
-                        hi = x
-                        break
-
-        url = copy(self)
-        url.height = size
-        url.width = int(self.width * (size / float(self.height)))
-        url.url = self.at_size('%dhi' % hi)
-        return url
+        spec, width, height = self._by_height_size(self.width, self.height, size)
+        return self._resized('%dhi' % spec, width, height)
 
     # selection algorithm to scale and crop to square
     def square(self, size):
@@ -824,30 +1762,124 @@ class _ImageResizer(object):
 
         """
         if self.url_template is None: return self
-        if size == 0 or size is None: size = max(self.width, self.height)
-        if self.width > self.height:
-            if size > self.width:
-                size = self.width
+        spec, width, height = self._square_size(self.width, self.height, size)
+        return self._resized('%dsi' % spec, width, height)
+
+    @classmethod
+    def sizes(cls, images, mode, size):
+        """Returns a list of ``(url, width, height)`` tuples describing each
+        of `images` resized to `size` in the given sizing `mode`.
+
+        Parameter `mode` is the name of one of the resizing methods:
+        ``inscribe``, ``by_width``, ``by_height`` or ``square``. Each tuple
+        has the `url`, `width` and `height` of the link that method would
+        return for that image, without making the links. Use `sizes()` when
+        resizing many images at once, such as for a grid of thumbnails:
+
+        >>> for url, width, height in typepad.ImageLink.sizes(
+        ...         [photo.image_link for photo in photos], 'square', 75):
+        ...     print '<img src="%s" width="%d" height="%d">' % (url, width, height)
+
+        """
+        sizer, suffix = cls._sizer(mode)
+        spec_format = '%d' + suffix
+
+        results = list()
+        append = results.append
+        for image in images:
+            width, height = image.width, image.height
+            if image.url_template is None:
+                append((image.url, width, height))
+                continue
+            spec, new_width, new_height = sizer(width, height, size)
+            append((image._url_at(spec_format % spec), new_width, new_height))
+        return results
+
+    @classmethod
+    def _sizer(cls, mode):
+        try:
+            name, suffix = cls._sizers[mode]
+        except KeyError:
+            raise ValueError('String %r is not an image sizing mode' % mode)
+        return getattr(cls, name), suffix
+
+    @classmethod
+    def size_arrays(cls, widths, heights, mode, size):
+        """Returns the sizes of many images resized to `size` in the given
+        sizing `mode`, given sequences of their `widths` and `heights`.
+
+        The result is a tuple of three sequences: the number in each image's
+        image sizing spec (such as 75 for ``75si`` when `mode` is
+        ``square``), and each image's new width and height. These are the
+        same sizes as the resizing methods and `sizes()` give.
+
+        If NumPy is installed, the sizes are computed for all the images at
+        once and returned as NumPy arrays. Otherwise they're computed one by
+        one and returned as lists.
+
+        """
+        sizer, suffix = cls._sizer(mode)
+        numpy = _import_numpy()
+        if numpy is None:
+            specs, new_widths, new_heights = list(), list(), list()
+            for width, height in zip(widths, heights):
+                spec, new_width, new_height = sizer(width, height, size)
+                specs.append(spec)
+                new_widths.append(new_width)
+                new_heights.append(new_height)
+            return specs, new_widths, new_heights
+
+        widths = numpy.asarray(widths)
+        heights = numpy.asarray(heights)
+        if mode == 'by_width':
+            limit, divisor = widths, widths
+        elif mode == 'by_height':
+            limit, divisor = heights, heights
         else:
-            if size > self.height:
-                size = self.height
-
-        si = size
-        if si not in self._SI:
-            si = self._SI[-1]
-            if size > si:
-                size = si
-            else:
-                for x in self._SI:
-                    if x > size:
-                        si = x
-                        break
+            limit = numpy.maximum(widths, heights)
+            divisor = numpy.where(heights > widths, heights, widths)
+        if mode != 'square' and not divisor.all():
+            raise ZeroDivisionError('Cannot resize an image with no width or height')
 
-        url = copy(self)
-        url.width = size
-        url.height = size
-        url.url = self.at_size('%dsi' % si)
-        return url
+        if size == 0 or size is None:
+            sizes = limit
+        else:
+            sizes = numpy.minimum(size, limit)
+
+        table = numpy.asarray(getattr(cls, '_%sI' % suffix[0].upper()))
+        index = numpy.searchsorted(table, sizes, side='left')
+        over = index == len(table)
+        specs = table[numpy.minimum(index, len(table) - 1)]
+        sizes = numpy.where(over, table[-1], sizes)
+
+        if mode == 'square':
+            return specs, sizes, sizes.copy()
+        old = numpy.seterr(divide='ignore', invalid='ignore')
+        try:
+            # Compute the other dimension as the methods do, so the results
+            # round the same way.
+            def scale(other, scaled):
+                return (other * (scaled / divisor.astype(float))).astype(int)
+            if mode == 'by_width':
+                return specs, sizes, scale(heights, sizes)
+            elif mode == 'by_height':
+                return specs, scale(widths, sizes), sizes
+            by_height = heights > widths
+            new_widths = numpy.where(by_height, scale(widths, sizes), sizes)
+            new_heights = numpy.where(by_height, sizes, scale(heights, sizes))
+            return specs, new_widths, new_heights
+        finally:
+            numpy.seterr(**old)
+
+    def _url_at(self, spec):
+        # Split the template around its spec placeholder only once per
+        # template, as a link is often resized to several sizes.
+        template = self.url_template
+        split = self.__dict__.get('_url_template_split')
+        if split is None or split[0] is not template:
+            split = (template, template.split('{spec}'))
+            self.__dict__['_url_template_split'] = split
+        return spec.join(split[1])
 
     def at_size(self, spec):
         """Returns the URL for the image at size given by `spec`.
@@ -864,7 +1896,7 @@ class _ImageResizer(object):
         if self.url_template is None: return self.url
         if spec not in self.valid_specs:
             raise ValueError('String %r is not a valid image sizing spec' % spec)
-        return self.url_template.replace('{spec}', spec)
+        return self._url_at(spec)
 
 
 class _VideoResizer(object):
@@ -872,18 +1904,61 @@ class _VideoResizer(object):
     _width = None
     _height = None
 
+    _dimension_re = re.compile(r'(\s(width|height)=)"(\d+)"')
+
+    def _embed_template(self):
+        """Returns the embed code split around its width and height
+        attribute values, as a tuple of the embed code, the list of text
+        between the values, the list of which dimension each value is, and
+        the first width and height values.
+
+        The embed code is only parsed again when it changes.
+
+        """
+        embed_code = self.embed_code
+        template = self.__dict__.get('_embed_template_cache')
+        if template is None or template[0] is not embed_code:
+            texts, slots, first = list(), list(), dict()
+            pos = 0
+            for match in self._dimension_re.finditer(embed_code):
+                texts.append(embed_code[pos:match.end(1)])
+                dimension = match.group(2)
+                slots.append(dimension)
+                first.setdefault(dimension, int(match.group(3)))
+                pos = match.end()
+            texts.append(embed_code[pos:])
+            template = (embed_code, texts, slots, first.get('width'), first.get('height'))
+            self.__dict__['_embed_template_cache'] = template
+        return template
+
+    @staticmethod
+    def _render_embed(template, width, height):
+        """Returns the embed code of `template` with all its width and height
+        values replaced by `width` and `height`.
+
+        Both `width` and `height` must be numbers, even if the embed code has
+        no such values to replace.
+
+        """
+        # Format both values first, so a missing one is always an error.
+        values = {'width': '"%d"' % width, 'height': '"%d"' % height}
+        embed_code, texts, slots, first_width, first_height = template
+        if not slots:
+            return embed_code
+        rendered = [texts[0]]
+        for slot, text in zip(slots, texts[1:]):
+            rendered.append(values[slot])
+            rendered.append(text)
+        return ''.join(rendered)
+
     def get_width(self):
         if self._width is None:
-            match = re.search('\swidth="(\d+)"', self.embed_code)
-            if match:
-                self._width = int(match.group(1))
+            self._width = self._embed_template()[3]
         return self._width
 
     def get_height(self):
         if self._height is None:
-            match = re.search('\sheight="(\d+)"', self.embed_code)
-            if match:
-                self._height = int(match.group(1))
+            self._height = self._embed_template()[4]
         return self._height
 
     def set_width(self, width):
@@ -897,9 +1972,13 @@ class _VideoResizer(object):
     width = property(get_width, set_width)
     height = property(get_height, set_height)
 
-    def _update_embed(self):
-        self.embed_code = re.sub('(\swidth=)"\d+"', '\\1"%d"' % self.width, self.embed_code)
-        self.embed_code = re.sub('(\sheight=)"\d+"', '\\1"%d"' % self.height, self.embed_code)
+    def _update_embed(self, template=None):
+        if template is None:
+            template = self._embed_template()
+        embed_code = self._render_embed(template, self.width, self.height)
+        self.embed_code = embed_code
+        # The rendered code has the same shape, so keep the parsed template.
+        self.__dict__['_embed_template_cache'] = (embed_code,) + template[1:]
 
     # selection algorithm to scale to fit width
     def by_width(self, size):
@@ -910,11 +1989,33 @@ class _VideoResizer(object):
         and the height is scaled to maintain the video's aspect ratio.
 
         """
-        vid = copy(self)
-        vid.width = size
-        vid.height = int(self.height * (size / float(self.width)))
+        vid = type(self).__new__(type(self))
+        vid.__dict__.update(self.__getstate__())
+        vid._width = size
+        vid._height = int(self.height * (size / float(self.width)))
+        vid._update_embed(self._embed_template())
         return vid
 
+    @classmethod
+    def sizes(cls, videos, size):
+        """Returns a list of ``(embed_code, width, height)`` tuples describing
+        each of `videos` resized to be `size` wide, as `by_width()` would,
+        without making new links.
+
+        >>> for embed_code, width, height in typepad.VideoLink.sizes(
+        ...         [video.video_link for video in videos], 400):
+        ...     print embed_code
+
+        """
+        results = list()
+        append = results.append
+        render = cls._render_embed
+        for video in videos:
+            width, height = video.width, video.height
+            height = int(height * (size / float(width)))
+            append((render(video._embed_template(), size, height), size, height))
+        return results
+
 
 def renamed_property(old, new):
     @property
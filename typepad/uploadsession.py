@@ -0,0 +1,212 @@
+# Copyright (c) 2009-2010 Six Apart Ltd.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice,
+#   this list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of Six Apart Ltd. nor the names of its contributors may
+#   be used to endorse or promote products derived from this software without
+#   specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+
+The `typepad.uploadsession` module provides `UploadSession`, a journal of the
+files uploaded through `BrowserUploadEndpoint.upload_all()`.
+
+TypePad's browser upload endpoint takes each file in one request, so an upload
+that's cut off must be sent again from the start. When a bulk upload is
+interrupted, however, the files it had already finished needn't be. Given an
+`UploadSession`, `upload_all()` records each file it uploads in a SQLite
+database, keyed by a hash of the file's content, and skips the files recorded
+as uploaded before, using the asset URLs saved for them instead.
+
+>>> session = UploadSession('/var/spool/myapp/uploads.db')
+>>> results = typepad.browser_upload.upload_all(uploads, session=session,
+...     post_type='photo', target_url=group.photo_assets._location)
+
+If the process dies partway through, running the same `upload_all()` with
+the same session again only uploads the files that weren't finished.
+
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import urllib
+
+
+SENDING = 'sending'
+"""State of a file that's being uploaded, or that was being uploaded when its
+session was interrupted."""
+DONE = 'done'
+"""State of a file that was uploaded, making the asset at its `asset_url`."""
+FAILED = 'failed'
+"""State of a file whose last upload failed."""
+
+
+def _utf8(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+class UploadSession(object):
+
+    """A durable record of the files uploaded through the browser upload
+    endpoint.
+
+    Files are identified by the SHA-1 hash of their content and the
+    parameters they were uploaded with (such as the ``target_url`` to post
+    them to), so the same file uploaded to two groups is uploaded twice, but
+    a file renamed or copied since it was uploaded is not.
+
+    A file that was being sent when the session was interrupted may or may
+    not have been made into an asset; as the API didn't say where, it's
+    uploaded again.
+
+    """
+
+    chunk_size = 65536
+    """The number of bytes of a file to read at a time when hashing it."""
+
+    class Entry(object):
+
+        """A file in an `UploadSession`.
+
+        Once the file is uploaded, its `asset_url` is the URL of the new
+        asset. If uploading the file failed, its `error` describes the last
+        error that occurred.
+
+        """
+
+        def __init__(self, key, state, attempts, asset_url, error, updated):
+            self.key = key
+            self.state = state
+            self.attempts = attempts
+            self.asset_url = asset_url
+            self.error = error
+            self.updated = updated
+
+        def __repr__(self):
+            return '<%s.Entry %s %s>' % (UploadSession.__name__, self.key[:12], self.state)
+
+    def __init__(self, path):
+        """Opens the session stored in the SQLite database at `path`,
+        creating it if necessary."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None,
+            check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS uploads (
+            key TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            asset_url TEXT,
+            error TEXT,
+            updated REAL NOT NULL
+        )""")
+
+    def close(self):
+        """Closes the session's database."""
+        self._db.close()
+
+    def _execute(self, sql, params=()):
+        self._lock.acquire()
+        try:
+            return self._db.execute(sql, params).fetchall()
+        finally:
+            self._lock.release()
+
+    def key(self, fileobj, params=None):
+        """Returns the key identifying the content of `fileobj` uploaded with
+        the given dictionary of `params`.
+
+        The file is read from its current position to the end, then returned
+        to that position. Returns ``None`` if `fileobj` can't seek back, as
+        such a file can't be both hashed and uploaded.
+
+        """
+        try:
+            start = fileobj.tell()
+        except (AttributeError, IOError):
+            return
+
+        digest = hashlib.sha1()
+        if params:
+            digest.update(urllib.urlencode(sorted((_utf8(key), _utf8(value))
+                for key, value in params.iteritems())))
+        digest.update('\0')
+        read = fileobj.read
+        chunk_size = self.chunk_size
+        while True:
+            chunk = read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+        fileobj.seek(start)
+        return digest.hexdigest()
+
+    def entry(self, key):
+        """Returns the `UploadSession.Entry` for the file with the given key,
+        or ``None`` if the file has not been uploaded in this session."""
+        rows = self._execute("""SELECT key, state, attempts, asset_url, error, updated
+            FROM uploads WHERE key = ?""", (key,))
+        if not rows:
+            return
+        return self.Entry(*rows[0])
+
+    def asset_url(self, key):
+        """Returns the URL of the asset made from the file with the given key,
+        or ``None`` if the file has not been uploaded."""
+        rows = self._execute("SELECT asset_url FROM uploads WHERE key = ? AND state = ?",
+            (key, DONE))
+        if rows:
+            return rows[0][0]
+
+    def start(self, key):
+        """Records that the file with the given key is being uploaded."""
+        self._lock.acquire()
+        try:
+            self._db.execute("""INSERT OR IGNORE INTO uploads (key, state, updated)
+                VALUES (?, ?, ?)""", (key, SENDING, time.time()))
+            self._db.execute("""UPDATE uploads SET state = ?, attempts = attempts + 1,
+                error = NULL, updated = ? WHERE key = ?""", (SENDING, time.time(), key))
+        finally:
+            self._lock.release()
+
+    def finish(self, key, asset_url):
+        """Records that the file with the given key was uploaded, making the
+        asset at `asset_url`."""
+        self._execute("""UPDATE uploads SET state = ?, asset_url = ?, error = NULL,
+            updated = ? WHERE key = ?""", (DONE, asset_url, time.time(), key))
+
+    def fail(self, key, error):
+        """Records that uploading the file with the given key failed with
+        `error`."""
+        self._execute("UPDATE uploads SET state = ?, error = ?, updated = ? WHERE key = ?",
+            (FAILED, str(error), time.time(), key))
+
+    def counts(self):
+        """Returns a dictionary of the number of files in the session in each
+        state."""
+        return dict(self._execute("SELECT state, COUNT(*) FROM uploads GROUP BY state"))